@@ -0,0 +1,157 @@
+"""
+Cache für Antworten von ``/api/grounded-answer`` und ``/api/grounded-answer-stream``.
+
+Nutzer stellen pro Gefahr meist dieselben wenigen Fragen.  Antworten werden
+daher unter ``(slug, lang, context, normalisierte Frage)`` abgelegt; Groß‑/
+Kleinschreibung, Leerzeichen und Satzzeichen spielen für den Schlüssel keine
+Rolle („Wie lange Herzdruckmassage?“ = „wie lange herzdruckmassage“).  Zusätzlich
+fließt ein Hash der verwendeten Baumschritte ein, damit geänderte
+Entscheidungsbäume nicht mit alten Antworten beantwortet werden.
+
+Ist ``REDIS_URL`` gesetzt, teilen sich alle Worker einen Redis‑Cache (TTL per
+``EX``, Größenbegrenzung über einen Sorted‑Set‑Index).  Andernfalls – oder
+wenn das Paket ``redis`` fehlt – wird ein ``AsyncTTLCache`` im Prozess
+verwendet.  Redis‑Fehler werden als Fehlzugriff behandelt.
+"""
+
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+from typing import Any, Dict, Optional, Sequence
+
+from cache import AsyncTTLCache, redis_client
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:  # pragma: no cover - optionales Paket
+    aioredis = None  # type: ignore
+
+logger = logging.getLogger("server.answer_cache")
+
+Answer = Dict[str, Any]
+
+
+def normalize_question(text: Optional[str]) -> str:
+    """Kleinschreibung, ohne Satzzeichen, Leerzeichen zusammengefasst."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    cleaned = "".join(ch if ch.isalnum() or ch.isspace() else " " for ch in text)
+    return " ".join(cleaned.split())
+
+
+def answer_key(slug: str, lang: str, context: Optional[str], question: str, steps: Sequence[str] = ()) -> str:
+    """Stabiler Cache‑Schlüssel für eine Frage zu einem Baum."""
+    raw = json.dumps(
+        [slug, lang, normalize_question(context), normalize_question(question), list(steps)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryAnswerBackend:
+    """
+    Prozesslokaler Cache (LRU + TTL) auf Basis von ``AsyncTTLCache``.  Der
+    Cache wird nicht registriert: Treffer zählt ``AnswerCache`` für beide
+    Backends einheitlich.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self._cache: AsyncTTLCache[Answer] = AsyncTTLCache(
+            "grounded_answers", max_entries=max_entries, ttl=ttl, register=False
+        )
+
+    async def get(self, key: str) -> Optional[Answer]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Answer) -> None:
+        self._cache.set(key, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._cache),
+            "max_entries": self._cache.max_entries,
+            "evictions": self._cache.stats.evictions,
+        }
+
+
+class RedisAnswerBackend:
+    """
+    Gemeinsamer Cache in Redis.  Jeder Eintrag verfällt nach ``ttl``
+    Sekunden; ein Sorted Set mit Schreibzeitpunkten begrenzt die Anzahl
+    auf ``max_entries`` (älteste Einträge werden gelöscht).
+    """
+
+    def __init__(self, url: str, max_entries: int, ttl: float, prefix: str = "akut:ga:") -> None:
+        self.redis = redis_client(url)
+        self.max_entries = max_entries
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._index = prefix + "index"
+
+    async def get(self, key: str) -> Optional[Answer]:
+        raw = await self.redis.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: Answer) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self.prefix + key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+            pipe.zadd(self._index, {key: time.time()})
+            # Einträge, deren TTL abgelaufen ist, aus dem Index entfernen
+            pipe.zremrangebyscore(self._index, 0, time.time() - self.ttl)
+            pipe.zcard(self._index)
+            *_, size = await pipe.execute()
+        if size > self.max_entries:
+            evicted = await self.redis.zpopmin(self._index, size - self.max_entries)
+            if evicted:
+                await self.redis.delete(*(self.prefix + k.decode() for k, _ in evicted))
+
+
+class AnswerCache:
+    """Fassade über das konfigurierte Backend mit Treffer‑/Fehlerzählern."""
+
+    def __init__(self, backend: Any) -> None:
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, redis_url: Optional[str], max_entries: int, ttl: float) -> "AnswerCache":
+        if redis_url and aioredis is not None:
+            return cls(RedisAnswerBackend(redis_url, max_entries, ttl))
+        if redis_url:
+            logger.warning("REDIS_URL gesetzt, aber das Paket 'redis' fehlt – nutze In-Memory-Cache")
+        return cls(MemoryAnswerBackend(max_entries, ttl))
+
+    async def get(self, key: str) -> Optional[Answer]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Antwort-Cache nicht lesbar: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Answer) -> None:
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Antwort-Cache nicht beschreibbar: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        backend_stats = getattr(self.backend, "snapshot", None)
+        return {
+            "backend": "redis" if isinstance(self.backend, RedisAnswerBackend) else "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            **(backend_stats() if backend_stats is not None else {}),
+        }
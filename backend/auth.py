@@ -0,0 +1,175 @@
+"""
+Anmeldung: Passwort‑Hashes, Cache für Benutzerdatensätze und Sitzungstokens.
+
+- ``verify_password`` prüft gespeicherte Hashes in zwei Formaten:
+  ``pbkdf2_sha256$<Iterationen>$<Salt>$<Hash>`` (absichtlich langsam, wird
+  in einem eigenen Thread‑Pool gerechnet, damit die Event‑Loop frei bleibt)
+  und – für bestehende Konten – ungesalzenes SHA‑256 als Hex.
+  ``hash_password`` erzeugt das PBKDF2‑Format, z. B. für ``init_users``.
+- ``UserCache`` hält Benutzerdatensätze einige Sekunden im Speicher
+  (``AsyncTTLCache`` mit Single‑Flight), auch „nicht gefunden“.
+- ``TokenStore`` speichert ausgegebene Tokens mit Ablaufzeit, im Prozess
+  oder – bei gesetztem ``REDIS_URL`` – in Redis.  Eine Prüfung ist ein
+  einzelner Lookup.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cache import AsyncTTLCache, redis_client
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:  # pragma: no cover - optionales Paket
+    aioredis = None  # type: ignore
+
+logger = logging.getLogger("server.auth")
+
+PBKDF2_PREFIX = "pbkdf2_sha256"
+PBKDF2_ITERATIONS = 310_000
+
+UserRecord = Dict[str, Any]
+
+
+def hash_password(password: str, iterations: int = PBKDF2_ITERATIONS) -> str:
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return "$".join(
+        [PBKDF2_PREFIX, str(iterations), base64.b64encode(salt).decode(), base64.b64encode(digest).decode()]
+    )
+
+
+def is_slow_hash(stored: str) -> bool:
+    return stored.startswith(PBKDF2_PREFIX + "$")
+
+
+def verify_password(stored: Optional[str], password: str) -> bool:
+    """Vergleicht in konstanter Zeit; unbekannte Formate gelten als falsch."""
+    if not stored:
+        return False
+    if is_slow_hash(stored):
+        try:
+            _, iterations, salt, digest = stored.split("$")
+            expected = base64.b64decode(digest)
+            actual = hashlib.pbkdf2_hmac("sha256", password.encode(), base64.b64decode(salt), int(iterations))
+        except (ValueError, TypeError):
+            return False
+        return hmac.compare_digest(actual, expected)
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+
+
+class PasswordVerifier:
+    """Rechnet langsame Hashes in einem begrenzten Thread‑Pool."""
+
+    def __init__(self, workers: int = 2) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="password-hash")
+
+    async def verify(self, stored: Optional[str], password: str) -> bool:
+        if not stored or not is_slow_hash(stored):
+            return verify_password(stored, password)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, verify_password, stored, password)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class UserCache:
+    """Kurzlebiger Cache für Benutzerdatensätze; ``{}`` steht für „nicht gefunden“."""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000) -> None:
+        self._cache: AsyncTTLCache[UserRecord] = AsyncTTLCache("users", max_entries=max_entries, ttl=ttl)
+
+    async def get(self, login: str, fetch: Callable[[], Awaitable[Optional[UserRecord]]]) -> Optional[UserRecord]:
+        async def load() -> UserRecord:
+            return await fetch() or {}
+
+        record = await self._cache.get_or_fetch(login, load)
+        return record or None
+
+    def invalidate(self, login: Optional[str] = None) -> None:
+        self._cache.invalidate(login)
+
+
+class MemoryTokenBackend:
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self._cache: AsyncTTLCache[str] = AsyncTTLCache("auth_sessions", max_entries=max_entries, ttl=ttl)
+
+    async def set(self, token: str, username: str) -> None:
+        self._cache.set(token, username)
+
+    async def get(self, token: str) -> Optional[str]:
+        return self._cache.get(token)
+
+    async def delete(self, token: str) -> None:
+        self._cache.invalidate(token)
+
+
+class RedisTokenBackend:
+    def __init__(self, url: str, ttl: float, prefix: str = "akut:session:") -> None:
+        self.redis = redis_client(url)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    async def set(self, token: str, username: str) -> None:
+        await self.redis.set(self.prefix + token, username, ex=self.ttl)
+
+    async def get(self, token: str) -> Optional[str]:
+        value = await self.redis.get(self.prefix + token)
+        return value.decode() if value else None
+
+    async def delete(self, token: str) -> None:
+        await self.redis.delete(self.prefix + token)
+
+
+class TokenStore:
+    """Ausgegebene Login‑Tokens mit fester Gültigkeit (``ttl`` Sekunden ab Anmeldung)."""
+
+    def __init__(self, backend: Any, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.stats: Dict[str, int] = {"issued": 0, "valid": 0, "invalid": 0, "revoked": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls, redis_url: Optional[str], ttl: float, max_entries: int) -> "TokenStore":
+        if redis_url and aioredis is not None:
+            return cls(RedisTokenBackend(redis_url, ttl), ttl)
+        if redis_url:
+            logger.warning("REDIS_URL gesetzt, aber das Paket 'redis' fehlt – Sitzungen im Prozess")
+        return cls(MemoryTokenBackend(ttl, max_entries), ttl)
+
+    async def issue(self, username: str) -> str:
+        token = secrets.token_hex(16)
+        await self.backend.set(token, username)
+        self.stats["issued"] += 1
+        return token
+
+    async def validate(self, token: Optional[str]) -> Optional[str]:
+        """Benutzername zum Token oder ``None`` (unbekannt, abgelaufen, Backend gestört)."""
+        if not token:
+            return None
+        try:
+            username = await self.backend.get(token)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Sitzungsspeicher nicht lesbar: {e}")
+            return None
+        self.stats["valid" if username else "invalid"] += 1
+        return username
+
+    async def revoke(self, token: str) -> None:
+        await self.backend.delete(token)
+        self.stats["revoked"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if isinstance(self.backend, RedisTokenBackend) else "memory",
+            "ttl": self.ttl,
+            **self.stats,
+        }
@@ -0,0 +1,484 @@
+"""
+Reproduzierbarer Lasttest für ``server.py`` ohne Netzzugang.
+
+Startet ``fake_upstreams`` (Overpass, OSRM, Nominatim, MoWaS, Google Places,
+OpenAI) und das Backend als eigene Prozesse, wartet auf ``/api/ready`` und
+misst danach:
+
+1. jedes Szenario einzeln (``--duration`` Sekunden, ``--concurrency``
+   gleichzeitige Clients, vorher ``--warmup`` Sekunden ohne Messung),
+2. eine gewichtete Mischung aller Szenarien (``mixed``), etwa so, wie die
+   Frontends die API nutzen.
+
+Pro Szenario werden Anfragen, Fehler, Durchsatz, p50/p95/p99 und der
+Speicher (RSS des Backends inkl. Worker, Start und Höchstwert der Phase)
+ausgegeben.  Die Parameter werden aus einem festen Seed erzeugt, Caches
+treffen also in jedem Lauf gleich oft.
+
+Das Ergebnis wird mit ``benchmark_baseline.json`` verglichen; verschlechtert
+sich p95/p99, Durchsatz, Fehlerquote oder Speicher um mehr als
+``--tolerance``, endet das Skript mit Exit‑Code 1 und listet die Regressionen.
+Eine neue Baseline (auf der Referenzmaschine!) schreibt ``--save-baseline``.
+
+Einzelne Läufe schwanken, vor allem auf geteilten Maschinen.  Mit
+``--runs N`` wird N‑mal gemessen; für die Baseline zählt je Wert der
+schlechteste, für den Vergleich der beste Lauf.  Eine Regression muss also
+in allen Läufen auftreten, um gemeldet zu werden.
+
+Beispiele::
+
+    python benchmark.py
+    python benchmark.py --scenarios pois,route --duration 5 --concurrency 32
+    python benchmark.py --workers 4 --output result.json
+    python benchmark.py --runs 3 --save-baseline
+    FAKE_OVERPASS_LATENCY=0.5 python benchmark.py --scenarios pois --no-compare
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "benchmark_baseline.json")
+
+# Absolute Untergrenzen, unter denen Abweichungen als Rauschen gelten
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_RSS_DELTA_MB = 20.0
+MAX_ERROR_RATE_DELTA = 0.01
+# p99 aus wenigen hundert Werten ist praktisch das Maximum – erst ab hier vergleichen
+MIN_SAMPLES_P99 = 1000
+
+RequestSpec = Dict[str, Any]
+
+
+@dataclass
+class Scenario:
+    name: str
+    weight: int
+    build: Callable[[random.Random], RequestSpec]
+
+
+@dataclass
+class Samples:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+
+# ---------------------------------------------------------------------------
+# Szenarien
+# ---------------------------------------------------------------------------
+
+def _load_fixtures() -> Dict[str, Any]:
+    with open(os.path.join(HERE, "data", "hazards_meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    tree_dir = os.path.join(HERE, "data", "decision-trees")
+    slugs = sorted({name.split("_decision_tree")[0] for name in os.listdir(tree_dir) if "_decision_tree" in name})
+    phrases: List[str] = []
+    for info in meta.values():
+        name = info.get("name")
+        phrases.extend(name.values() if isinstance(name, dict) else [name] if name else [])
+        for words in (info.get("synonyms") or {}).values():
+            phrases.extend(words)
+    rng = random.Random(7)
+    # Feste Orte (Deutschland), gerundet wie von Frontends gesendet
+    places = [(round(rng.uniform(47.5, 54.5), 4), round(rng.uniform(6.0, 15.0), 4)) for _ in range(60)]
+    return {"slugs": slugs, "phrases": [p for p in phrases if p], "places": places}
+
+
+def build_scenarios() -> List[Scenario]:
+    fx = _load_fixtures()
+    slugs, phrases, places = fx["slugs"], fx["phrases"], fx["places"]
+    langs = ["de", "de", "de", "en", "fr"]
+    # Ein Teil der Fragen passt direkt zu Baumknoten (Schnellpfad), der Rest
+    # geht an das Sprachmodell; der Pool ist klein genug für Cache‑Treffer.
+    questions = [
+        "Was muss ich als erstes tun?",
+        "Soll ich 112 rufen?",
+        "Wie lagere ich die Person richtig?",
+        "Darf ich der Person etwas zu trinken geben?",
+        "Was mache ich, wenn es schlimmer wird?",
+        "Wie lange dauert es, bis Hilfe kommt?",
+    ]
+
+    def place(rng: random.Random) -> Tuple[float, float]:
+        lat, lon = rng.choice(places)
+        # kleine Verschiebung: mal gleiche Kachel, mal Nachbarkachel
+        return round(lat + rng.choice((0, 0, 0.002, 0.01)), 4), round(lon + rng.choice((0, 0, 0.002, 0.01)), 4)
+
+    def grounded(rng: random.Random) -> Dict[str, Any]:
+        return {"slug": rng.choice(slugs), "lang": rng.choice(langs), "question": rng.choice(questions)}
+
+    def chat(rng: random.Random) -> Dict[str, Any]:
+        history = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": rng.choice(questions)}
+            for i in range(rng.choice((0, 2, 6, 20)))
+        ]
+        return {"messages": history + [{"role": "user", "content": rng.choice(questions)}], "slug": rng.choice(slugs)}
+
+    return [
+        Scenario("hazards", 12, lambda rng: {"method": "GET", "path": "/api/hazards", "params": {"lang": rng.choice(langs)}}),
+        Scenario("hazard_detail", 12, lambda rng: {"method": "GET", "path": f"/api/hazards/{rng.choice(slugs)}", "params": {"lang": rng.choice(langs)}}),
+        Scenario("decision_tree", 8, lambda rng: {"method": "GET", "path": f"/api/decision-tree/{rng.choice(slugs)}", "params": {"lang": rng.choice(langs)}}),
+        Scenario("auto_navigate", 8, lambda rng: {"method": "POST", "path": "/api/auto-navigate", "json": {"description": f"Hilfe, {rng.choice(phrases)}!"}}),
+        Scenario("grounded_answer", 12, lambda rng: {"method": "POST", "path": "/api/grounded-answer", "json": grounded(rng)}),
+        Scenario("grounded_stream", 6, lambda rng: {"method": "POST", "path": "/api/grounded-answer-stream", "json": grounded(rng)}),
+        Scenario("chat", 4, lambda rng: {"method": "POST", "path": "/api/chat", "json": chat(rng)}),
+        Scenario("pois", 10, lambda rng: (lambda p: {"method": "GET", "path": "/api/pois", "params": {"lat": p[0], "lon": p[1], "radius": rng.choice((1000, 2000, 5000))}})(place(rng))),
+        Scenario("pois_nearest", 6, lambda rng: (lambda p: {"method": "GET", "path": "/api/pois/nearest", "params": {"lat": p[0], "lon": p[1], "types": rng.choice(("hospital", "pharmacy", "police,fire_station"))}})(place(rng))),
+        Scenario("route", 6, lambda rng: (lambda a, b: {"method": "GET", "path": "/api/route", "params": {"start_lat": a[0], "start_lon": a[1], "end_lat": b[0], "end_lon": b[1], "profile": rng.choice(("foot", "car"))}})(place(rng), place(rng))),
+        Scenario("geocode", 8, lambda rng: {"method": "GET", "path": "/api/geocode", "params": {"q": rng.choice(("Berlin", "München", "Hamburg", "Köln", "Dresden", "Leipzig"))[: rng.randint(3, 7)], "autocomplete": rng.choice(("true", "false"))}}),
+        Scenario("warnings", 8, lambda rng: (lambda p: {"method": "GET", "path": "/api/warnings", "params": {"lat": p[0], "lon": p[1]}})(place(rng))),
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Prozesse
+# ---------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """RSS eines Prozesses samt aller Kindprozesse (Linux, ``/proc``)."""
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                stack.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            if current == pid:
+                return None
+    return round(total_kb / 1024, 1)
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Prozess beendet (Exit-Code {proc.returncode}) vor {url}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} nach {timeout:g}s nicht bereit")
+
+
+def start_processes(workers: int) -> Tuple[str, subprocess.Popen, subprocess.Popen]:
+    fake_port, app_port = _free_port(), _free_port()
+    fake = f"http://127.0.0.1:{fake_port}"
+    quiet = ["--log-level", "warning"]
+    fake_proc = subprocess.Popen(
+        # Keep-Alive länger als jedes Poll-Intervall, sonst trifft der MoWaS-Poller
+        # regelmäßig auf gerade geschlossene Verbindungen
+        [sys.executable, "-m", "uvicorn", "fake_upstreams:app", "--port", str(fake_port), "--timeout-keep-alive", "60", *quiet],
+        cwd=HERE,
+    )
+    env = dict(os.environ)
+    env.update(
+        OVERPASS_URL=f"{fake}/overpass/api/interpreter",
+        OSRM_URL=f"{fake}/osrm",
+        NOMINATIM_URL=f"{fake}/nominatim/search",
+        MOWAS_URL=f"{fake}/mowas",
+        GOOGLE_PLACES_DETAILS_URL=f"{fake}/google/place/details/json",
+        OPENAI_BASE_URL=f"{fake}/openai/v1",
+        OPENAI_API_KEY="benchmark",
+        GOOGLE_PLACES_API_KEY="benchmark",
+        WEB_CONCURRENCY=str(workers),
+        BACKEND_PORT=str(app_port),
+    )
+    # Ratenlimit und Poller sollen die Messung nicht dominieren
+    env.setdefault("NOMINATIM_RATE", "1000")
+    env.setdefault("NOMINATIM_BURST", "1000")
+    env.setdefault("MOWAS_POLL_INTERVAL", "5")
+    env.setdefault("TELEMETRY_SINK", "none")
+    if workers > 1:
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "server:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "server:app", "--port", str(app_port), *quiet]
+    app_proc = subprocess.Popen(cmd, cwd=HERE, env=env)
+    try:
+        _wait_ready(f"{fake}/docs", fake_proc, 20)
+        _wait_ready(f"http://127.0.0.1:{app_port}/api/ready", app_proc, 60)
+    except Exception:
+        stop_processes(fake_proc, app_proc)
+        raise
+    return f"http://127.0.0.1:{app_port}", fake_proc, app_proc
+
+
+def stop_processes(*procs: subprocess.Popen) -> None:
+    for proc in procs:
+        if proc.poll() is None:
+            proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ---------------------------------------------------------------------------
+# Messung
+# ---------------------------------------------------------------------------
+
+async def _send(client: httpx.AsyncClient, spec: RequestSpec) -> bool:
+    async with client.stream(spec["method"], spec["path"], params=spec.get("params"), json=spec.get("json")) as resp:
+        # Streams vollständig lesen: gemessen wird bis zum letzten Byte
+        async for _ in resp.aiter_raw():
+            pass
+        return resp.status_code < 500
+
+
+async def run_phase(
+    base_url: str,
+    scenarios: List[Scenario],
+    duration: float,
+    concurrency: int,
+    seed: int,
+    pid: int,
+) -> Dict[str, Any]:
+    samples: Dict[str, Samples] = {s.name: Samples() for s in scenarios}
+    weights = [s.weight for s in scenarios]
+    rss_start = _rss_mb(pid)
+    rss_peak = rss_start or 0.0
+    stop_at = time.monotonic() + duration
+
+    async def client_loop(client: httpx.AsyncClient, index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        while time.monotonic() < stop_at:
+            scenario = rng.choices(scenarios, weights)[0]
+            spec = scenario.build(rng)
+            began = time.perf_counter()
+            try:
+                ok = await _send(client, spec)
+            except httpx.HTTPError:
+                ok = False
+            target = samples[scenario.name]
+            target.latencies.append(time.perf_counter() - began)
+            if not ok:
+                target.errors += 1
+
+    async def sample_memory() -> None:
+        nonlocal rss_peak
+        while time.monotonic() < stop_at:
+            rss_peak = max(rss_peak, _rss_mb(pid) or 0.0)
+            await asyncio.sleep(0.2)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        began = time.monotonic()
+        await asyncio.gather(sample_memory(), *(client_loop(client, i) for i in range(concurrency)))
+        elapsed = time.monotonic() - began
+    endpoints = {name: summarize(s, elapsed) for name, s in samples.items() if s.latencies}
+    if len(endpoints) > 1:
+        total = Samples(
+            [value for s in samples.values() for value in s.latencies], sum(s.errors for s in samples.values())
+        )
+        endpoints["_total"] = summarize(total, elapsed)
+    return {
+        "endpoints": endpoints,
+        "rss_start_mb": rss_start,
+        "rss_peak_mb": rss_peak or None,
+    }
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def summarize(samples: Samples, elapsed: float) -> Dict[str, Any]:
+    values = sorted(samples.latencies)
+    return {
+        "requests": len(values),
+        "errors": samples.errors,
+        "error_rate": round(samples.errors / len(values), 4),
+        "rps": round(len(values) / elapsed, 1),
+        "p50_ms": round(_percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(values, 0.99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Auswertung
+# ---------------------------------------------------------------------------
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressionen gegenüber der Baseline als lesbare Zeilen."""
+    problems: List[str] = []
+    for phase, current in results["phases"].items():
+        base_phase = baseline.get("phases", {}).get(phase)
+        if base_phase is None:
+            continue
+        for name, cur in current["endpoints"].items():
+            base = base_phase["endpoints"].get(name)
+            if base is None:
+                continue
+            label = f"{phase}/{name}"
+            metrics = ("p95_ms", "p99_ms") if min(cur["requests"], base["requests"]) >= MIN_SAMPLES_P99 else ("p95_ms",)
+            for metric in metrics:
+                limit = base[metric] * (1 + tolerance)
+                if cur[metric] > limit and cur[metric] - base[metric] > MIN_LATENCY_DELTA_MS:
+                    problems.append(f"{label}: {metric} {cur[metric]} > {base[metric]} (+{tolerance:.0%})")
+            if cur["rps"] < base["rps"] * (1 - tolerance):
+                problems.append(f"{label}: rps {cur['rps']} < {base['rps']} (-{tolerance:.0%})")
+            if cur["error_rate"] > base["error_rate"] + MAX_ERROR_RATE_DELTA:
+                problems.append(f"{label}: error_rate {cur['error_rate']} > {base['error_rate']}")
+        cur_rss, base_rss = current.get("rss_peak_mb"), base_phase.get("rss_peak_mb")
+        if cur_rss and base_rss and cur_rss > base_rss * (1 + tolerance) and cur_rss - base_rss > MIN_RSS_DELTA_MB:
+            problems.append(f"{phase}: rss_peak_mb {cur_rss} > {base_rss} (+{tolerance:.0%})")
+    return problems
+
+
+_WORSE_IS_HIGHER = ("error_rate", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+
+def merge_runs(runs: List[Dict[str, Any]], worst: bool) -> Dict[str, Any]:
+    """Fasst mehrere Läufe je Phase und Endpunkt zum schlechtesten bzw. besten Wert zusammen."""
+    merged = json.loads(json.dumps(runs[0]))
+    pick_high, pick_low = (max, min) if worst else (min, max)
+    for run_result in runs[1:]:
+        for phase, data in run_result["phases"].items():
+            target = merged["phases"].setdefault(phase, data)
+            if target is data:
+                continue
+            for key in ("rss_start_mb", "rss_peak_mb"):
+                values = [v for v in (target.get(key), data.get(key)) if v is not None]
+                target[key] = pick_high(values) if values else None
+            for name, stats in data["endpoints"].items():
+                current = target["endpoints"].setdefault(name, stats)
+                for metric in _WORSE_IS_HIGHER:
+                    current[metric] = pick_high(current[metric], stats[metric])
+                current["rps"] = pick_low(current["rps"], stats["rps"])
+                current["requests"] = min(current["requests"], stats["requests"])
+                current["errors"] = max(current["errors"], stats["errors"])
+    merged["config"]["runs"] = len(runs)
+    return merged
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    # Phase als Überschrift (mit Speicher), darunter ihre Endpunkte: Phasennamen
+    # wie mixed[<Szenarien>] können beliebig lang sein
+    width = max([len("endpoint")] + [len(name) + 2 for data in results["phases"].values() for name in data["endpoints"]])
+    header = f"{'endpoint':{width}} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for phase, data in results["phases"].items():
+        print(f"{phase}  (rss MB {data.get('rss_start_mb') or '-'}→{data.get('rss_peak_mb') or '-'})")
+        for name, s in sorted(data["endpoints"].items()):
+            print(
+                f"{'  ' + name:{width}} {s['requests']:>7} {s['errors']:>5} {s['rps']:>8} "
+                f"{s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8}"
+            )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    scenarios = build_scenarios()
+    if args.scenarios:
+        wanted = set(args.scenarios.split(","))
+        unknown = wanted - {s.name for s in scenarios}
+        if unknown:
+            raise SystemExit(f"Unbekannte Szenarien: {', '.join(sorted(unknown))}")
+        scenarios = [s for s in scenarios if s.name in wanted]
+    base_url, fake_proc, app_proc = start_processes(args.workers)
+    phases: Dict[str, Any] = {}
+    try:
+        plan = [] if args.mixed_only else [(s.name, [s]) for s in scenarios]
+        # Eine Teilmischung ist nicht mit der vollen Mischung der Baseline vergleichbar
+        plan.append(("mixed" if not args.scenarios else f"mixed[{args.scenarios}]", scenarios))
+        for seed, (phase, selected) in enumerate(plan, start=1):
+            if args.warmup > 0:
+                await run_phase(base_url, selected, args.warmup, args.concurrency, seed + 100, app_proc.pid)
+            phases[phase] = await run_phase(base_url, selected, args.duration, args.concurrency, seed, app_proc.pid)
+            print(f"  {phase}: fertig", file=sys.stderr)
+    finally:
+        stop_processes(app_proc, fake_proc)
+    return {
+        "config": {
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "phases": phases,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="Messdauer je Phase in Sekunden")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Aufwärmen je Phase in Sekunden (ohne Messung)")
+    parser.add_argument("--concurrency", type=int, default=16, help="gleichzeitige Clients")
+    parser.add_argument("--workers", type=int, default=1, help="Backend-Worker (WEB_CONCURRENCY)")
+    parser.add_argument("--scenarios", help="kommagetrennte Auswahl, Default: alle")
+    parser.add_argument("--mixed-only", action="store_true", help="nur die gemischte Phase")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline-Datei (JSON)")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="erlaubte relative Verschlechterung")
+    parser.add_argument("--runs", type=int, default=1, help="Anzahl Messläufe (siehe oben)")
+    parser.add_argument("--save-baseline", action="store_true", help="Ergebnis als neue Baseline speichern")
+    parser.add_argument("--no-compare", action="store_true", help="nicht mit der Baseline vergleichen")
+    parser.add_argument("--output", help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    runs = []
+    for index in range(max(1, args.runs)):
+        if args.runs > 1:
+            print(f"Lauf {index + 1}/{args.runs}", file=sys.stderr)
+        runs.append(asyncio.run(run(args)))
+    results = merge_runs(runs, worst=args.save_baseline)
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline gespeichert: {args.baseline}")
+        return 0
+    if args.no_compare:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Keine Baseline unter {args.baseline} – mit --save-baseline anlegen")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config", {}).get("concurrency") != args.concurrency:
+        print("Warnung: Baseline mit anderer Parallelität gemessen, Vergleich nur bedingt aussagekräftig")
+    problems = compare(results, baseline, args.tolerance)
+    if problems:
+        print(f"\nREGRESSION gegenüber {os.path.basename(args.baseline)}:")
+        for line in problems:
+            print(f"  ✗ {line}")
+        return 1
+    print(f"\nKeine Regression gegenüber {os.path.basename(args.baseline)} (Toleranz {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""
+Begrenzter In‑Memory‑Cache für asynchron geladene Daten.
+
+``AsyncTTLCache`` kombiniert LRU‑Verdrängung mit einer Gültigkeitsdauer
+(TTL).  Identische, gleichzeitige Fehlzugriffe werden zu einem einzigen
+Upstream‑Aufruf zusammengefasst (Single‑Flight).  Ist ``stale_ttl`` gesetzt,
+werden abgelaufene Einträge innerhalb dieses Fensters sofort ausgeliefert
+und im Hintergrund erneuert (Stale‑While‑Revalidate).  Alle Instanzen
+registrieren sich unter ihrem Namen, damit ``all_stats`` die Zähler
+gesammelt ausgeben kann.
+
+Mit ``shared=True`` liegt hinter dem Prozess‑Cache eine gemeinsame zweite
+Ebene (``set_shared_tier``, z. B. ``RedisCacheTier``).  Bei mehreren Workern
+lädt dann nur der erste einen Schlüssel vom Upstream, alle übrigen finden
+ihn dort; so sinkt die Trefferquote nicht mit der Zahl der Worker.  Einträge
+der zweiten Ebene tragen ihren Schreibzeitpunkt, ihr Alter zählt also über
+Worker hinweg.  Fehler der zweiten Ebene gelten als Fehlzugriff.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, Set, Tuple, TypeVar
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:  # pragma: no cover - optionales Paket
+    aioredis = None  # type: ignore
+
+logger = logging.getLogger("server.cache")
+
+V = TypeVar("V")
+
+_REGISTRY: Dict[str, "AsyncTTLCache[Any]"] = {}
+_REDIS_CLIENTS: Dict[str, Any] = {}
+_SHARED_TIER: Any = None
+
+
+def redis_client(url: str) -> Any:
+    """Ein ``redis.asyncio``‑Client (mit Verbindungspool) pro URL für alle Caches und Speicher."""
+    client = _REDIS_CLIENTS.get(url)
+    if client is None:
+        client = _REDIS_CLIENTS[url] = aioredis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return client
+
+
+class RedisCacheTier:
+    """Gemeinsame zweite Cache‑Ebene in Redis: JSON mit Schreibzeitpunkt, Ablauf per ``EX``."""
+
+    name = "redis"
+
+    def __init__(self, client: Any, prefix: str = "akut:cache:") -> None:
+        self.redis = client
+        self.prefix = prefix
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Tuple[float, Any]]]:
+        raws = await self.redis.mget([self.prefix + key for key in keys])
+        result: List[Optional[Tuple[float, Any]]] = []
+        for raw in raws:
+            entry = json.loads(raw) if raw else None
+            result.append((entry["t"], entry["v"]) if entry else None)
+        return result
+
+    async def set_many(self, items: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                payload = json.dumps({"t": now, "v": value}, ensure_ascii=False, separators=(",", ":"))
+                pipe.set(self.prefix + key, payload, ex=max(1, int(ttl)))
+            await pipe.execute()
+
+
+def shared_tier_from_env(redis_url: Optional[str]) -> Optional[RedisCacheTier]:
+    if redis_url and aioredis is not None:
+        return RedisCacheTier(redis_client(redis_url))
+    if redis_url:
+        logger.warning("REDIS_URL gesetzt, aber das Paket 'redis' fehlt – Caches nur im Prozess")
+    return None
+
+
+def set_shared_tier(tier: Any) -> None:
+    """Setzt die zweite Ebene für alle Caches mit ``shared=True`` (``None`` = nur im Prozess)."""
+    global _SHARED_TIER
+    _SHARED_TIER = tier
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    refreshes: int = 0
+    evictions: int = 0
+    errors: int = 0
+    shared_hits: int = 0
+    shared_errors: int = 0
+
+
+class AsyncTTLCache(Generic[V]):
+    """
+    LRU‑Cache mit TTL, Single‑Flight und optionalem Stale‑While‑Revalidate.
+
+    - ``max_entries``: Obergrenze der Einträge; der am längsten nicht
+      genutzte Eintrag wird verdrängt.
+    - ``ttl``: Sekunden, in denen ein Eintrag als frisch gilt.
+    - ``stale_ttl``: zusätzliche Sekunden, in denen ein abgelaufener Eintrag
+      noch ausgeliefert und im Hintergrund aktualisiert wird (0 = aus).
+    - ``shared``: Fehlzugriffe zuerst in der gemeinsamen zweiten Ebene
+      nachschlagen und geladene Werte dort ablegen (Werte müssen JSON sein).
+    - ``register``: in ``all_stats`` aufführen; aus, wenn ein Aufrufer die
+      Zähler selbst ausweist (sonst erschiene derselbe Cache doppelt).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        stale_ttl: float = 0.0,
+        shared: bool = False,
+        register: bool = True,
+    ) -> None:
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.shared = shared
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._inflight: Dict[Hashable, "asyncio.Task[V]"] = {}
+        self._writes: Set["asyncio.Task[None]"] = set()
+        if register:
+            _REGISTRY[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable) -> Tuple[Optional[V], Optional[float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        stored_at, value = entry
+        return value, time.monotonic() - stored_at
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Liefert einen frischen Eintrag oder None (ohne Upstream‑Aufruf); zählt Treffer und Fehlzugriffe."""
+        value, age = self._lookup(key)
+        if age is None or age >= self.ttl:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Optional[V]:
+        """Wie ``get``, aber ohne Zähler und ohne LRU‑Auffrischung (z. B. vor ``get_or_fetch``)."""
+        value, age = self._lookup(key)
+        return None if age is None or age >= self.ttl else value
+
+    def set(self, key: Hashable, value: V, age: float = 0.0) -> None:
+        self._entries[key] = (time.monotonic() - age, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def _tier(self) -> Any:
+        return _SHARED_TIER if self.shared else None
+
+    def _shared_key(self, key: Hashable) -> str:
+        return self.name + ":" + json.dumps(key, default=str, separators=(",", ":"))
+
+    async def _shared_lookup(self, keys: List[Hashable]) -> Dict[Hashable, Tuple[float, V]]:
+        """Frische Einträge der zweiten Ebene als ``{key: (Alter, Wert)}``."""
+        tier = self._tier()
+        if tier is None or not keys:
+            return {}
+        try:
+            entries = await tier.get_many([self._shared_key(key) for key in keys])
+        except Exception as e:
+            self.stats.shared_errors += 1
+            logger.warning(f"cache[{self.name}]: gemeinsame Ebene nicht lesbar: {e}")
+            return {}
+        found: Dict[Hashable, Tuple[float, V]] = {}
+        for key, entry in zip(keys, entries):
+            if entry is not None:
+                age = max(0.0, time.time() - entry[0])
+                if age < self.ttl:
+                    found[key] = (age, entry[1])
+        self.stats.shared_hits += len(found)
+        return found
+
+    def _shared_store(self, values: Dict[Hashable, V]) -> None:
+        """Schreibt im Hintergrund, die Antwort wartet nicht auf die zweite Ebene."""
+        tier = self._tier()
+        if tier is None or not values:
+            return
+        task = asyncio.ensure_future(self._write_shared(tier, {self._shared_key(k): v for k, v in values.items()}))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write_shared(self, tier: Any, items: Dict[str, Any]) -> None:
+        try:
+            await tier.set_many(items, self.ttl + self.stale_ttl)
+        except Exception as e:
+            self.stats.shared_errors += 1
+            logger.warning(f"cache[{self.name}]: gemeinsame Ebene nicht beschreibbar: {e}")
+
+    async def _load(self, key: Hashable, fetch: Callable[[], Awaitable[V]]) -> V:
+        try:
+            found = await self._shared_lookup([key])
+            if key in found:
+                age, value = found[key]
+                self.set(key, value, age)
+                return value
+            value = await fetch()
+        except BaseException:
+            self.stats.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.set(key, value)
+        self._shared_store({key: value})
+        return value
+
+    def _start_load(self, key: Hashable, fetch: Callable[[], Awaitable[V]]) -> "asyncio.Task[V]":
+        task = asyncio.ensure_future(self._load(key, fetch))
+        self._inflight[key] = task
+        return task
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[V]]) -> V:
+        """
+        Gibt den Wert zu ``key`` zurück und ruft ``fetch`` nur auf, wenn kein
+        verwendbarer Eintrag existiert und noch kein Abruf für denselben
+        Schlüssel läuft.  Fehler von ``fetch`` werden nicht gecacht.
+        """
+        value, age = self._lookup(key)
+        if age is not None and age < self.ttl:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value  # type: ignore[return-value]
+        if age is not None and age < self.ttl + self.stale_ttl:
+            self._entries.move_to_end(key)
+            self.stats.stale_hits += 1
+            if key not in self._inflight:
+                self.stats.refreshes += 1
+                task = self._start_load(key, fetch)
+                task.add_done_callback(self._log_refresh_error)
+            return value  # type: ignore[return-value]
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+            task = self._start_load(key, fetch)
+        # shield: bricht ein Client ab, läuft der gemeinsame Abruf für die übrigen weiter
+        return await asyncio.shield(task)
+
+    async def get_many_or_fetch(
+        self,
+        keys: Iterable[Hashable],
+        fetch_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, V]]],
+    ) -> Dict[Hashable, V]:
+        """
+        Wie ``get_or_fetch`` für mehrere Schlüssel: Alle fehlenden (und zu
+        erneuernden) Schlüssel werden in einem einzigen ``fetch_many``‑Aufruf
+        geladen.  Schlüssel, die bereits von einem anderen Aufruf geladen
+        werden, werden nicht erneut angefragt.  ``fetch_many`` muss für jeden
+        übergebenen Schlüssel einen Wert liefern.
+        """
+        result: Dict[Hashable, V] = {}
+        pending: Dict[Hashable, "asyncio.Future[V]"] = {}
+        to_load: List[Hashable] = []
+        to_refresh: List[Hashable] = []
+        for key in dict.fromkeys(keys):
+            value, age = self._lookup(key)
+            if age is not None and age < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                result[key] = value  # type: ignore[assignment]
+            elif age is not None and age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stats.stale_hits += 1
+                result[key] = value  # type: ignore[assignment]
+                if key not in self._inflight:
+                    self.stats.refreshes += 1
+                    to_refresh.append(key)
+            elif key in self._inflight:
+                self.stats.coalesced += 1
+                pending[key] = self._inflight[key]
+            else:
+                self.stats.misses += 1
+                to_load.append(key)
+        batch_keys = to_load + to_refresh
+        if batch_keys:
+            batch = asyncio.ensure_future(self._load_many(batch_keys, fetch_many))
+            loading = set(to_load)
+            for key in batch_keys:
+                task = asyncio.ensure_future(self._pick(batch, key))
+                self._inflight[key] = task
+                if key in loading:
+                    pending[key] = task
+                else:
+                    task.add_done_callback(self._log_refresh_error)
+        if pending:
+            values = await asyncio.shield(asyncio.gather(*pending.values()))
+            result.update(zip(pending.keys(), values))
+        return result
+
+    async def _load_many(
+        self,
+        keys: List[Hashable],
+        fetch_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, V]]],
+    ) -> Dict[Hashable, V]:
+        try:
+            found = await self._shared_lookup(keys)
+            missing = [key for key in keys if key not in found]
+            fetched = await fetch_many(missing) if missing else {}
+        except BaseException:
+            self.stats.errors += 1
+            raise
+        finally:
+            for key in keys:
+                self._inflight.pop(key, None)
+        values: Dict[Hashable, V] = {}
+        for key, (age, value) in found.items():
+            self.set(key, value, age)
+            values[key] = value
+        for key in missing:
+            self.set(key, fetched[key])
+            values[key] = fetched[key]
+        self._shared_store({key: fetched[key] for key in missing})
+        return values
+
+    @staticmethod
+    async def _pick(batch: "asyncio.Future[Dict[Hashable, V]]", key: Hashable) -> V:
+        return (await batch)[key]
+
+    def _log_refresh_error(self, task: "asyncio.Task[V]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"cache[{self.name}]: Hintergrund-Aktualisierung fehlgeschlagen: {task.exception()}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = asdict(self.stats)
+        data.update(
+            size=len(self._entries),
+            max_entries=self.max_entries,
+            inflight=len(self._inflight),
+            shared=getattr(self._tier(), "name", None),
+        )
+        return data
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    """Zähler aller registrierten Caches, nach Namen sortiert."""
+    return {name: _REGISTRY[name].snapshot() for name in sorted(_REGISTRY)}
@@ -0,0 +1,214 @@
+"""
+Begrenzung des Gesprächsverlaufs für ``/api/chat`` und ``/api/gpt-chat``.
+
+Die Frontends schicken bei jeder Nachricht den kompletten Verlauf mit.  Lange
+Sitzungen werden dadurch mit jeder Runde langsamer und teurer und laufen
+irgendwann über das Kontextfenster.  ``HistoryManager.compact``
+
+- behält alle System‑Nachrichten,
+- behält die jüngsten Nachrichten (mindestens ``keep_last`` Stück),
+- fasst ältere Nachrichten zu einer fortlaufenden Zusammenfassung als
+  System‑Nachricht zusammen (je Nachricht der erste Satz, höchstens
+  ``summary_budget`` Tokens; bei Platzmangel fallen die ältesten Zeilen weg).
+  Eine Zusammenfassung aus einer früheren Kürzung wird fortgeschrieben.
+
+Gekürzt wird erst oberhalb von ``budget``, dann aber auf ``target`` (Default
+zwei Drittel des Budgets).  Danach wächst der Verlauf wieder einige Runden
+nur am Ende, sodass der Anfang des Prompts stabil bleibt (Prompt‑Caching
+des Anbieters, gespeicherte Sitzungen).
+
+Die Zusammenfassung ist bewusst extraktiv: ein zusätzlicher Modellaufruf pro
+Anfrage würde die Latenz verdoppeln, die eingespart werden soll.
+
+Tokens werden mit ``tiktoken`` gezählt, falls installiert (Encoding und
+Zählung je Text sind gecacht, der Verlauf wiederholt sich von Anfrage zu
+Anfrage); sonst wird mit ~4 Zeichen pro Token geschätzt.  Gecacht werden
+nur Texte bis ``CACHE_MAX_CHARS`` Zeichen: Einträge sind sonst beliebig
+groß, und große Verläufe könnten viel Speicher im Cache festhalten.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken  # type: ignore
+except Exception:  # pragma: no cover - optionales Paket
+    tiktoken = None  # type: ignore
+
+logger = logging.getLogger("server.chat_history")
+
+Message = Dict[str, Any]
+
+# Aufschlag pro Nachricht (Rolle, Trennzeichen) laut OpenAI‑Cookbook
+MESSAGE_OVERHEAD = 4
+CHARS_PER_TOKEN = 4
+SUMMARY_HEADER = "Zusammenfassung des bisherigen Gesprächs:"
+_ROLE_NAMES = {"user": "Nutzer", "assistant": "Assistent"}
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s")
+# Längere Texte werden jedes Mal neu berechnet statt gecacht
+CACHE_MAX_CHARS = 4096
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str) -> Any:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # z. B. ohne Netz: BPE‑Dateien nicht ladbar
+        logger.warning(f"tiktoken nicht nutzbar, schätze Tokens: {e}")
+        return None
+
+
+def count_text_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    if len(text) > CACHE_MAX_CHARS:
+        return _count_text_tokens(text, model)
+    return _count_text_tokens_cached(text, model)
+
+
+@lru_cache(maxsize=8192)
+def _count_text_tokens_cached(text: str, model: str) -> int:
+    return _count_text_tokens(text, model)
+
+
+def _count_text_tokens(text: str, model: str) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text))
+
+
+def _content(message: Message) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        # Inhalte im Teile‑Format (z. B. [{"type": "text", "text": ...}])
+        return " ".join(str(part.get("text", "")) for part in content if isinstance(part, dict))
+    return "" if content is None else str(content)
+
+
+def count_message_tokens(message: Message, model: str = "gpt-3.5-turbo") -> int:
+    return MESSAGE_OVERHEAD + count_text_tokens(_content(message), model)
+
+
+def _is_summary(message: Message) -> bool:
+    return _content(message).startswith(SUMMARY_HEADER)
+
+
+def _summary_line(role: str, text: str, max_chars: int = 200) -> str:
+    if len(text) > CACHE_MAX_CHARS:
+        return _build_summary_line(role, text, max_chars)
+    return _summary_line_cached(role, text, max_chars)
+
+
+@lru_cache(maxsize=4096)
+def _summary_line_cached(role: str, text: str, max_chars: int) -> str:
+    return _build_summary_line(role, text, max_chars)
+
+
+def _build_summary_line(role: str, text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    first = _SENTENCE_RE.split(text, maxsplit=1)[0]
+    if len(first) > max_chars:
+        first = first[: max_chars - 1].rstrip() + "…"
+    return f"- {_ROLE_NAMES.get(role, role)}: {first}"
+
+
+def session_history(messages: List[Message]) -> List[Message]:
+    """
+    Was eine gespeicherte Sitzung enthält: Nutzer‑ und Assistenten‑Nachrichten
+    sowie die Zusammenfassung.  System‑Prompts kommen pro Anfrage neu dazu;
+    gespeichert würden sie sich mit jeder Runde im Verlauf wiederholen.
+    """
+    return [m for m in messages if m.get("role") != "system" or _is_summary(m)]
+
+
+@dataclass
+class Compaction:
+    messages: List[Message]
+    tokens_before: int
+    tokens_after: int
+    collapsed: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_before - self.tokens_after)
+
+
+class HistoryManager:
+    """Kürzt Chat‑Verläufe auf ``budget`` Tokens (ohne die Antwort des Modells)."""
+
+    def __init__(
+        self, budget: int = 3000, keep_last: int = 4, summary_budget: int = 300, target: Optional[int] = None
+    ) -> None:
+        self.budget = budget
+        self.keep_last = max(1, keep_last)
+        self.summary_budget = summary_budget
+        self.target = min(budget, target if target is not None else budget * 2 // 3)
+        self.stats: Dict[str, int] = {"requests": 0, "compacted": 0, "collapsed": 0, "tokens_saved": 0}
+
+    def count(self, messages: List[Message], model: str = "gpt-3.5-turbo") -> int:
+        return sum(count_message_tokens(m, model) for m in messages)
+
+    def _summary(self, prior: List[Message], older: List[Message], model: str) -> Optional[Message]:
+        candidates: List[str] = []
+        for message in prior:
+            candidates.extend(line for line in _content(message).splitlines()[1:] if line.strip())
+        for message in older:
+            text = _content(message)
+            if text.strip():
+                candidates.append(_summary_line(str(message.get("role") or "user"), text))
+        lines: List[str] = []
+        used = count_message_tokens({"content": SUMMARY_HEADER}, model)
+        # Von neu nach alt, damit bei Platzmangel die ältesten Zeilen wegfallen
+        for line in reversed(candidates):
+            cost = count_text_tokens(line, model) + 1
+            if used + cost > self.summary_budget:
+                break
+            lines.append(line)
+            used += cost
+        if not lines:
+            return None
+        return {"role": "system", "content": "\n".join([SUMMARY_HEADER] + lines[::-1])}
+
+    def compact(self, messages: List[Message], model: str = "gpt-3.5-turbo") -> Compaction:
+        messages = [m for m in messages if isinstance(m, dict)]
+        before = self.count(messages, model)
+        self.stats["requests"] += 1
+        if before <= self.budget:
+            return Compaction(messages, before, before)
+
+        system = [m for m in messages if m.get("role") == "system" and not _is_summary(m)]
+        prior = [m for m in messages if m.get("role") == "system" and _is_summary(m)]
+        turns = [m for m in messages if m.get("role") != "system"]
+        available = self.target - self.count(system, model) - self.summary_budget
+        keep = 0
+        used = 0
+        for message in reversed(turns):
+            cost = count_message_tokens(message, model)
+            if keep >= self.keep_last and used + cost > available:
+                break
+            keep += 1
+            used += cost
+        older, recent = turns[: len(turns) - keep], turns[len(turns) - keep :]
+        if not older:
+            return Compaction(messages, before, before)
+        summary = self._summary(prior, older, model)
+        compacted = system + ([summary] if summary else []) + recent
+        result = Compaction(compacted, before, self.count(compacted, model), collapsed=len(older))
+        self.stats["compacted"] += 1
+        self.stats["collapsed"] += result.collapsed
+        self.stats["tokens_saved"] += result.tokens_saved
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "budget": self.budget,
+            "tokenizer": "tiktoken" if _encoding("gpt-3.5-turbo") is not None else "estimate",
+        }
@@ -0,0 +1,119 @@
+"""
+Serverseitige Chat‑Sitzungen für ``/api/chat`` und ``/api/gpt-chat``.
+
+Ohne Sitzung schicken die Frontends bei jeder Nachricht den gesamten
+Verlauf mit; über langsame Mobilverbindungen bestimmt dieser Upload die
+Antwortzeit.  Mit Sitzung hält der Server den Verlauf unter einer von ihm
+vergebenen ID, der Client schickt nur noch die neue Nachricht.
+
+Gespeichert wird der Verlauf so, wie er an das Modell ging (bereits
+gekürzt, siehe ``chat_history``), plus der Antwort.  Bis zur nächsten
+Kürzung wächst er nur am Ende, der Anfang des Prompts bleibt also von
+Anfrage zu Anfrage gleich – Voraussetzung für das Prompt‑Caching des
+Anbieters.
+
+Ist ``REDIS_URL`` gesetzt, teilen sich alle Worker die Sitzungen in Redis
+(JSON, Ablauf per ``EX``).  Andernfalls – oder wenn das Paket ``redis``
+fehlt – liegen sie in einem ``AsyncTTLCache`` im Prozess.  Jedes Speichern
+verlängert die Gültigkeit.  Gleichzeitige Anfragen derselben Sitzung
+überschreiben sich (die letzte gewinnt).
+"""
+
+import json
+import logging
+import re
+import secrets
+from typing import Any, Dict, List, Optional
+
+from cache import AsyncTTLCache, redis_client
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:  # pragma: no cover - optionales Paket
+    aioredis = None  # type: ignore
+
+logger = logging.getLogger("server.chat_sessions")
+
+Message = Dict[str, Any]
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+class MemorySessionBackend:
+    """Prozesslokale Sitzungen (LRU + TTL) auf Basis von ``AsyncTTLCache``."""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self._cache: AsyncTTLCache[List[Message]] = AsyncTTLCache("chat_sessions", max_entries=max_entries, ttl=ttl)
+
+    async def load(self, session_id: str) -> Optional[List[Message]]:
+        messages = self._cache.get(session_id)
+        return list(messages) if messages is not None else None
+
+    async def save(self, session_id: str, messages: List[Message]) -> None:
+        self._cache.set(session_id, list(messages))
+
+
+class RedisSessionBackend:
+    """Gemeinsame Sitzungen in Redis; jeder Eintrag verfällt nach ``ttl`` Sekunden ohne Schreibzugriff."""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "akut:chat:") -> None:
+        self.redis = redis_client(url)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    async def load(self, session_id: str) -> Optional[List[Message]]:
+        raw = await self.redis.get(self.prefix + session_id)
+        return json.loads(raw) if raw else None
+
+    async def save(self, session_id: str, messages: List[Message]) -> None:
+        await self.redis.set(self.prefix + session_id, json.dumps(messages, ensure_ascii=False), ex=self.ttl)
+
+
+class ChatSessionStore:
+    """Fassade über das konfigurierte Backend; Fehler des Backends beenden keine Anfrage."""
+
+    def __init__(self, backend: Any, max_messages: int = 200) -> None:
+        self.backend = backend
+        self.max_messages = max(2, max_messages)
+        self.stats: Dict[str, int] = {"created": 0, "resumed": 0, "expired": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls, redis_url: Optional[str], max_entries: int, ttl: float, max_messages: int) -> "ChatSessionStore":
+        if redis_url and aioredis is not None:
+            return cls(RedisSessionBackend(redis_url, ttl), max_messages)
+        if redis_url:
+            logger.warning("REDIS_URL gesetzt, aber das Paket 'redis' fehlt – Chat-Sitzungen im Prozess")
+        return cls(MemorySessionBackend(max_entries, ttl), max_messages)
+
+    def new_id(self) -> str:
+        self.stats["created"] += 1
+        return secrets.token_urlsafe(16)
+
+    async def load(self, session_id: Optional[str]) -> Optional[List[Message]]:
+        """Gespeicherter Verlauf oder ``None`` (unbekannte, abgelaufene oder ungültige ID)."""
+        if not session_id or not _SESSION_ID_RE.match(str(session_id)):
+            return None
+        try:
+            messages = await self.backend.load(str(session_id))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Chat-Sitzung nicht lesbar: {e}")
+            messages = None
+        if messages is None:
+            self.stats["expired"] += 1
+        else:
+            self.stats["resumed"] += 1
+        return messages
+
+    async def save(self, session_id: str, messages: List[Message]) -> None:
+        try:
+            await self.backend.save(session_id, messages[-self.max_messages :])
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Chat-Sitzung nicht speicherbar: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if isinstance(self.backend, RedisSessionBackend) else "memory",
+            **self.stats,
+        }
@@ -0,0 +1,369 @@
+"""
+Hintergrund‑Import der MoWaS‑Warnmeldungen des Bundes (NINA).
+
+Ein Poller ruft ``mapData.json`` in festen Abständen mit bedingten Anfragen
+(``If-None-Match`` / ``If-Modified-Since``) ab.  Die Liste wird mit dem
+bisherigen Stand verglichen: Nur neue oder in ihrer Version geänderte
+Warnungen werden nachgeladen (``/warnings/{id}.geojson``), entfallene
+Warnungen werden entfernt.  Schlägt das Laden einer Geometrie fehl, bleibt
+die Warnung auf einer Wiederholungsliste und wird bei jedem weiteren Abruf
+erneut geladen – auch wenn der Feed selbst unverändert (304) ist.  Bis
+dahin gilt die zuletzt geladene Version weiter.  Die Polygone liegen in einem einfachen
+Gitter‑Index, sodass ``lookup(lat, lon)`` per Punkt‑in‑Polygon‑Test
+beantwortet, welche Warnungen eine Position betreffen.
+
+Statt des Live‑Dienstes kann ``ReplaySource`` aufgezeichnete Feed‑Dateien
+abspielen (z. B. für Tests oder lokale Entwicklung).
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol, Set, Tuple
+
+from .upstream import UpstreamError, UpstreamPool
+
+logger = logging.getLogger("server.mowas")
+
+MOWAS_BASE_URL = "https://warnung.bund.de/api31"
+
+Ring = List[Tuple[float, float]]  # [(lon, lat), ...]
+Polygon = List[Ring]  # Außenring, danach Löcher
+
+
+# ----------------------------------------------------------------------
+# Geometrie
+# ----------------------------------------------------------------------
+
+def _point_in_ring(lon: float, lat: float, ring: Ring) -> bool:
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def point_in_polygon(lon: float, lat: float, polygon: Polygon) -> bool:
+    """Punkt im Außenring und in keinem Loch?"""
+    if not polygon or not _point_in_ring(lon, lat, polygon[0]):
+        return False
+    return not any(_point_in_ring(lon, lat, hole) for hole in polygon[1:])
+
+
+def polygons_from_geojson(data: Dict[str, Any]) -> List[Polygon]:
+    """Alle (Multi‑)Polygone aus einer Feature(Collection) oder Geometrie."""
+    polygons: List[Polygon] = []
+
+    def visit(geom: Optional[Dict[str, Any]]) -> None:
+        if not geom:
+            return
+        gtype = geom.get("type")
+        if gtype == "FeatureCollection":
+            for feature in geom.get("features") or []:
+                visit(feature)
+        elif gtype == "Feature":
+            visit(geom.get("geometry"))
+        elif gtype == "GeometryCollection":
+            for g in geom.get("geometries") or []:
+                visit(g)
+        elif gtype == "Polygon":
+            polygons.append([[(float(x), float(y)) for x, y, *_ in ring] for ring in geom.get("coordinates") or []])
+        elif gtype == "MultiPolygon":
+            for poly in geom.get("coordinates") or []:
+                polygons.append([[(float(x), float(y)) for x, y, *_ in ring] for ring in poly])
+
+    visit(data)
+    return [p for p in polygons if p and len(p[0]) >= 3]
+
+
+def _bbox(polygon: Polygon) -> Tuple[float, float, float, float]:
+    xs = [x for x, _ in polygon[0]]
+    ys = [y for _, y in polygon[0]]
+    return min(ys), min(xs), max(ys), max(xs)
+
+
+class PolygonGridIndex:
+    """
+    Gitter‑Index über Polygon‑Bounding‑Boxen.  Jede Zelle (``cell_deg``
+    Grad) kennt die Warnungen, deren Polygone sie berühren.
+    """
+
+    def __init__(self, cell_deg: float = 0.25) -> None:
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        # warning_id -> Liste (bbox, polygon)
+        self._shapes: Dict[str, List[Tuple[Tuple[float, float, float, float], Polygon]]] = {}
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def add(self, warning_id: str, polygons: List[Polygon]) -> None:
+        self.remove(warning_id)
+        shapes = [(_bbox(p), p) for p in polygons]
+        self._shapes[warning_id] = shapes
+        for (min_lat, min_lon, max_lat, max_lon), _ in shapes:
+            r0, c0 = self._cell(min_lat, min_lon)
+            r1, c1 = self._cell(max_lat, max_lon)
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    self._cells.setdefault((r, c), set()).add(warning_id)
+
+    def remove(self, warning_id: str) -> None:
+        shapes = self._shapes.pop(warning_id, None)
+        if not shapes:
+            return
+        for (min_lat, min_lon, max_lat, max_lon), _ in shapes:
+            r0, c0 = self._cell(min_lat, min_lon)
+            r1, c1 = self._cell(max_lat, max_lon)
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    ids = self._cells.get((r, c))
+                    if ids is not None:
+                        ids.discard(warning_id)
+                        if not ids:
+                            del self._cells[(r, c)]
+
+    def lookup(self, lat: float, lon: float) -> List[str]:
+        hits: List[str] = []
+        for warning_id in self._cells.get(self._cell(lat, lon), ()):
+            for (min_lat, min_lon, max_lat, max_lon), polygon in self._shapes.get(warning_id, []):
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon and point_in_polygon(lon, lat, polygon):
+                    hits.append(warning_id)
+                    break
+        return hits
+
+    def __len__(self) -> int:
+        return len(self._shapes)
+
+
+# ----------------------------------------------------------------------
+# Datenquellen
+# ----------------------------------------------------------------------
+
+@dataclass
+class FeedResult:
+    """Ergebnis eines Abrufs von mapData.json; ``items`` ist None bei 304."""
+
+    items: Optional[List[Dict[str, Any]]]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class WarningSource(Protocol):
+    async def fetch_map(self, etag: Optional[str], last_modified: Optional[str]) -> FeedResult: ...
+
+    async def fetch_geojson(self, warning_id: str) -> Optional[Dict[str, Any]]: ...
+
+
+class LiveSource:
+    """Abruf über den gemeinsamen Upstream‑Client (Upstream ``mowas``)."""
+
+    def __init__(self, pool: UpstreamPool, base_url: str = MOWAS_BASE_URL) -> None:
+        self.pool = pool
+        self.base_url = base_url.rstrip("/")
+
+    async def fetch_map(self, etag: Optional[str], last_modified: Optional[str]) -> FeedResult:
+        headers: Dict[str, str] = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        resp = await self.pool.get("mowas", f"{self.base_url}/mowas/mapData.json", headers=headers, accept=(304,))
+        if resp.status_code == 304:
+            return FeedResult(None, etag, last_modified)
+        return FeedResult(resp.json(), resp.headers.get("etag"), resp.headers.get("last-modified"))
+
+    async def fetch_geojson(self, warning_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            resp = await self.pool.get("mowas", f"{self.base_url}/warnings/{warning_id}.geojson")
+        except UpstreamError as e:
+            logger.warning(f"MoWaS-Geometrie für {warning_id} nicht verfügbar: {e}")
+            return None
+        return resp.json()
+
+
+class ReplaySource:
+    """
+    Spielt aufgezeichnete Feeds ab.  ``directory`` enthält
+    ``mapData*.json``‑Dateien (in Sortierreihenfolge, eine pro Abruf; nach
+    der letzten Datei wird 304 gemeldet) und die Geometrien als
+    ``{id}.geojson``.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._files = sorted(glob.glob(os.path.join(directory, "mapData*.json")))
+        self._pos = 0
+
+    async def fetch_map(self, etag: Optional[str], last_modified: Optional[str]) -> FeedResult:
+        if self._pos >= len(self._files):
+            return FeedResult(None, etag, last_modified)
+        path = self._files[self._pos]
+        self._pos += 1
+        with open(path, encoding="utf-8") as f:
+            items = json.load(f)
+        return FeedResult(items, etag=f'"{os.path.basename(path)}"')
+
+    async def fetch_geojson(self, warning_id: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.directory, f"{warning_id}.geojson")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+# ----------------------------------------------------------------------
+# Ingester
+# ----------------------------------------------------------------------
+
+@dataclass
+class IngestStats:
+    polls: int = 0
+    not_modified: int = 0
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    errors: int = 0
+    geometry_errors: int = 0
+    last_success: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+def _summary(item: Dict[str, Any]) -> Dict[str, Any]:
+    title = item.get("i18nTitle") or {}
+    return {
+        "id": item.get("id"),
+        "version": item.get("version"),
+        "title": title.get("de") or next(iter(title.values()), None),
+        "i18nTitle": title or None,
+        "severity": item.get("severity"),
+        "urgency": item.get("urgency"),
+        "type": item.get("type"),
+        "startDate": item.get("startDate"),
+        "expiresDate": item.get("expiresDate"),
+    }
+
+
+class MowasIngester:
+    """Hält die aktiven Warnungen samt Polygon‑Index und aktualisiert sie per Poll."""
+
+    def __init__(self, source: WarningSource, interval: float = 60.0, geometry_concurrency: int = 4) -> None:
+        self.source = source
+        self.interval = interval
+        self.geometry_concurrency = geometry_concurrency
+        self.items: List[Dict[str, Any]] = []
+        # Nur Warnungen, deren Geometrie geladen ist (bzw. deren letzte geladene Version)
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        # Warnungen, deren (neue) Geometrie noch fehlt: id -> Feed‑Eintrag
+        self._retry: Dict[str, Dict[str, Any]] = {}
+        self.index = PolygonGridIndex()
+        self.stats = IngestStats()
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.stats.last_success is not None
+
+    @property
+    def pending_geometries(self) -> int:
+        return len(self._retry)
+
+    async def _load_geometries(self, pending: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Lädt die Geometrien zu ``pending`` und übernimmt nur erfolgreich geladene Warnungen."""
+        sem = asyncio.Semaphore(self.geometry_concurrency)
+
+        async def load(wid: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+            async with sem:
+                return wid, await self.source.fetch_geojson(wid)
+
+        loaded: List[str] = []
+        for wid, geojson in await asyncio.gather(*(load(wid) for wid in pending)):
+            if geojson is None:
+                # alte Version (falls vorhanden) bleibt aktiv, neuer Versuch beim nächsten Abruf
+                self._retry[wid] = pending[wid]
+                self.stats.geometry_errors += 1
+                continue
+            if wid in self._by_id:
+                self.stats.updated += 1
+            else:
+                self.stats.added += 1
+            self.index.add(wid, polygons_from_geojson(geojson))
+            self._by_id[wid] = pending[wid]
+            self._retry.pop(wid, None)
+            loaded.append(wid)
+        return loaded
+
+    async def poll_once(self) -> bool:
+        """Ein Abruf inkl. Diff; gibt True zurück, wenn sich etwas geändert hat."""
+        self.stats.polls += 1
+        result = await self.source.fetch_map(self._etag, self._last_modified)
+        if result.items is None:
+            self.stats.not_modified += 1
+            loaded = await self._load_geometries(dict(self._retry)) if self._retry else []
+            self.stats.last_success = time.time()
+            return bool(loaded)
+        items = [it for it in result.items if isinstance(it, dict) and it.get("id")]
+        new_by_id = {str(it["id"]): it for it in items}
+        removed = (set(self._by_id) | set(self._retry)) - set(new_by_id)
+        for wid in removed:
+            self.index.remove(wid)
+            self._by_id.pop(wid, None)
+            self._retry.pop(wid, None)
+        changed = {
+            wid: it for wid, it in new_by_id.items()
+            if wid not in self._by_id or self._by_id[wid].get("version") != it.get("version")
+        }
+        for wid in set(self._retry) - set(changed):
+            # Feed zeigt wieder die bereits geladene Version
+            del self._retry[wid]
+        loaded = await self._load_geometries(changed)
+        self.stats.removed += len(removed)
+        self.items = items
+        self._etag, self._last_modified = result.etag, result.last_modified
+        self.stats.last_success = time.time()
+        if changed or removed:
+            logger.info(
+                f"MoWaS: {len(loaded)} neu/geändert, {len(removed)} entfernt, {len(items)} aktiv, "
+                f"{len(self._retry)} Geometrien ausstehend"
+            )
+        return bool(loaded or removed)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.errors += 1
+                self.stats.last_error = str(e)
+                logger.warning(f"MoWaS-Abruf fehlgeschlagen: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def lookup(self, lat: float, lon: float) -> List[Dict[str, Any]]:
+        """Zusammenfassungen aller aktiven Warnungen, deren Gebiet den Punkt enthält."""
+        return [_summary(self._by_id[wid]) for wid in self.index.lookup(lat, lon) if wid in self._by_id]
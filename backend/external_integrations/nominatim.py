@@ -0,0 +1,265 @@
+"""
+Geocoding über Nominatim mit Ratenbegrenzung, Cache und lokaler Vervollständigung.
+
+Die Nutzungsbedingungen von nominatim.openstreetmap.org erlauben höchstens
+eine Anfrage pro Sekunde.  Alle Upstream‑Aufrufe laufen deshalb durch einen
+gemeinsamen Token‑Bucket; wer innerhalb von ``max_wait`` Sekunden keinen
+Token bekommt, erhält die lokal bekannten Treffer statt einer Sperre durch
+den Dienst.
+
+Aufgelöste Anfragen landen in drei Ebenen:
+
+1. einem ``AsyncTTLCache`` im Speicher (fasst gleichzeitige identische
+   Anfragen zu einem Abruf zusammen),
+2. einer MongoDB‑Collection, damit Ergebnisse Neustarts überleben, und
+3. einem Präfix‑Index über alle bekannten Orte, der Eingaben während des
+   Tippens (``autocomplete``) ohne Upstream‑Aufruf beantwortet.
+"""
+
+import asyncio
+import bisect
+import datetime
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from cache import AsyncTTLCache
+from .upstream import UpstreamError, UpstreamPool
+
+logger = logging.getLogger("server.nominatim")
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+Place = Dict[str, Any]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_query(q: str) -> str:
+    """Kleinschreibung und zusammengefasste Leerzeichen als Cache‑Schlüssel."""
+    return " ".join(q.casefold().split())
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.casefold())
+
+
+class TokenBucket:
+    """Token‑Bucket mit ``rate`` Tokens pro Sekunde und ``burst`` Kapazität."""
+
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, max_wait: float) -> bool:
+        """Wartet höchstens ``max_wait`` Sekunden auf einen Token (FIFO)."""
+        deadline = time.monotonic() + max_wait
+        if self._lock.locked() and max_wait <= 0:
+            return False
+        try:
+            await asyncio.wait_for(self._lock.acquire(), timeout=max(max_wait, 0.001))
+        except asyncio.TimeoutError:
+            return False
+        try:
+            while True:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+                if time.monotonic() + wait > deadline:
+                    return False
+                await asyncio.sleep(wait)
+        finally:
+            self._lock.release()
+
+
+class PlacePrefixIndex:
+    """
+    Präfix‑Index über die Tokens der ``display_name`` bekannter Orte.  Das
+    letzte Wort einer Anfrage wird als Präfix behandelt, alle vorherigen
+    müssen vollständig vorkommen („alexanderpl“, „mitte alexanderpl“).
+    """
+
+    def __init__(self) -> None:
+        self._places: List[Place] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._sorted_tokens: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def add(self, place: Place) -> None:
+        name = place.get("display_name")
+        if not name or name in self._ids:
+            return
+        pid = len(self._places)
+        self._places.append(place)
+        self._ids[name] = pid
+        for token in set(_tokens(name)):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                bisect.insort(self._sorted_tokens, token)
+            postings.add(pid)
+
+    def search(self, query: str, limit: int) -> List[Place]:
+        tokens = _tokens(query)
+        if not tokens:
+            return []
+        *full, prefix = tokens
+        candidates: Set[int] = set()
+        i = bisect.bisect_left(self._sorted_tokens, prefix)
+        while i < len(self._sorted_tokens) and self._sorted_tokens[i].startswith(prefix):
+            candidates |= self._postings[self._sorted_tokens[i]]
+            i += 1
+        for token in full:
+            candidates &= self._postings.get(token, set())
+            if not candidates:
+                return []
+        # Frühere (und damit meist häufiger angefragte) Orte zuerst
+        return [self._places[pid] for pid in sorted(candidates)[:limit]]
+
+
+class MongoGeocodeStore:
+    """
+    Persistenter Cache in einer MongoDB‑Collection (``_id`` = normalisierte
+    Anfrage).  Einträge verfallen über einen TTL‑Index.  pymongo blockiert,
+    daher laufen alle Zugriffe in einem Thread mit kurzem Timeout; ist die
+    Datenbank nicht erreichbar, wird sie für ``backoff`` Sekunden übergangen.
+    """
+
+    def __init__(self, collection: Any, ttl: float, timeout: float = 0.5, backoff: float = 60.0) -> None:
+        self.collection = collection
+        self.ttl = ttl
+        self.timeout = timeout
+        self.backoff = backoff
+        self._skip_until = 0.0
+
+    async def _run(self, fn: Any, *args: Any, timeout: Optional[float] = None) -> Any:
+        if time.monotonic() < self._skip_until:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(fn, *args), timeout=timeout or self.timeout)
+        except Exception as e:
+            self._skip_until = time.monotonic() + self.backoff
+            logger.warning(f"Geocoding-Cache (MongoDB) nicht verfügbar: {e}")
+            return None
+
+    def _ensure_index(self) -> None:
+        self.collection.create_index("created_at", expireAfterSeconds=int(self.ttl))
+
+    async def ensure_index(self) -> None:
+        await self._run(self._ensure_index, timeout=5.0)
+
+    async def load(self, key: str) -> Optional[List[Place]]:
+        doc = await self._run(self.collection.find_one, {"_id": key})
+        return doc.get("results") if doc else None
+
+    def _save(self, key: str, results: List[Place]) -> None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.collection.replace_one({"_id": key}, {"_id": key, "results": results, "created_at": now}, upsert=True)
+
+    async def save(self, key: str, results: List[Place]) -> None:
+        await self._run(self._save, key, results)
+
+    def _recent(self, limit: int) -> List[Place]:
+        places: List[Place] = []
+        for doc in self.collection.find({}, {"results": 1}).sort("created_at", -1).limit(limit):
+            places.extend(doc.get("results") or [])
+        return places
+
+    async def recent_places(self, limit: int) -> List[Place]:
+        return await self._run(self._recent, limit, timeout=10.0) or []
+
+
+class Geocoder:
+    """Fasst Token‑Bucket, Caches und Präfix‑Index zu einer Suche zusammen."""
+
+    def __init__(
+        self,
+        pool: UpstreamPool,
+        store: Optional[MongoGeocodeStore] = None,
+        url: str = NOMINATIM_URL,
+        rate: float = 1.0,
+        burst: float = 1.0,
+        max_wait: float = 2.0,
+        fetch_limit: int = 10,
+        cache_ttl: float = 86400.0,
+        cache_entries: int = 4096,
+    ) -> None:
+        self.pool = pool
+        self.store = store
+        self.url = url
+        self.bucket = TokenBucket(rate, burst)
+        self.max_wait = max_wait
+        self.fetch_limit = fetch_limit
+        self.index = PlacePrefixIndex()
+        self.cache: AsyncTTLCache[List[Place]] = AsyncTTLCache("geocode", max_entries=cache_entries, ttl=cache_ttl)
+        self.rate_limited = 0
+
+    async def warm(self, limit: int = 5000) -> None:
+        """Füllt den Präfix‑Index mit den zuletzt aufgelösten Orten aus MongoDB."""
+        if self.store is None:
+            return
+        await self.store.ensure_index()
+        for place in await self.store.recent_places(limit):
+            self.index.add(place)
+        logger.info(f"Geocoding: {len(self.index)} Orte im Präfix-Index")
+
+    async def _fetch_upstream(self, q: str, max_wait: float) -> List[Place]:
+        if not await self.bucket.acquire(max_wait):
+            self.rate_limited += 1
+            raise UpstreamError("nominatim", "Ratenlimit erreicht")
+        params = {"q": q, "format": "json", "addressdetails": 1, "limit": str(self.fetch_limit)}
+        resp = await self.pool.get("nominatim", self.url, params=params)
+        return [
+            {
+                "display_name": item.get("display_name"),
+                "lat": float(item.get("lat")),
+                "lon": float(item.get("lon")),
+            }
+            for item in resp.json()
+            if item.get("lat") and item.get("lon")
+        ]
+
+    async def _resolve(self, key: str, q: str, max_wait: float) -> List[Place]:
+        results = await self.store.load(key) if self.store is not None else None
+        if results is None:
+            results = await self._fetch_upstream(q, max_wait)
+            if self.store is not None:
+                await self.store.save(key, results)
+        for place in results:
+            self.index.add(place)
+        return results
+
+    async def search(self, q: str, limit: int = 5, autocomplete: bool = False) -> Tuple[List[Place], str]:
+        """
+        Liefert ``(Treffer, Quelle)`` mit Quelle ``cache``, ``local`` oder
+        ``nominatim``.  Bei ``autocomplete`` genügen lokale Präfix‑Treffer und
+        es wird nicht auf einen Token gewartet.  Ist der Upstream gesperrt
+        oder nicht erreichbar, werden die lokalen Treffer geliefert.
+        """
+        key = normalize_query(q)
+        fresh = self.cache.peek(key) is not None
+        if autocomplete and not fresh:
+            local = self.index.search(key, limit)
+            if local:
+                return local, "local"
+        max_wait = 0.0 if autocomplete else self.max_wait
+        try:
+            results = await self.cache.get_or_fetch(key, lambda: self._resolve(key, " ".join(q.split()), max_wait))
+        except UpstreamError as e:
+            logger.warning(f"Geocoding über Nominatim nicht möglich: {e}")
+            return self.index.search(key, limit), "local"
+        return results[:limit], "cache" if fresh else "nominatim"
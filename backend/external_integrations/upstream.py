@@ -0,0 +1,195 @@
+"""
+Gemeinsamer, gepoolter HTTP‑Client für alle externen Dienste.
+
+Alle Integrationen (Overpass, Google Places, OSRM, Nominatim, MoWaS) teilen
+sich einen ``httpx.AsyncClient`` mit Keep‑Alive‑Verbindungspool und
+optionalem HTTP/2.  Pro Upstream gibt es ein eigenes Timeout und eine
+Obergrenze für gleichzeitige Anfragen, damit ein langsamer Dienst nicht
+alle Verbindungen belegt.  Die Werte lassen sich über Umgebungsvariablen
+anpassen, z. B. ``UPSTREAM_OVERPASS_TIMEOUT=20`` oder
+``UPSTREAM_NOMINATIM_CONCURRENCY=1``.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Container, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger("server.upstream")
+
+USER_AGENT = "akut.jetzt/1.0 (mailto:info@akut.jetzt)"
+
+
+class UpstreamError(Exception):
+    """Fehler bei der Kommunikation mit einem externen Dienst."""
+
+    def __init__(self, upstream: str, message: str) -> None:
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+
+
+@dataclass
+class UpstreamConfig:
+    """Timeout (Sekunden) und Parallelitätsgrenze für einen Upstream."""
+
+    name: str
+    timeout: float = 10.0
+    max_concurrency: int = 10
+
+    @classmethod
+    def from_env(cls, name: str, timeout: float, max_concurrency: int) -> "UpstreamConfig":
+        prefix = f"UPSTREAM_{name.upper()}_"
+        return cls(
+            name=name,
+            timeout=float(os.getenv(prefix + "TIMEOUT", timeout)),
+            max_concurrency=int(os.getenv(prefix + "CONCURRENCY", max_concurrency)),
+        )
+
+
+# Standardwerte je Upstream.  Overpass ist langsam und streng limitiert,
+# Nominatim erlaubt laut Nutzungsbedingungen nur sehr wenige Anfragen.
+DEFAULT_UPSTREAMS: Dict[str, tuple[float, int]] = {
+    "overpass": (30.0, 4),
+    "google_places": (10.0, 16),
+    "osrm": (10.0, 8),
+    "nominatim": (10.0, 2),
+    "mowas": (10.0, 2),
+}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # type: ignore  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+class UpstreamPool:
+    """
+    Verwaltet den gemeinsamen ``httpx.AsyncClient`` und die Semaphoren pro
+    Upstream.  Der Client wird beim ersten Aufruf innerhalb der Event‑Loop
+    angelegt und beim Herunterfahren über ``aclose`` geschlossen.
+    """
+
+    def __init__(
+        self,
+        configs: Dict[str, UpstreamConfig],
+        http2: bool = False,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 30.0,
+    ) -> None:
+        self.configs = configs
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.warning("HTTP/2 angefordert, aber das Paket 'h2' ist nicht installiert – nutze HTTP/1.1")
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Beobachter für Metriken: (upstream, Ergebnis, Sekunden)
+        self.observer: Optional[Callable[[str, str, float], None]] = None
+
+    @classmethod
+    def from_env(cls) -> "UpstreamPool":
+        configs = {
+            name: UpstreamConfig.from_env(name, timeout, concurrency)
+            for name, (timeout, concurrency) in DEFAULT_UPSTREAMS.items()
+        }
+        return cls(
+            configs,
+            http2=os.getenv("UPSTREAM_HTTP2", "false").lower() in ("1", "true", "yes"),
+            max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100")),
+            max_keepalive=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20")),
+        )
+
+    def config(self, upstream: str) -> UpstreamConfig:
+        cfg = self.configs.get(upstream)
+        if cfg is None:
+            cfg = self.configs[upstream] = UpstreamConfig(name=upstream)
+        return cfg
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=self._limits,
+                headers={"User-Agent": USER_AGENT},
+                follow_redirects=True,
+            )
+        return self._client
+
+    def _semaphore(self, upstream: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(upstream)
+        if sem is None:
+            sem = self._semaphores[upstream] = asyncio.Semaphore(self.config(upstream).max_concurrency)
+        return sem
+
+    async def request(
+        self,
+        upstream: str,
+        method: str,
+        url: str,
+        accept: Container[int] = (),
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Führt eine Anfrage gegen ``upstream`` aus.  Wartet höchstens das
+        Upstream‑Timeout auf einen freien Slot und löst bei Netzwerkfehlern,
+        Timeouts oder HTTP‑Fehlerstatus ``UpstreamError`` aus.  Statuscodes
+        in ``accept`` (z. B. 304 bei bedingten Anfragen) gelten nicht als Fehler.
+        """
+        cfg = self.config(upstream)
+        sem = self._semaphore(upstream)
+        try:
+            await asyncio.wait_for(sem.acquire(), timeout=cfg.timeout)
+        except asyncio.TimeoutError:
+            self._observe(upstream, "rejected", 0.0)
+            raise UpstreamError(upstream, "zu viele gleichzeitige Anfragen")
+        began = time.perf_counter()
+        outcome = "error"
+        try:
+            kwargs.setdefault("timeout", cfg.timeout)
+            resp = await self.client.request(method, url, **kwargs)
+            if resp.status_code not in accept:
+                resp.raise_for_status()
+            outcome = "ok"
+            return resp
+        except httpx.HTTPStatusError as e:
+            outcome = "http_error"
+            raise UpstreamError(upstream, f"HTTP {e.response.status_code}") from e
+        except httpx.TimeoutException as e:
+            outcome = "timeout"
+            raise UpstreamError(upstream, f"{type(e).__name__}: {e}") from e
+        except httpx.HTTPError as e:
+            raise UpstreamError(upstream, f"{type(e).__name__}: {e}") from e
+        finally:
+            sem.release()
+            self._observe(upstream, outcome, time.perf_counter() - began)
+
+    def _observe(self, upstream: str, outcome: str, seconds: float) -> None:
+        if self.observer is not None:
+            try:
+                self.observer(upstream, outcome, seconds)
+            except Exception as e:  # Metriken dürfen keine Anfrage scheitern lassen
+                logger.debug(f"Upstream-Beobachter fehlgeschlagen: {e}")
+
+    async def get(self, upstream: str, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request(upstream, "GET", url, **kwargs)
+
+    async def post(self, upstream: str, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request(upstream, "POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
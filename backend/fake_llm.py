@@ -0,0 +1,107 @@
+"""
+Lokaler Ersatz für die OpenAI‑Chat‑API zum Testen ohne Netzzugang.
+
+Start::
+
+    uvicorn fake_llm:app --port 8099
+    OPENAI_API_KEY=test OPENAI_BASE_URL=http://localhost:8099/v1 uvicorn server:app
+
+Das Verhalten lässt sich über Umgebungsvariablen steuern:
+
+- ``FAKE_LLM_LATENCY``: Verzögerung vor der Antwort in Sekunden (Default 0.2)
+- ``FAKE_LLM_TOKEN_DELAY``: Pause zwischen gestreamten Tokens (Default 0.02)
+- ``FAKE_LLM_FAILURE_RATE``: Anteil der Anfragen, die mit HTTP 503 scheitern
+- ``FAKE_LLM_REPLY``: fester Antworttext
+
+Zur Laufzeit können die Werte per ``POST /control`` (JSON mit ``latency``,
+``token_delay``, ``failure_rate``, ``reply``) geändert werden, z. B. um einen
+Ausfall für den Circuit Breaker zu simulieren.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="fake-llm")
+
+SETTINGS: Dict[str, Any] = {
+    "latency": float(os.getenv("FAKE_LLM_LATENCY", "0.2")),
+    "token_delay": float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.02")),
+    "failure_rate": float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")),
+    "reply": os.getenv(
+        "FAKE_LLM_REPLY",
+        "Ruhe bewahren und 112 rufen.\n- Person in stabile Seitenlage bringen\n- Atmung kontrollieren",
+    ),
+}
+STATS = {"requests": 0, "failures": 0}
+
+
+@app.post("/control")
+async def control(request: Request):
+    SETTINGS.update({k: v for k, v in (await request.json()).items() if k in SETTINGS})
+    return {"settings": SETTINGS, "stats": STATS}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    STATS["requests"] += 1
+    await asyncio.sleep(SETTINGS["latency"])
+    if random.random() < SETTINGS["failure_rate"]:
+        STATS["failures"] += 1
+        return JSONResponse(status_code=503, content={"error": {"message": "fake outage", "type": "server_error"}})
+    model = body.get("model", "fake")
+    created = int(time.time())
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    reply = SETTINGS["reply"]
+    if body.get("response_format", {}).get("type") == "json_object":
+        reply = json.dumps({"steps": [line.lstrip("- ") for line in reply.split("\n") if line.strip()]}, ensure_ascii=False)
+    # Tokenzahlen grob nach Wörtern
+    prompt_tokens = sum(len(str(m.get("content") or "").split()) for m in body.get("messages", []))
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(reply.split()),
+        "total_tokens": prompt_tokens + len(reply.split()),
+    }
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    async def events():
+        for i, token in enumerate(reply.split(" ")):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token if i == 0 else " " + token}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(SETTINGS["token_delay"])
+        done = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        if (body.get("stream_options") or {}).get("include_usage"):
+            final = {**done, "choices": [], "usage": usage}
+            yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
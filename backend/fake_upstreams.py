@@ -0,0 +1,199 @@
+"""
+Lokale Ersatzdienste für alle Upstreams des Backends (für ``benchmark.py``
+und Tests ohne Netzzugang).
+
+Start::
+
+    uvicorn fake_upstreams:app --port 8098
+
+und das Backend darauf zeigen lassen::
+
+    OVERPASS_URL=http://localhost:8098/overpass/api/interpreter
+    OSRM_URL=http://localhost:8098/osrm
+    NOMINATIM_URL=http://localhost:8098/nominatim/search
+    MOWAS_URL=http://localhost:8098/mowas
+    GOOGLE_PLACES_DETAILS_URL=http://localhost:8098/google/place/details/json
+    OPENAI_API_KEY=test OPENAI_BASE_URL=http://localhost:8098/openai/v1
+
+Die OpenAI‑API ist ``fake_llm`` (eingehängt unter ``/openai``, gesteuert über
+dessen ``FAKE_LLM_*``‑Variablen bzw. ``/openai/control``).  Für die übrigen
+Dienste gibt es je eine Verzögerung in Sekunden und eine Nutzlastgröße:
+
+- ``FAKE_<DIENST>_LATENCY`` (Default 0.05),
+- ``FAKE_<DIENST>_SIZE``: Elemente je Overpass‑Abfragezeile, Punkte der
+  OSRM‑Geometrie, Nominatim‑Treffer, MoWaS‑Warnungen (Defaults 40, 200, 5, 20),
+
+mit ``<DIENST>`` = ``OVERPASS``, ``OSRM``, ``NOMINATIM``, ``MOWAS``, ``GOOGLE``.
+Zur Laufzeit per ``POST /control`` änderbar, z. B.
+``{"overpass": {"latency": 2.0}}``.  Antworten sind für dieselbe Anfrage
+deterministisch, damit Messläufe vergleichbar bleiben.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request, Response
+
+import fake_llm
+
+app = FastAPI(title="fake-upstreams")
+app.mount("/openai", fake_llm.app)
+
+_DEFAULT_SIZES = {"overpass": 40, "osrm": 200, "nominatim": 5, "mowas": 20, "google": 1}
+
+SETTINGS: Dict[str, Dict[str, float]] = {
+    name: {
+        "latency": float(os.getenv(f"FAKE_{name.upper()}_LATENCY", "0.05")),
+        "size": int(os.getenv(f"FAKE_{name.upper()}_SIZE", str(size))),
+    }
+    for name, size in _DEFAULT_SIZES.items()
+}
+STATS: Dict[str, int] = {name: 0 for name in SETTINGS}
+
+_LINE_RE = re.compile(
+    r'node\["(?P<key>amenity|railway|public_transport)"="(?P<value>[^"]+)"\]'
+    r"\((?P<s>-?[\d.]+),(?P<w>-?[\d.]+),(?P<n>-?[\d.]+),(?P<e>-?[\d.]+)\)"
+)
+
+
+def _rng(*parts: Any) -> random.Random:
+    seed = hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+async def _serve(name: str) -> Dict[str, float]:
+    STATS[name] += 1
+    settings = SETTINGS[name]
+    await asyncio.sleep(settings["latency"])
+    return settings
+
+
+@app.post("/control")
+async def control(request: Request):
+    for name, values in (await request.json()).items():
+        if name in SETTINGS and isinstance(values, dict):
+            SETTINGS[name].update({k: v for k, v in values.items() if k in SETTINGS[name]})
+    return {"settings": SETTINGS, "stats": STATS}
+
+
+@app.post("/overpass/api/interpreter")
+async def overpass(request: Request):
+    """Für jede Abfragezeile ``size`` benannte Knoten zufällig in deren Box."""
+    settings = await _serve("overpass")
+    query = (await request.body()).decode("utf-8", "replace")
+    elements: List[Dict[str, Any]] = []
+    for match in _LINE_RE.finditer(query):
+        s, w, n, e = (float(match.group(k)) for k in ("s", "w", "n", "e"))
+        rng = _rng(match.group(0))
+        for i in range(int(settings["size"])):
+            elements.append(
+                {
+                    "type": "node",
+                    "id": rng.randrange(10**9),
+                    "lat": round(rng.uniform(s, n), 7),
+                    "lon": round(rng.uniform(w, e), 7),
+                    "tags": {
+                        match.group("key"): match.group("value"),
+                        "name": f"{match.group('value')} {i}",
+                        "addr:street": f"Teststraße {i}",
+                    },
+                }
+            )
+    return {"version": 0.6, "generator": "fake-overpass", "elements": elements}
+
+
+@app.get("/osrm/route/v1/{profile}/{coords:path}")
+async def osrm_route(profile: str, coords: str):
+    """Gerade Linie mit ``size`` Punkten zwischen Start und Ziel."""
+    settings = await _serve("osrm")
+    try:
+        (lon1, lat1), (lon2, lat2) = [tuple(map(float, pair.split(","))) for pair in coords.split(";")[:2]]
+    except ValueError:
+        return {"code": "InvalidQuery", "routes": []}
+    points = max(2, int(settings["size"]))
+    line = [
+        [lon1 + (lon2 - lon1) * i / (points - 1), lat1 + (lat2 - lat1) * i / (points - 1)] for i in range(points)
+    ]
+    distance = ((lat2 - lat1) ** 2 + (lon2 - lon1) ** 2) ** 0.5 * 111_000
+    return {
+        "code": "Ok",
+        "routes": [
+            {
+                "distance": round(distance, 1),
+                "duration": round(distance / (1.4 if profile == "foot" else 10.0), 1),
+                "geometry": {"type": "LineString", "coordinates": line},
+            }
+        ],
+    }
+
+
+@app.get("/nominatim/search")
+async def nominatim(q: str = "", limit: int = 10):
+    settings = await _serve("nominatim")
+    rng = _rng(q)
+    return [
+        {
+            "place_id": rng.randrange(10**8),
+            "display_name": f"{q.title()} {i}, Teststadt, Deutschland",
+            "lat": str(round(rng.uniform(47.5, 54.5), 6)),
+            "lon": str(round(rng.uniform(6.0, 15.0), 6)),
+            "type": "city" if i == 0 else "suburb",
+            "importance": round(1.0 - i * 0.1, 2),
+        }
+        for i in range(min(limit, int(settings["size"])))
+    ]
+
+
+def _warning_id(i: int) -> str:
+    return f"fake.mowas.{i}"
+
+
+@app.get("/mowas/mowas/mapData.json")
+async def mowas_map(request: Request):
+    """Feste Warnliste mit ETag; bedingte Anfragen erhalten 304."""
+    settings = await _serve("mowas")
+    size = int(settings["size"])
+    etag = f'"fake-mowas-{size}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    items = [
+        {
+            "id": _warning_id(i),
+            "version": 1,
+            "severity": "Minor",
+            "urgency": "Immediate",
+            "type": "Alert",
+            "startDate": "2024-01-01T00:00:00+01:00",
+            "i18nTitle": {"de": f"Testwarnung {i}"},
+        }
+        for i in range(size)
+    ]
+    return Response(content=json.dumps(items), media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/mowas/warnings/{warning_id}.geojson")
+async def mowas_geojson(warning_id: str):
+    await _serve("mowas")
+    rng = _rng(warning_id)
+    lat, lon = rng.uniform(47.5, 54.5), rng.uniform(6.0, 15.0)
+    ring = [[lon, lat], [lon + 0.5, lat], [lon + 0.5, lat + 0.5], [lon, lat + 0.5], [lon, lat]]
+    return {"type": "FeatureCollection", "features": [{"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [ring]}}]}
+
+
+@app.get("/google/place/details/json")
+async def google_place_details(place_id: str = ""):
+    await _serve("google")
+    return {
+        "status": "OK",
+        "result": {
+            "name": f"Ort {place_id}",
+            "formatted_phone_number": "030 1234567",
+            "website": "https://example.org",
+            "opening_hours": {"open_now": True},
+        },
+    }
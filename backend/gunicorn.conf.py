@@ -0,0 +1,37 @@
+"""
+Gunicorn‑Konfiguration für den Betrieb mit mehreren Worker‑Prozessen
+(``entrypoint.sh`` nutzt sie ab ``WEB_CONCURRENCY`` > 1).
+
+Mit ``preload_app`` importiert der Master ``server`` einmal und lädt über
+``server.preload`` die schreibgeschützten Daten (Entscheidungsbäume,
+BM25‑Index, Gefahren‑Metadaten), bevor die Worker geforkt werden.  Alles,
+was sich pro Anfrage ändert (Caches, Sitzungen, Tokens), liegt bei gesetztem
+``REDIS_URL`` gemeinsam in Redis.  Die Startphase (``lifespan``) läuft in
+jedem Worker.  Ist ``PROMETHEUS_MULTIPROC_DIR`` gesetzt (leeres, beschreibbares
+Verzeichnis), fasst ``/metrics`` die Zähler aller Worker zusammen.
+"""
+
+import importlib
+import os
+
+# Bewusst nicht PORT: viele Plattformen setzen PORT für den öffentlichen Port (nginx)
+bind = f"0.0.0.0:{os.getenv('BACKEND_PORT', '8001')}"
+workers = max(1, int(os.getenv("WEB_CONCURRENCY", "2")))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+
+def on_starting(arbiter):
+    # Läuft im Master nach dem Import der App (preload_app) und vor dem Forken
+    importlib.import_module("server").preload()
+
+
+def child_exit(arbiter, worker):
+    # Metrikdateien beendeter Worker freigeben (Prometheus‑Mehrprozessbetrieb)
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
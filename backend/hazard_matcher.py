@@ -0,0 +1,124 @@
+"""
+Mehrfach‑Mustersuche für ``/api/auto-navigate``.
+
+Aus den Namen und Synonymen aller Sprachen in ``hazards_meta.json`` wird
+einmalig ein Aho‑Corasick‑Automat gebaut.  Eine Beschreibung wird danach in
+einem einzigen linearen Durchlauf gegen alle Begriffe aller Gefahren
+geprüft.  Die Bewertung entspricht der bisherigen Heuristik: Jede
+Gefahr erhält einen Punkt pro Begriff aus ihrer Liste, der als Teilstring
+in der (kleingeschriebenen) Beschreibung vorkommt.
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FALLBACK_SLUG = "unklare_gefahr"
+
+
+def _hazard_terms(meta: Dict[str, Any]) -> List[str]:
+    """Alle Namensvarianten und Synonyme einer Gefahr (kleingeschrieben)."""
+    terms: List[str] = []
+    for n in (meta.get("name") or {}).values():
+        terms.append(str(n).lower())
+    for syn_list in (meta.get("synonyms") or {}).values():
+        for s in syn_list:
+            terms.append(str(s).lower())
+    return [t for t in terms if t]
+
+
+class HazardMatcher:
+    """
+    Kompilierter Aho‑Corasick‑Automat über alle Gefahrenbegriffe.
+
+    Ein Begriff kann zu mehreren Gefahren gehören und innerhalb einer
+    Gefahr mehrfach vorkommen (z. B. identischer Name in zwei Sprachen);
+    die Gewichte bilden das exakt ab.
+    """
+
+    def __init__(self, hazard_meta: Dict[str, Any]) -> None:
+        # Reihenfolge der Slugs dient als Tie‑Breaker (wie bisher: erster gewinnt)
+        self._order: Dict[str, int] = {}
+        # Muster‑ID -> Liste (slug, gewicht)
+        self._pattern_slugs: List[List[Tuple[str, int]]] = []
+        pattern_ids: Dict[str, int] = {}
+        for slug, meta in hazard_meta.items():
+            self._order[slug] = len(self._order)
+            counts: Dict[str, int] = {}
+            for term in _hazard_terms(meta if isinstance(meta, dict) else {}):
+                counts[term] = counts.get(term, 0) + 1
+            for term, weight in counts.items():
+                pid = pattern_ids.get(term)
+                if pid is None:
+                    pid = len(self._pattern_slugs)
+                    pattern_ids[term] = pid
+                    self._pattern_slugs.append([])
+                self._pattern_slugs[pid].append((slug, weight))
+        self.pattern_count = len(pattern_ids)
+        self._build(pattern_ids)
+
+    def _build(self, pattern_ids: Dict[str, int]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for term, pid in pattern_ids.items():
+            state = 0
+            for ch in term:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(pid)
+        fail = [0] * len(goto)
+        queue: deque[int] = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # Ausgaben entlang der Fail‑Kette vorab zusammenführen
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def _matched_patterns(self, text: str) -> set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        matched: set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                matched.update(out[state])
+        return matched
+
+    def scores(self, description: str) -> Dict[str, int]:
+        """Punktzahl je Gefahr (nur Gefahren mit mindestens einem Treffer)."""
+        result: Dict[str, int] = {}
+        for pid in self._matched_patterns(description.lower()):
+            for slug, weight in self._pattern_slugs[pid]:
+                result[slug] = result.get(slug, 0) + weight
+        return result
+
+    def rank(self, description: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Nach Punktzahl absteigend sortierte Kandidaten ``{"slug", "score"}``."""
+        scored = self.scores(description)
+        ranked = sorted(scored.items(), key=lambda kv: (-kv[1], self._order[kv[0]]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [{"slug": slug, "score": score} for slug, score in ranked]
+
+    def classify(self, description: str, limit: Optional[int] = 5) -> Dict[str, Any]:
+        """Beste Gefahr plus Kandidatenliste; ohne Treffer ``unklare_gefahr``."""
+        candidates = self.rank(description, limit)
+        best = candidates[0]["slug"] if candidates else FALLBACK_SLUG
+        return {"slug": best, "candidates": candidates}
+
+    def classify_many(self, descriptions: Iterable[str], limit: Optional[int] = 5) -> List[Dict[str, Any]]:
+        return [self.classify(d, limit) for d in descriptions]
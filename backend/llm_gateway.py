@@ -0,0 +1,344 @@
+"""
+Asynchrones Gateway für alle Aufrufe des Sprachmodells.
+
+Der synchrone OpenAI‑Client blockierte bei jedem Aufruf aus einer
+``async def``‑Route die gesamte Event‑Loop.  ``LLMGateway`` nutzt stattdessen
+``AsyncOpenAI`` und bündelt die Schutzmechanismen an einer Stelle:
+
+- eine Semaphore begrenzt gleichzeitige Aufrufe; wer nicht innerhalb von
+  ``queue_timeout`` Sekunden an die Reihe kommt, erhält sofort einen Fehler,
+- jeder Aufruf hat eine Gesamtfrist (``deadline``), jeder Versuch ein Timeout,
+- vorübergehende Fehler (Timeouts, Verbindungsfehler, 429, 5xx) werden mit
+  ``tenacity`` und exponentiellem Backoff mit Jitter wiederholt,
+- ein Circuit Breaker öffnet nach ``failure_threshold`` aufeinanderfolgenden
+  Fehlschlägen und lässt erst nach ``reset_timeout`` Sekunden einen
+  Probeaufruf durch.  Solange er offen ist, schlagen Aufrufe sofort fehl,
+  damit die Endpunkte direkt auf die baumbasierte Antwort ausweichen.
+
+Alle Fehler werden als ``LLMUnavailable`` mit einem kurzen ``reason``
+gemeldet.  Für Tests ohne Netzzugang siehe ``fake_llm.py``.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+try:
+    import openai
+    from openai import AsyncOpenAI
+except Exception:  # pragma: no cover - optionales Paket
+    openai = None  # type: ignore
+    AsyncOpenAI = None  # type: ignore
+
+logger = logging.getLogger("server.llm")
+
+Message = Dict[str, Any]
+
+
+class LLMUnavailable(Exception):
+    """Das Sprachmodell ist nicht nutzbar; ``reason`` nennt den Grund."""
+
+    def __init__(self, reason: str, message: str = "") -> None:
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    if openai is None:
+        return False
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+class CircuitBreaker:
+    """Einfacher Circuit Breaker (geschlossen → offen → halb offen)."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """Gibt einen Probeaufruf frei, der ohne Ergebnis beendet wurde."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                logger.warning(f"LLM-Circuit-Breaker geöffnet nach {self.failures} Fehlschlägen")
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class LLMGateway:
+    """Gemeinsamer Zugang zu ``chat.completions`` für alle Endpunkte."""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: Optional[str] = None,
+        max_concurrency: int = 8,
+        queue_timeout: float = 2.0,
+        attempt_timeout: float = 20.0,
+        deadline: float = 30.0,
+        max_attempts: int = 3,
+        breaker: Optional[CircuitBreaker] = None,
+        stream_usage: bool = True,
+    ) -> None:
+        self.client = None
+        if api_key and AsyncOpenAI is not None:
+            # Wiederholungen übernimmt das Gateway selbst
+            self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=attempt_timeout)
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.breaker = breaker or CircuitBreaker()
+        # Tokenzahlen auch beim Streaming anfordern (stream_options.include_usage)
+        self.stream_usage = stream_usage
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # laufende Aufrufe (eigener Zähler statt des privaten Semaphore._value)
+        self._in_flight = 0
+        self.stats: Dict[str, int] = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+        # Beobachter für Metriken, erhält je Aufruf model, outcome, seconds,
+        # ttft (nur Streaming), prompt_tokens und completion_tokens
+        self.observer: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    @classmethod
+    def from_env(cls) -> "LLMGateway":
+        return cls(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "2")),
+            attempt_timeout=float(os.getenv("LLM_ATTEMPT_TIMEOUT", "20")),
+            deadline=float(os.getenv("LLM_DEADLINE", "30")),
+            max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+            ),
+            stream_usage=os.getenv("LLM_STREAM_USAGE", "true").lower() in ("1", "true", "yes"),
+        )
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    async def _enter(self) -> None:
+        if self.client is None:
+            raise LLMUnavailable("not_configured", "OpenAI-Key nicht gesetzt.")
+        if not self.breaker.allow():
+            self.stats["rejected"] += 1
+            raise LLMUnavailable("circuit_open", "Sprachmodell vorübergehend nicht verfügbar")
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            self.breaker.release_probe()
+            raise LLMUnavailable("overloaded", "Zu viele gleichzeitige Anfragen an das Sprachmodell")
+        self._in_flight += 1
+        self.stats["calls"] += 1
+
+    def _leave(self) -> None:
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    def _fail(self, exc: BaseException) -> LLMUnavailable:
+        self.stats["failures"] += 1
+        if _is_retryable(exc):
+            self.breaker.record_failure()
+            reason = "timeout" if isinstance(exc, asyncio.TimeoutError) or (
+                openai is not None and isinstance(exc, openai.APITimeoutError)
+            ) else "upstream_error"
+        else:
+            # Anfragefehler (z. B. 400) sagen nichts über den Zustand des Dienstes
+            self.breaker.record_success()
+            reason = "request_error"
+        logger.warning(f"LLM-Aufruf fehlgeschlagen ({reason}): {exc}")
+        return LLMUnavailable(reason, str(exc))
+
+    def _observe(self, model: str, outcome: str, began: float, usage: Any = None, ttft: Optional[float] = None) -> None:
+        if self.observer is None:
+            return
+        try:
+            self.observer(
+                {
+                    "model": model,
+                    "outcome": outcome,
+                    "seconds": time.monotonic() - began,
+                    "ttft": ttft,
+                    "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                    "completion_tokens": getattr(usage, "completion_tokens", None),
+                }
+            )
+        except Exception as e:  # Metriken dürfen keinen Aufruf scheitern lassen
+            logger.debug(f"LLM-Beobachter fehlgeschlagen: {e}")
+
+    def _count_retry(self, _state: Any) -> None:
+        self.stats["retries"] += 1
+
+    async def _create(self, deadline_at: float, **kwargs: Any) -> Any:
+        """``chat.completions.create`` mit Wiederholungen bis zur Gesamtfrist."""
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_random_exponential(multiplier=0.25, max=4.0),
+            retry=retry_if_exception(_is_retryable),
+            before_sleep=self._count_retry,
+            reraise=True,
+        ):
+            with attempt:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                return await asyncio.wait_for(
+                    self.client.chat.completions.create(**kwargs),  # type: ignore[union-attr]
+                    timeout=min(self.attempt_timeout, remaining),
+                )
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    async def complete(
+        self,
+        messages: List[Message],
+        model: str,
+        max_tokens: int = 300,
+        temperature: float = 0.2,
+        deadline: Optional[float] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Liefert den Antworttext einer Chat‑Completion."""
+        await self._enter()
+        began = time.monotonic()
+        deadline_at = began + (deadline or self.deadline)
+        try:
+            response = await self._create(
+                deadline_at,
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs,
+            )
+        except Exception as e:
+            error = self._fail(e)
+            self._observe(model, error.reason, began)
+            raise error from e
+        finally:
+            self.breaker.release_probe()
+            self._leave()
+        self.breaker.record_success()
+        self._observe(model, "ok", began, usage=getattr(response, "usage", None))
+        return (response.choices[0].message.content or "").strip()
+
+    async def stream(
+        self,
+        messages: List[Message],
+        model: str,
+        max_tokens: int = 300,
+        temperature: float = 0.2,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Liefert die Antwort Token für Token.  Wiederholt wird nur der
+        Verbindungsaufbau; zwischen zwei Tokens gilt das Versuchs‑Timeout.
+        Wird der Generator abgebrochen, wird der Upstream‑Stream geschlossen.
+        """
+        await self._enter()
+        began = time.monotonic()
+        deadline_at = began + (deadline or self.deadline)
+        response = None
+        ttft: Optional[float] = None
+        usage: Any = None
+        outcome = "cancelled"
+        extra: Dict[str, Any] = {"stream_options": {"include_usage": True}} if self.stream_usage else {}
+        try:
+            try:
+                response = await self._create(
+                    deadline_at,
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    **extra,
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.attempt_timeout)
+                    except StopAsyncIteration:
+                        break
+                    # Mit include_usage kommt die Tokenzahl im letzten Chunk (ohne choices)
+                    usage = getattr(chunk, "usage", None) or usage
+                    if not chunk.choices:
+                        continue
+                    content = getattr(chunk.choices[0].delta, "content", None)
+                    if content:
+                        if ttft is None:
+                            ttft = time.monotonic() - began
+                        yield content
+            except (asyncio.CancelledError, GeneratorExit):
+                raise
+            except Exception as e:
+                error = self._fail(e)
+                outcome = error.reason
+                raise error from e
+            self.breaker.record_success()
+            outcome = "ok"
+        finally:
+            self._observe(model, outcome, began, usage=usage, ttft=ttft)
+            # z. B. Abbruch durch den Client: Upstream‑Verbindung sofort schließen,
+            # ein offener Probeaufruf zählt nicht
+            self.breaker.release_probe()
+            self._leave()
+            if response is not None:
+                try:
+                    await response.close()
+                except Exception:
+                    pass
+
+    async def aclose(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "available": self.available,
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self._in_flight,
+        }
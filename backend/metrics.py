@@ -0,0 +1,212 @@
+"""
+Prometheus‑Metriken für ``/metrics``.
+
+- ``MetricsMiddleware`` misst jede Anfrage bis zum letzten Byte (auch
+  Streams) und zählt Statuscodes; als Label dient die Routen‑Vorlage
+  (``/api/hazards/{slug}``), nicht der konkrete Pfad.
+- ``observe_upstream`` und ``observe_llm`` werden als Beobachter an
+  ``UpstreamPool`` bzw. ``LLMGateway`` gehängt: Dauer und Ergebnis je
+  Upstream (Overpass, OSRM, Nominatim, MoWaS, Google Places, OpenAI), beim
+  Sprachmodell zusätzlich Zeit bis zum ersten Token und Tokenzahlen.
+- Cache‑Zähler werden erst beim Abruf aus den ``snapshot``‑Daten gelesen,
+  die Caches selbst kennen Prometheus nicht.
+- ``LoopLagMonitor`` misst, wie viel später als geplant die Event‑Loop einen
+  Timer ausführt; blockierender Code in einem Handler fällt so sofort auf.
+
+Fehlt das Paket ``prometheus_client``, sind alle Methoden wirkungslos und
+``/metrics`` antwortet mit 503.  Mit mehreren Workern (gunicorn) sammelt
+``PROMETHEUS_MULTIPROC_DIR`` Zähler und Histogramme aller Prozesse;
+Cache‑Zähler beziehen sich dann auf den antwortenden Worker.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from prometheus_client import (  # type: ignore
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily  # type: ignore
+except Exception:  # pragma: no cover - optionales Paket
+    CollectorRegistry = None  # type: ignore
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger("server.metrics")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+CACHE_COUNTERS = ("hits", "stale_hits", "misses", "coalesced", "refreshes", "evictions", "errors", "shared_hits")
+
+StatsSource = Callable[[], Dict[str, Dict[str, Any]]]
+
+
+class _CacheCollector:
+    """Liest die Cache‑Zähler bei jedem Abruf aus ``source`` (``{name: snapshot}``)."""
+
+    def __init__(self, source: StatsSource) -> None:
+        self.source = source
+
+    def collect(self):
+        counters = {
+            field: CounterMetricFamily(f"akut_cache_{field}", f"Cache {field} je Cache", labels=["cache"])
+            for field in CACHE_COUNTERS
+        }
+        size = GaugeMetricFamily("akut_cache_entries", "Einträge je Cache (im Prozess)", labels=["cache"])
+        for name, stats in sorted(self.source().items()):
+            for field, family in counters.items():
+                if isinstance(stats.get(field), (int, float)):
+                    family.add_metric([name], stats[field])
+            if isinstance(stats.get("size"), (int, float)):
+                size.add_metric([name], stats["size"])
+        yield from counters.values()
+        yield size
+
+
+class Metrics:
+    def __init__(self, cache_stats: Optional[StatsSource] = None) -> None:
+        self.enabled = CollectorRegistry is not None
+        self.multiprocess = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+        if not self.enabled:
+            logger.warning("Paket 'prometheus_client' fehlt – /metrics deaktiviert")
+            return
+        self.registry = CollectorRegistry()
+        self.requests = Counter(
+            "akut_http_requests_total", "HTTP-Anfragen je Route und Status",
+            ["method", "route", "status"], registry=self.registry,
+        )
+        self.latency = Histogram(
+            "akut_http_request_duration_seconds", "Dauer je Route bis zum letzten Byte",
+            ["method", "route"], buckets=LATENCY_BUCKETS, registry=self.registry,
+        )
+        self.upstream_latency = Histogram(
+            "akut_upstream_request_duration_seconds", "Dauer externer Aufrufe je Upstream",
+            ["upstream"], buckets=LATENCY_BUCKETS, registry=self.registry,
+        )
+        self.upstream_calls = Counter(
+            "akut_upstream_requests_total", "Externe Aufrufe je Upstream und Ergebnis",
+            ["upstream", "outcome"], registry=self.registry,
+        )
+        self.llm_ttft = Histogram(
+            "akut_llm_time_to_first_token_seconds", "Zeit bis zum ersten Token (Streaming)",
+            ["model"], buckets=LATENCY_BUCKETS, registry=self.registry,
+        )
+        self.llm_tokens = Counter(
+            "akut_llm_tokens_total", "Tokens je Modell und Art (prompt/completion)",
+            ["model", "kind"], registry=self.registry,
+        )
+        self.loop_lag = Histogram(
+            "akut_event_loop_lag_seconds", "Verspätung der Event-Loop gegenüber einem Timer",
+            buckets=LAG_BUCKETS, registry=self.registry,
+        )
+        self.loop_lag_last = Gauge(
+            "akut_event_loop_lag_last_seconds", "Zuletzt gemessene Verspätung der Event-Loop",
+            registry=self.registry, multiprocess_mode="max",
+        )
+        self._cache_collector = _CacheCollector(cache_stats) if cache_stats is not None else None
+        if self._cache_collector is not None:
+            self.registry.register(self._cache_collector)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        if self.enabled:
+            self.requests.labels(method, route, str(status)).inc()
+            self.latency.labels(method, route).observe(seconds)
+
+    def observe_upstream(self, upstream: str, outcome: str, seconds: float) -> None:
+        if self.enabled:
+            self.upstream_calls.labels(upstream, outcome).inc()
+            if outcome != "rejected":
+                self.upstream_latency.labels(upstream).observe(seconds)
+
+    def observe_llm(self, call: Dict[str, Any]) -> None:
+        """Beobachter für ``LLMGateway``: ``model``, ``outcome``, ``seconds``, ``ttft``, ``*_tokens``."""
+        if not self.enabled:
+            return
+        self.observe_upstream("openai", call["outcome"], call["seconds"])
+        model = call.get("model") or "unknown"
+        if call.get("ttft") is not None:
+            self.llm_ttft.labels(model).observe(call["ttft"])
+        for kind in ("prompt", "completion"):
+            if call.get(f"{kind}_tokens"):
+                self.llm_tokens.labels(model, kind).inc(call[f"{kind}_tokens"])
+
+    def observe_loop_lag(self, lag: float) -> None:
+        if self.enabled:
+            self.loop_lag.observe(lag)
+            self.loop_lag_last.set(lag)
+
+    def render(self) -> Tuple[int, bytes]:
+        """(Status, Text‑Exposition) für ``/metrics``."""
+        if not self.enabled:
+            return 503, b"prometheus_client nicht installiert\n"
+        if not self.multiprocess:
+            return 200, generate_latest(self.registry)
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        if self._cache_collector is not None:
+            registry.register(self._cache_collector)
+        return 200, generate_latest(registry)
+
+
+class MetricsMiddleware:
+    """ASGI‑Middleware: Dauer und Status je Route; ``/metrics`` selbst wird nicht gezählt."""
+
+    def __init__(self, app: Any, metrics: Metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not self.metrics.enabled or scope.get("path") == "/metrics":
+            await self.app(scope, receive, send)
+            return
+        began = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.metrics.observe_request(scope["method"], route, status, time.perf_counter() - began)
+
+
+class LoopLagMonitor:
+    """Plant alle ``interval`` Sekunden einen Timer und misst dessen Verspätung."""
+
+    def __init__(self, metrics: Metrics, interval: float = 0.5) -> None:
+        self.metrics = metrics
+        self.interval = interval
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.metrics.observe_loop_lag(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        if self._task is None and self.metrics.enabled and self.interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
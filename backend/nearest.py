@@ -0,0 +1,60 @@
+"""
+Vektorisierte Entfernungs‑ und Richtungsberechnung für ``/api/pois/nearest``.
+
+Statt jede Distanz einzeln in Python zu berechnen, werden Haversine‑Distanz
+und Anfangskurs (Bearing) für die gesamte Kandidatenmenge in einem Schritt
+mit NumPy bestimmt; die ``k`` nächsten Einträge werden per
+``argpartition`` ausgewählt.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_bearing(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Großkreisentfernung (Meter) und Anfangskurs (Grad, 0 = Nord, im
+    Uhrzeigersinn) vom Punkt ``lat``/``lon`` zu allen Zielkoordinaten.
+    """
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlam = np.radians(lons - lon)
+    cos_phi2 = np.cos(phi2)
+    a = np.sin(dphi / 2.0) ** 2 + np.cos(phi1) * cos_phi2 * np.sin(dlam / 2.0) ** 2
+    dist = 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    y = np.sin(dlam) * cos_phi2
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * cos_phi2 * np.cos(dlam)
+    bearing = (np.degrees(np.arctan2(y, x)) + 360.0) % 360.0
+    return dist, bearing
+
+
+def rank_by_distance(
+    lat: float,
+    lon: float,
+    pois: Sequence[Dict[str, Any]],
+    k: int,
+    max_distance: float = float("inf"),
+) -> List[Dict[str, Any]]:
+    """
+    Die ``k`` nächsten POIs (höchstens ``max_distance`` Meter entfernt),
+    aufsteigend sortiert und um ``distance`` (m) und ``bearing`` (°) ergänzt.
+    POIs ohne Koordinaten werden übersprungen.
+    """
+    valid = [p for p in pois if p.get("lat") is not None and p.get("lng") is not None]
+    if not valid or k <= 0:
+        return []
+    lats = np.fromiter((p["lat"] for p in valid), dtype=np.float64, count=len(valid))
+    lons = np.fromiter((p["lng"] for p in valid), dtype=np.float64, count=len(valid))
+    dist, bearing = haversine_bearing(lat, lon, lats, lons)
+    idx = np.flatnonzero(dist <= max_distance)
+    if len(idx) > k:
+        idx = idx[np.argpartition(dist[idx], k - 1)[:k]]
+    idx = idx[np.argsort(dist[idx], kind="stable")]
+    return [
+        {**valid[i], "distance": round(float(dist[i]), 1), "bearing": round(float(bearing[i]), 1)}
+        for i in idx.tolist()
+    ]
@@ -0,0 +1,255 @@
+"""
+BM25‑Index über alle Knoten aller Entscheidungsbäume.
+
+Für jede Sprache wird beim Start eine Gewichtsmatrix (Knoten × Begriffe)
+berechnet; IDF und durchschnittliche Knotenlänge gelten sprachweit über
+alle Bäume, sodass Allerweltsbegriffe wie „112“ oder „rufen“ kaum zählen.
+Eine Anfrage ist danach nur noch eine Spaltenauswahl und eine Summe über
+die Zeilen des jeweiligen Baums.
+
+``search`` liefert die besten Knoten eines Baums für eine Frage, begrenzt
+auf ``k`` Knoten und ein grobes Token‑Budget für den Prompt.  Passt kein
+Begriff, wird wie bisher die Reihenfolge im Baum verwendet.
+
+``best`` liefert den einen passendsten Knoten samt Konfidenz für die
+Antwort direkt aus dem Baum (ohne Sprachmodell).  Die Konfidenz ist das
+Produkt aus
+
+- Abdeckung: Anteil der Fragebegriffe, die im Knoten vorkommen, und
+- Abstand: ``1 - zweitbester / bester`` BM25‑Wert,
+
+liegt also nur nahe 1, wenn die Frage vollständig und eindeutig zu einem
+Knoten passt.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("server.node_index")
+
+_WORD_RE = re.compile(r"\w+")
+_SUFFIXES = ("ungen", "ung", "en", "er", "es", "em", "e", "n", "s")
+
+# Häufige Funktionswörter (de/en/fr/es/it), die nichts über den Knoten aussagen
+STOPWORDS = frozenset(
+    """
+    der die das den dem des ein eine einer eines einem einen und oder aber ich du er sie es wir ihr
+    mein meine mich mir dich dir ist sind bin war was wie wo wann warum soll sollte muss kann darf
+    mit bei beim zu zum zur im in ins an am auf für von vom nicht noch auch nur so da dann wenn ob man
+    tun mache machen
+    the a an and or but is are was what how where when why should must can do does i my me you your
+    to of in on at for with by it this that be if not
+    le la les un une des et ou est que qui quoi comment je tu il elle de du en au aux pour avec
+    el los las unos unas y o es que qué cómo yo tu de del en al para con por
+    il lo gli una e o è che cosa come io tu di del della in al per con
+    """.split()
+)
+
+# Grobe Schätzung für das Token‑Budget: ~4 Zeichen pro Token
+CHARS_PER_TOKEN = 4
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Kleingeschriebene, grob gestemmte Wörter ohne Stoppwörter."""
+    return [_stem(w) for w in _WORD_RE.findall(text.casefold()) if w not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass(frozen=True)
+class TreeNode:
+    id: str
+    text: str
+    # Beschriftungen der Optionen, die auf diesen Knoten führen
+    # (z. B. „Ja – Anaphylaxie“ für den Knoten „sofort“)
+    labels: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class NodeMatch:
+    node: TreeNode
+    score: float
+    confidence: float
+
+
+def collect_nodes(tree: Dict[str, Any]) -> List[TreeNode]:
+    """
+    Alle Knoten eines Baums (Wurzel zuerst, danach in Dateireihenfolge) mit
+    normalisiertem Text und den Beschriftungen der Optionen, die auf sie
+    verweisen.
+    """
+    if not isinstance(tree, dict):
+        return []
+    entries: List[Tuple[str, Dict[str, Any]]] = []
+    if isinstance(tree.get("root"), dict):
+        entries.append((str(tree["root"].get("id") or "root"), tree["root"]))
+    for key, node in tree.items():
+        if key != "root" and isinstance(node, dict) and (node.get("id") or key):
+            entries.append((str(node.get("id") or key), node))
+
+    incoming: Dict[str, List[str]] = {}
+    for _, node in entries:
+        for opt in node.get("options") or []:
+            if isinstance(opt, dict) and opt.get("label") and opt.get("nextId"):
+                incoming.setdefault(str(opt["nextId"]), []).append(" ".join(str(opt["label"]).split()))
+
+    return [
+        TreeNode(
+            node_id,
+            " ".join(str(node.get("text") or node.get("text_simplified") or "").split()),
+            tuple(incoming.get(node_id, ())),
+        )
+        for node_id, node in entries
+    ]
+
+
+class _LanguageIndex:
+    """BM25‑Gewichte aller Knoten einer Sprache als dichte NumPy‑Matrix."""
+
+    def __init__(self, trees: Iterable[Tuple[str, Sequence[TreeNode]]], k1: float = 1.2, b: float = 0.75) -> None:
+        self.nodes: List[TreeNode] = []
+        self.rows: Dict[str, Tuple[int, int]] = {}
+        docs: List[List[str]] = []
+        for slug, nodes in trees:
+            start = len(self.nodes)
+            for node in nodes:
+                self.nodes.append(node)
+                docs.append(tokenize(" ".join((node.text,) + node.labels)))
+            self.rows[slug] = (start, len(self.nodes))
+        self.vocab: Dict[str, int] = {}
+        for doc in docs:
+            for term in doc:
+                self.vocab.setdefault(term, len(self.vocab))
+        tf = np.zeros((len(docs), max(1, len(self.vocab))), dtype=np.float32)
+        for i, doc in enumerate(docs):
+            for term in doc:
+                tf[i, self.vocab[term]] += 1.0
+        n_docs = max(1, len(docs))
+        df = (tf > 0).sum(axis=0)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        dl = tf.sum(axis=1, keepdims=True)
+        avgdl = float(dl.mean()) if len(docs) else 1.0
+        norm = k1 * (1.0 - b + b * dl / max(avgdl, 1e-9))
+        self.weights = idf * (tf * (k1 + 1.0)) / (tf + norm)
+        self.token_costs = np.array(
+            [estimate_tokens(f"- {n.id}: {n.text}") for n in self.nodes], dtype=np.int32
+        )
+
+    def terms(self, question: str) -> List[int]:
+        return sorted({self.vocab[t] for t in tokenize(question) if t in self.vocab})
+
+    def score(self, slug: str, question: str) -> Tuple[int, np.ndarray]:
+        """(erste Zeile, BM25‑Werte) für alle Knoten des Baums ``slug``."""
+        start, end = self.rows.get(slug, (0, 0))
+        terms = self.terms(question)
+        if not terms or end <= start:
+            return start, np.zeros(end - start, dtype=np.float32)
+        return start, self.weights[start:end, terms].sum(axis=1)
+
+
+class NodeIndex:
+    """Sprachweise BM25‑Indizes über alle Entscheidungsbäume eines ``DecisionTreeStore``."""
+
+    def __init__(self, languages: Sequence[str]) -> None:
+        self.languages = tuple(languages)
+        self._indexes: Dict[str, _LanguageIndex] = {}
+
+    def build(self, store: Any) -> None:
+        """(Neu‑)Aufbau aus den aufgelösten Bäumen (inkl. Fallback auf Deutsch)."""
+        indexes = {}
+        for lang in self.languages:
+            trees = []
+            for slug in store.slugs():
+                tree = store.get(slug, lang)
+                if tree is not None:
+                    trees.append((slug, collect_nodes(tree)))
+            indexes[lang] = _LanguageIndex(trees)
+        # Austausch in einem Schritt, laufende Anfragen sehen alten oder neuen Stand
+        self._indexes = indexes
+        logger.info(
+            "node_index: "
+            + ", ".join(f"{lang}={len(idx.nodes)} Knoten/{len(idx.vocab)} Begriffe" for lang, idx in indexes.items())
+        )
+
+    @property
+    def built(self) -> bool:
+        return bool(self._indexes)
+
+    def _index(self, lang: Optional[str]) -> Optional[_LanguageIndex]:
+        return self._indexes.get(lang or "de") or self._indexes.get("de")
+
+    def scored(self, slug: str, lang: Optional[str], question: str) -> List[Tuple[TreeNode, float]]:
+        """Alle Knoten des Baums mit ihrem BM25‑Wert, absteigend sortiert (stabil)."""
+        index = self._index(lang)
+        if index is None:
+            return []
+        start, scores = index.score(slug, question)
+        order = np.argsort(-scores, kind="stable")
+        return [(index.nodes[start + i], float(scores[i])) for i in order.tolist()]
+
+    def search(
+        self,
+        slug: str,
+        lang: Optional[str],
+        question: str,
+        k: int = 5,
+        token_budget: int = 400,
+    ) -> List[Dict[str, Any]]:
+        """
+        Die relevantesten Knoten für ``question`` als ``{"id", "text", "score"}``,
+        höchstens ``k`` Stück und zusammen höchstens ``token_budget`` Tokens
+        (der beste Knoten wird immer aufgenommen).  Ohne Treffer wird die
+        Reihenfolge im Baum beibehalten.
+        """
+        index = self._index(lang)
+        if index is None or slug not in index.rows:
+            return []
+        start, scores = index.score(slug, question)
+        if scores.size and float(scores.max()) > 0.0:
+            order = np.argsort(-scores, kind="stable")
+        else:
+            order = np.arange(scores.size)
+        picked: List[Dict[str, Any]] = []
+        used = 0
+        for i in order.tolist():
+            cost = int(index.token_costs[start + i])
+            if picked and used + cost > token_budget:
+                continue
+            node = index.nodes[start + i]
+            picked.append({"id": node.id, "text": node.text, "score": round(float(scores[i]), 3)})
+            used += cost
+            if len(picked) >= k:
+                break
+        return picked
+
+    def best(self, slug: str, lang: Optional[str], question: str) -> Optional[NodeMatch]:
+        """Der passendste Knoten mit Konfidenz (0–1) oder ``None`` ohne Treffer."""
+        index = self._index(lang)
+        query = set(tokenize(question))
+        if index is None or slug not in index.rows or not query:
+            return None
+        start, scores = index.score(slug, question)
+        if not scores.size:
+            return None
+        order = np.argsort(-scores, kind="stable")
+        top = int(order[0])
+        top_score = float(scores[top])
+        if top_score <= 0.0:
+            return None
+        second = float(scores[order[1]]) if scores.size > 1 else 0.0
+        matched = int(np.count_nonzero(index.weights[start + top, index.terms(question)]))
+        confidence = (matched / len(query)) * (1.0 - second / top_score)
+        return NodeMatch(index.nodes[start + top], round(top_score, 3), round(confidence, 3))
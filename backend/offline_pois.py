@@ -0,0 +1,524 @@
+"""
+Offline‑POI‑Engine auf Basis lokaler OSM‑Extrakte.
+
+Ein Import liest einen OSM‑Extrakt (GeoJSON, z. B. aus ``osmium export``,
+oder – falls ``pyosmium`` installiert ist – direkt eine ``.osm.pbf``‑Datei)
+und speichert die relevanten POIs kompakt als NumPy‑Arrays in einer
+``.npz``‑Datei.  Beim Start lädt der Server alle Dateien aus
+``OFFLINE_POI_DIR`` und baut pro Region und POI‑Typ einen KD‑Baum über die
+Einheitsvektoren der Koordinaten auf.  Umkreis‑ und k‑nächste‑Nachbarn‑
+Abfragen kommen damit ohne Overpass aus.
+
+Import (im Verzeichnis ``backend``)::
+
+    python offline_pois.py berlin extracts/berlin.geojson
+    python offline_pois.py muenchen extracts/oberbayern.osm.pbf --bbox 47.90,11.20,48.40,11.80
+"""
+
+import argparse
+import heapq
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("server.offline_pois")
+
+EARTH_RADIUS_M = 6371008.8
+
+# Typen, die beim Import übernommen werden (entspricht den von
+# build_overpass_query unterstützten Kategorien)
+IMPORT_TYPES: Tuple[str, ...] = (
+    "hospital", "police", "fire_station", "pharmacy", "shelter", "station",
+    "doctors", "clinic", "veterinary", "social_facility", "toilets",
+)
+
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lon, max_lat, max_lon)
+
+
+# ----------------------------------------------------------------------
+# Tag‑Auswertung (gemeinsam mit der Overpass‑Verarbeitung im Server)
+# ----------------------------------------------------------------------
+
+def tags_to_poi(tags: Dict[str, Any], lat: Optional[float], lon: Optional[float]) -> Optional[Dict[str, Any]]:
+    """Wandelt OSM‑Tags in einen POI um (None für Elemente ohne Namen)."""
+    name = tags.get("name")
+    # Ignoriere Elemente ohne Namen
+    if not name:
+        return None
+    # Versuche den Typ anhand der Tags zu bestimmen
+    if tags.get("amenity") in {"hospital", "police", "fire_station", "pharmacy", "shelter"}:
+        poi_type = tags.get("amenity")
+    elif tags.get("railway") == "station" or tags.get("public_transport") == "station":
+        poi_type = "station"
+    else:
+        poi_type = tags.get("amenity") or tags.get("public_transport")
+    return {
+        "name": name,
+        "type": poi_type,
+        "lat": lat,
+        "lng": lon,
+        "address": tags.get("addr:full") or tags.get("addr:street"),
+    }
+
+
+def tags_match_type(tags: Dict[str, Any], poi_type: str) -> bool:
+    """Entspricht das Element der Overpass‑Abfrage für ``poi_type``?"""
+    if poi_type == "station":
+        return tags.get("railway") == "station" or tags.get("public_transport") == "station"
+    return tags.get("amenity") == poi_type
+
+
+# ----------------------------------------------------------------------
+# Geometrie
+# ----------------------------------------------------------------------
+
+def to_unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """(n, 3)‑Array der Einheitsvektoren zu Breite/Länge in Grad."""
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+    cos_phi = np.cos(phi)
+    return np.column_stack((cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)))
+
+
+def meters_to_chord(meters: float) -> float:
+    """Sehnenlänge auf der Einheitskugel für eine Großkreisentfernung."""
+    return 2.0 * math.sin(min(meters / EARTH_RADIUS_M, math.pi) / 2.0)
+
+
+def chord_to_meters(chord: np.ndarray) -> np.ndarray:
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0))
+
+
+class KDTree:
+    """
+    Statischer, array‑basierter KD‑Baum.  Die Knoten liegen in flachen
+    NumPy‑Arrays; Blätter enthalten bis zu ``leaf_size`` Punkte, deren
+    Abstände vektorisiert berechnet werden.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 16) -> None:
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        n = len(self.points)
+        self.order = np.arange(n)
+        starts: List[int] = []
+        ends: List[int] = []
+        lefts: List[int] = []
+        rights: List[int] = []
+        los: List[np.ndarray] = []
+        his: List[np.ndarray] = []
+        if n:
+            stack = [(0, n, -1, False)]
+            while stack:
+                start, end, parent, is_right = stack.pop()
+                node = len(starts)
+                if parent >= 0:
+                    (rights if is_right else lefts)[parent] = node
+                idx = self.order[start:end]
+                pts = self.points[idx]
+                lo, hi = pts.min(axis=0), pts.max(axis=0)
+                starts.append(start)
+                ends.append(end)
+                lefts.append(-1)
+                rights.append(-1)
+                los.append(lo)
+                his.append(hi)
+                if end - start > leaf_size:
+                    dim = int(np.argmax(hi - lo))
+                    mid = (end - start) // 2
+                    part = np.argpartition(pts[:, dim], mid)
+                    self.order[start:end] = idx[part]
+                    stack.append((start + mid, end, node, True))
+                    stack.append((start, start + mid, node, False))
+        self._start = np.array(starts, dtype=np.int64)
+        self._end = np.array(ends, dtype=np.int64)
+        self._left = np.array(lefts, dtype=np.int64)
+        self._right = np.array(rights, dtype=np.int64)
+        # Knotenboxen als Python‑Tupel: für drei Koordinaten ist skalare
+        # Arithmetik deutlich schneller als NumPy‑Aufrufe
+        self._boxes = [tuple(lo.tolist()) + tuple(hi.tolist()) for lo, hi in zip(los, his)]
+        self._leaf_nodes = self._left < 0
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _box_dist(self, node: int, p: Tuple[float, float, float]) -> float:
+        lx, ly, lz, hx, hy, hz = self._boxes[node]
+        px, py, pz = p
+        dx = lx - px if px < lx else (px - hx if px > hx else 0.0)
+        dy = ly - py if py < ly else (py - hy if py > hy else 0.0)
+        dz = lz - pz if pz < lz else (pz - hz if pz > hz else 0.0)
+        return math.sqrt(dx * dx + dy * dy + dz * dz)
+
+    def _leaf(self, node: int, p: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        idx = self.order[self._start[node]:self._end[node]]
+        diff = self.points[idx] - p
+        return idx, np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+    def query_radius(self, p: np.ndarray, r: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Indizes und Sehnenabstände aller Punkte mit Abstand <= r."""
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        out_idx: List[np.ndarray] = []
+        out_dist: List[np.ndarray] = []
+        pt = tuple(p.tolist())
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_dist(node, pt) > r:
+                continue
+            if self._leaf_nodes[node]:
+                idx, dist = self._leaf(node, p)
+                mask = dist <= r
+                out_idx.append(idx[mask])
+                out_dist.append(dist[mask])
+            else:
+                stack.append(int(self._left[node]))
+                stack.append(int(self._right[node]))
+        if not out_idx:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(out_idx), np.concatenate(out_dist)
+
+    def query_knn(self, p: np.ndarray, k: int, max_r: float = math.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """Die ``k`` nächsten Punkte (aufsteigend nach Sehnenabstand, höchstens ``max_r``)."""
+        if not len(self) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        best: List[Tuple[float, int]] = []  # Max‑Heap über (-abstand, index)
+        pt = tuple(p.tolist())
+        heap = [(self._box_dist(0, pt), 0)]
+        while heap:
+            bound, node = heapq.heappop(heap)
+            worst = -best[0][0] if len(best) == k else max_r
+            if bound > worst:
+                break
+            if self._leaf_nodes[node]:
+                idx, dist = self._leaf(node, p)
+                mask = dist <= worst
+                for d, i in zip(dist[mask].tolist(), idx[mask].tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, i))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, i))
+            else:
+                for child in (int(self._left[node]), int(self._right[node])):
+                    heapq.heappush(heap, (self._box_dist(child, pt), child))
+        best.sort(key=lambda t: -t[0])
+        return np.array([i for _, i in best], dtype=np.int64), np.array([-d for d, _ in best])
+
+
+# ----------------------------------------------------------------------
+# Speicher
+# ----------------------------------------------------------------------
+
+class OfflineRegion:
+    """POIs einer importierten Region als Arrays plus KD‑Bäume je Typ."""
+
+    def __init__(
+        self,
+        name: str,
+        bbox: BBox,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        names: np.ndarray,
+        addresses: np.ndarray,
+        display_types: np.ndarray,
+        member_rows: np.ndarray,
+        member_types: np.ndarray,
+        types: Sequence[str],
+    ) -> None:
+        self.name = name
+        self.bbox = bbox
+        self.lat = lat
+        self.lon = lon
+        self.names = names
+        self.addresses = addresses
+        self.display_types = display_types
+        self.member_rows = member_rows
+        self.member_types = member_types
+        self.types = list(types)
+        xyz = to_unit_vectors(lat, lon)
+        # Pro Typ ein eigener Baum; die Baum‑Indizes verweisen über rows zurück auf die Zeilen
+        self._trees: Dict[str, Tuple[KDTree, np.ndarray]] = {}
+        for code, poi_type in enumerate(self.types):
+            rows = member_rows[member_types == code]
+            self._trees[poi_type] = (KDTree(xyz[rows]), rows)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def contains(self, bbox: BBox) -> bool:
+        return (
+            self.bbox[0] <= bbox[0] and self.bbox[1] <= bbox[1]
+            and bbox[2] <= self.bbox[2] and bbox[3] <= self.bbox[3]
+        )
+
+    def supports(self, types: Iterable[str]) -> bool:
+        return all(t in self._trees for t in types)
+
+    def poi(self, row: int) -> Dict[str, Any]:
+        address = str(self.addresses[row])
+        return {
+            "name": str(self.names[row]),
+            "type": str(self.display_types[row]) or None,
+            "lat": float(self.lat[row]),
+            "lng": float(self.lon[row]),
+            "address": address or None,
+        }
+
+    def within(self, lat: float, lon: float, radius_m: float, types: Sequence[str]) -> List[Tuple[int, float]]:
+        """(Zeile, Entfernung in Metern) aller POIs im Umkreis, ohne Duplikate."""
+        p = to_unit_vectors(np.array([lat]), np.array([lon]))[0]
+        chord = meters_to_chord(radius_m)
+        found: Dict[int, float] = {}
+        for t in types:
+            tree, rows = self._trees[t]
+            idx, dist = tree.query_radius(p, chord)
+            for row, meters in zip(rows[idx].tolist(), chord_to_meters(dist).tolist()):
+                found[row] = meters
+        return sorted(found.items(), key=lambda kv: kv[1])
+
+    def nearest(self, lat: float, lon: float, k: int, types: Sequence[str], max_distance_m: float = math.inf) -> List[Tuple[int, float]]:
+        """Die ``k`` nächsten POIs der angegebenen Typen als (Zeile, Meter)."""
+        p = to_unit_vectors(np.array([lat]), np.array([lon]))[0]
+        max_r = meters_to_chord(max_distance_m) if math.isfinite(max_distance_m) else math.inf
+        found: Dict[int, float] = {}
+        for t in types:
+            tree, rows = self._trees[t]
+            idx, dist = tree.query_knn(p, k, max_r)
+            for row, meters in zip(rows[idx].tolist(), chord_to_meters(dist).tolist()):
+                found[row] = meters
+        return sorted(found.items(), key=lambda kv: kv[1])[:k]
+
+    def in_bbox(self, bbox: BBox, types: Sequence[str]) -> List[int]:
+        mask = (
+            (self.lat >= bbox[0]) & (self.lat <= bbox[2])
+            & (self.lon >= bbox[1]) & (self.lon <= bbox[3])
+        )
+        rows: set[int] = set()
+        for t in types:
+            _, type_rows = self._trees[t]
+            rows.update(type_rows[mask[type_rows]].tolist())
+        return sorted(rows)
+
+    # -- Persistenz ------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            region=np.array(self.name),
+            bbox=np.array(self.bbox, dtype=np.float64),
+            lat=self.lat,
+            lon=self.lon,
+            names=self.names,
+            addresses=self.addresses,
+            display_types=self.display_types,
+            member_rows=self.member_rows,
+            member_types=self.member_types,
+            types=np.array(self.types),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "OfflineRegion":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                name=str(data["region"]),
+                bbox=tuple(float(v) for v in data["bbox"]),  # type: ignore[arg-type]
+                lat=data["lat"],
+                lon=data["lon"],
+                names=data["names"],
+                addresses=data["addresses"],
+                display_types=data["display_types"],
+                member_rows=data["member_rows"],
+                member_types=data["member_types"],
+                types=[str(t) for t in data["types"]],
+            )
+
+
+class OfflinePoiStore:
+    """Alle geladenen Regionen; findet die Region, die eine Anfrage vollständig abdeckt."""
+
+    def __init__(self) -> None:
+        self.regions: Dict[str, OfflineRegion] = {}
+
+    @classmethod
+    def load_dir(cls, directory: str) -> "OfflinePoiStore":
+        store = cls()
+        if not os.path.isdir(directory):
+            return store
+        for fname in sorted(os.listdir(directory)):
+            if not fname.endswith(".npz"):
+                continue
+            try:
+                region = OfflineRegion.load(os.path.join(directory, fname))
+            except Exception as e:
+                logger.error(f"Offline-POIs {fname} konnten nicht geladen werden: {e}")
+                continue
+            store.regions[region.name] = region
+            logger.info(f"Offline-POIs geladen: {region.name} ({len(region)} POIs)")
+        return store
+
+    def __bool__(self) -> bool:
+        return bool(self.regions)
+
+    def region_for(self, bbox: BBox, types: Sequence[str]) -> Optional[OfflineRegion]:
+        for region in self.regions.values():
+            if region.contains(bbox) and region.supports(types):
+                return region
+        return None
+
+    def region_named(self, name: str, types: Sequence[str]) -> Optional[OfflineRegion]:
+        region = self.regions.get(name)
+        if region is not None and region.supports(types):
+            return region
+        return None
+
+
+# ----------------------------------------------------------------------
+# Import
+# ----------------------------------------------------------------------
+
+def _geometry_point(geometry: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """Punkt (lat, lon) einer GeoJSON‑Geometrie; Flächen über den Mittelwert des Außenrings."""
+    gtype = geometry.get("type")
+    coords = geometry.get("coordinates")
+    if not coords:
+        return None
+    if gtype == "Point":
+        return float(coords[1]), float(coords[0])
+    if gtype == "Polygon":
+        ring = coords[0]
+    elif gtype == "MultiPolygon":
+        ring = coords[0][0]
+    elif gtype == "LineString":
+        ring = coords
+    else:
+        return None
+    return sum(c[1] for c in ring) / len(ring), sum(c[0] for c in ring) / len(ring)
+
+
+def iter_geojson(path: str) -> Iterable[Tuple[Dict[str, Any], float, float]]:
+    """(tags, lat, lon) aus einer GeoJSON‑FeatureCollection oder einer POI‑Liste wie pois.berlin.json."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        # Bereits normalisierte POIs (name, type, lat, lng)
+        for item in data:
+            t = item.get("type")
+            tags = {"name": item.get("name"), "addr:full": item.get("address")}
+            if t == "station":
+                tags["railway"] = "station"
+            elif t:
+                tags["amenity"] = "fire_station" if t == "firestation" else t
+            yield tags, float(item["lat"]), float(item.get("lng", item.get("lon")))
+        return
+    for feature in data.get("features", []):
+        props = feature.get("properties") or {}
+        tags = props.get("tags") if isinstance(props.get("tags"), dict) else props
+        point = _geometry_point(feature.get("geometry") or {})
+        if point is not None:
+            yield tags, point[0], point[1]
+
+
+def iter_pbf(path: str) -> Iterable[Tuple[Dict[str, Any], float, float]]:
+    """(tags, lat, lon) aller Knoten einer PBF‑Datei; benötigt das Paket ``osmium``."""
+    try:
+        import osmium  # type: ignore
+    except Exception:
+        raise RuntimeError("Für den PBF-Import wird das Paket 'osmium' (pyosmium) benötigt")
+
+    found: List[Tuple[Dict[str, Any], float, float]] = []
+
+    class Handler(osmium.SimpleHandler):  # type: ignore[misc]
+        def node(self, n: Any) -> None:
+            if "name" not in n.tags:
+                return
+            if not ("amenity" in n.tags or "railway" in n.tags or "public_transport" in n.tags):
+                return
+            found.append(({t.k: t.v for t in n.tags}, n.location.lat, n.location.lon))
+
+    Handler().apply_file(path)
+    return found
+
+
+def build_region(
+    name: str,
+    records: Iterable[Tuple[Dict[str, Any], float, float]],
+    bbox: Optional[BBox] = None,
+    types: Sequence[str] = IMPORT_TYPES,
+) -> OfflineRegion:
+    """Baut eine Region aus (tags, lat, lon)‑Datensätzen; nur POIs der ``types`` werden übernommen."""
+    lat: List[float] = []
+    lon: List[float] = []
+    names: List[str] = []
+    addresses: List[str] = []
+    display: List[str] = []
+    member_rows: List[int] = []
+    member_types: List[int] = []
+    seen: set[Tuple[str, float, float]] = set()
+    for tags, la, lo in records:
+        if bbox is not None and not (bbox[0] <= la <= bbox[2] and bbox[1] <= lo <= bbox[3]):
+            continue
+        matched = [code for code, t in enumerate(types) if tags_match_type(tags, t)]
+        if not matched:
+            continue
+        poi = tags_to_poi(tags, la, lo)
+        if poi is None:
+            continue
+        ident = (poi["name"], round(la, 7), round(lo, 7))
+        if ident in seen:
+            continue
+        seen.add(ident)
+        row = len(lat)
+        lat.append(la)
+        lon.append(lo)
+        names.append(str(poi["name"]))
+        addresses.append(str(poi["address"] or ""))
+        display.append(str(poi["type"] or ""))
+        for code in matched:
+            member_rows.append(row)
+            member_types.append(code)
+    lat_arr = np.array(lat, dtype=np.float64)
+    lon_arr = np.array(lon, dtype=np.float64)
+    if bbox is None:
+        bbox = (
+            (float(lat_arr.min()), float(lon_arr.min()), float(lat_arr.max()), float(lon_arr.max()))
+            if len(lat_arr) else (0.0, 0.0, 0.0, 0.0)
+        )
+    return OfflineRegion(
+        name=name,
+        bbox=bbox,
+        lat=lat_arr,
+        lon=lon_arr,
+        names=np.array(names, dtype=str),
+        addresses=np.array(addresses, dtype=str),
+        display_types=np.array(display, dtype=str),
+        member_rows=np.array(member_rows, dtype=np.int64),
+        member_types=np.array(member_types, dtype=np.int16),
+        types=types,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Importiert einen OSM-Extrakt als Offline-POI-Region")
+    parser.add_argument("region", help="Name der Region, z. B. berlin oder muenchen")
+    parser.add_argument("source", help="GeoJSON- oder .osm.pbf-Datei")
+    parser.add_argument("--bbox", help="Abdeckung min_lat,min_lon,max_lat,max_lon (Standard: Ausdehnung der Daten)")
+    parser.add_argument("--out-dir", default=os.getenv("OFFLINE_POI_DIR", os.path.join("data", "offline-pois")))
+    args = parser.parse_args(argv)
+    bbox: Optional[BBox] = None
+    if args.bbox:
+        parts = [float(v) for v in args.bbox.split(",")]
+        bbox = (parts[0], parts[1], parts[2], parts[3])
+    records = iter_pbf(args.source) if args.source.endswith(".pbf") else iter_geojson(args.source)
+    region = build_region(args.region, records, bbox=bbox)
+    os.makedirs(args.out_dir, exist_ok=True)
+    out = os.path.join(args.out_dir, f"{args.region}.npz")
+    region.save(out)
+    print(f"{len(region)} POIs für {args.region} nach {out} geschrieben")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Asynchroner MongoDB‑Zugriff (Motor) für Feedback und Benutzer.
+
+``save_feedback`` und ``login`` sind ``async def``, riefen aber PyMongo
+synchron auf; jede Datenbankabfrage blockierte damit die Event‑Loop.  Dieses
+Modul kapselt einen ``AsyncIOMotorClient`` mit einstellbarem
+Verbindungspool (``MONGO_MAX_POOL_SIZE`` usw.) und stellt bereit:
+
+- ``BatchWriter``: puffert Dokumente (z. B. Feedback) und schreibt sie im
+  Hintergrund als ungeordnetes ``insert_many`` – ein Round‑Trip pro Batch
+  statt pro Anfrage.  Ist der Puffer voll, lehnt ``submit`` ab, statt
+  Feedback stillschweigend zu verwerfen.
+- ``UserRepository``: Benutzer‑Lookups per ``find_one`` mit Zeitlimit;
+  eindeutige Indizes auf ``username`` und ``email`` werden beim Start
+  angelegt, damit die ``$or``‑Abfrage keinen Collection‑Scan braucht.
+
+Der Client wird erst in ``start`` (Startup der App) angelegt, damit er an
+die Event‑Loop des Servers gebunden ist.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient  # type: ignore
+except Exception:  # pragma: no cover - optionales Paket
+    AsyncIOMotorClient = None  # type: ignore
+
+logger = logging.getLogger("server.persistence")
+
+Document = Dict[str, Any]
+
+
+def pool_options_from_env() -> Dict[str, Any]:
+    """Pool‑ und Timeout‑Optionen für ``AsyncIOMotorClient`` aus Umgebungsvariablen."""
+    return {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", "60000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")),
+    }
+
+
+class BatchWriter:
+    """
+    Schreibt gepufferte Dokumente alle ``flush_interval`` Sekunden bzw. ab
+    ``batch_size`` Dokumenten per ``insert_many(ordered=False)``.  Ein
+    fehlgeschlagener Batch wird beim nächsten Durchlauf erneut versucht;
+    bei ``ordered=False`` schreibt MongoDB dabei alle übrigen Dokumente
+    auch dann, wenn einzelne scheitern.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        collection: Any = None,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        capacity: int = 10000,
+    ) -> None:
+        self.name = name
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.capacity = max(1, capacity)
+        self._buffer: Deque[Document] = deque()
+        self._pending: Optional[List[Document]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.stats: Dict[str, int] = {"submitted": 0, "rejected": 0, "written": 0, "batches": 0, "errors": 0}
+
+    def submit(self, doc: Document) -> bool:
+        """Reiht ein Dokument ein; ``False``, wenn der Puffer voll ist."""
+        if len(self._buffer) + len(self._pending or ()) >= self.capacity:
+            self.stats["rejected"] += 1
+            return False
+        self._buffer.append(doc)
+        self.stats["submitted"] += 1
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> int:
+        if self.collection is None:
+            return 0
+        written = 0
+        while self._pending or self._buffer:
+            if self._pending is None:
+                size = min(self.batch_size, len(self._buffer))
+                self._pending = [self._buffer.popleft() for _ in range(size)]
+            try:
+                # insert_many vergibt die _ids vorab; bei einer Wiederholung scheitern
+                # bereits geschriebene Dokumente als Duplikat statt doppelt zu landen
+                await self.collection.insert_many(self._pending, ordered=False)
+            except Exception as e:
+                # Bei BulkWriteError sind die übrigen Dokumente bereits geschrieben
+                details = getattr(e, "details", None)
+                if details and details.get("nInserted") is not None:
+                    logger.warning(f"{self.name}: {len(details.get('writeErrors', []))} Dokumente verworfen: {e}")
+                    written += details["nInserted"]
+                    self.stats["written"] += details["nInserted"]
+                    self.stats["errors"] += 1
+                    self._pending = None
+                    continue
+                self.stats["errors"] += 1
+                logger.warning(f"{self.name}: Batch mit {len(self._pending)} Dokumenten nicht gespeichert: {e}")
+                break
+            written += len(self._pending)
+            self.stats["written"] += len(self._pending)
+            self.stats["batches"] += 1
+            self._pending = None
+        return written
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self, collection: Any = None) -> None:
+        if collection is not None:
+            self.collection = collection
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "buffered": len(self._buffer) + len(self._pending or ())}
+
+
+class UserRepository:
+    """Benutzer aus der Collection ``users`` (per ``username`` oder ``email``)."""
+
+    def __init__(self, collection: Any = None, max_time_ms: int = 1000) -> None:
+        self.collection = collection
+        self.max_time_ms = max_time_ms
+
+    async def ensure_indexes(self) -> None:
+        """Eindeutige (sparse) Indizes für den Login; Fehler werden nur protokolliert."""
+        if self.collection is None:
+            return
+        for field in ("username", "email"):
+            try:
+                await self.collection.create_index(field, unique=True, sparse=True, name=f"{field}_unique")
+            except Exception as e:
+                # z. B. doppelte Einträge oder Datenbank nicht erreichbar
+                logger.warning(f"Index auf users.{field} nicht angelegt: {e}")
+
+    async def find_by_login(self, login: str) -> Optional[Document]:
+        if self.collection is None:
+            return None
+        return await self.collection.find_one(
+            {"$or": [{"username": login}, {"email": login}]},
+            {"password_hash": 1, "username": 1, "email": 1},
+            max_time_ms=self.max_time_ms,
+        )
+
+
+class MongoPersistence:
+    """Hält den Motor‑Client und die darauf aufbauenden Zugriffsobjekte."""
+
+    def __init__(self, url: Optional[str], db_name: str, feedback: BatchWriter, users: UserRepository) -> None:
+        self.url = url
+        self.db_name = db_name
+        self.feedback = feedback
+        self.users = users
+        self.client: Any = None
+        self.db: Any = None
+
+    @classmethod
+    def from_env(cls, url: Optional[str], db_name: str) -> "MongoPersistence":
+        feedback = BatchWriter(
+            "feedback",
+            batch_size=int(os.getenv("FEEDBACK_BATCH_SIZE", "100")),
+            flush_interval=float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "1")),
+            capacity=int(os.getenv("FEEDBACK_BUFFER", "10000")),
+        )
+        return cls(url, db_name, feedback, UserRepository())
+
+    def start(self, client: Any = None) -> None:
+        """Legt den Client an (oder übernimmt ``client``, z. B. in Tests) und startet den Feedback‑Writer."""
+        if client is None:
+            if AsyncIOMotorClient is None:
+                logger.warning("Paket 'motor' fehlt – Feedback und Login ohne Datenbank")
+                return
+            client = AsyncIOMotorClient(self.url, **pool_options_from_env())
+        self.client = client
+        self.db = client[self.db_name]
+        self.users.collection = self.db["users"]
+        self.feedback.start(self.db["feedback"])
+
+    async def stop(self) -> None:
+        await self.feedback.stop()
+        if self.client is not None:
+            self.client.close()
+
+    async def ping(self, timeout: float = 1.0) -> bool:
+        if self.db is None:
+            return False
+        try:
+            result = await asyncio.wait_for(self.db.command("ping"), timeout=timeout)
+        except Exception:
+            return False
+        return result.get("ok") == 1
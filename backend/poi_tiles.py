@@ -0,0 +1,73 @@
+"""
+Kachel‑Mathematik für den POI‑Cache.
+
+POIs werden nicht mehr für eine frei gewählte Box um jede Position geladen,
+sondern für feste Slippy‑Map‑Kacheln (Standard: Zoomstufe 14, ca. 1,5 km
+Kantenlänge in Mitteleuropa).  Zwei Nutzer:innen, die nur wenige Meter
+auseinander stehen, teilen sich so dieselben Kacheln und damit dieselben
+Overpass‑Ergebnisse.
+"""
+
+import math
+from typing import List, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+
+Tile = Tuple[int, int, int]  # (zoom, x, y)
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lon, max_lat, max_lon)
+
+
+def lonlat_to_tile(lat: float, lon: float, zoom: int) -> Tile:
+    """Kachel (z, x, y), in der der Punkt liegt."""
+    n = 1 << zoom
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return zoom, min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bbox(tile: Tile) -> BBox:
+    """Bounding‑Box einer Kachel als (min_lat, min_lon, max_lat, max_lon)."""
+    zoom, x, y = tile
+    n = 1 << zoom
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def radius_bbox(lat: float, lon: float, radius_m: float) -> BBox:
+    """Bounding‑Box, die einen Kreis mit ``radius_m`` um den Punkt enthält."""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def tiles_for_radius(lat: float, lon: float, radius_m: float, zoom: int) -> List[Tile]:
+    """Alle Kacheln, die den Umkreis ``radius_m`` um den Punkt schneiden."""
+    min_lat, min_lon, max_lat, max_lon = radius_bbox(lat, lon, radius_m)
+    _, x0, y0 = lonlat_to_tile(max_lat, min_lon, zoom)
+    _, x1, y1 = lonlat_to_tile(min_lat, max_lon, zoom)
+    return [(zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def union_bbox(tiles: List[Tile]) -> BBox:
+    boxes = [tile_bbox(t) for t in tiles]
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Großkreisentfernung in Metern."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
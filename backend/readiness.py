@@ -0,0 +1,120 @@
+"""
+Bereitschafts‑ und Lebendigkeitsstatus für ``/api/ready``, ``/api/live`` und
+``/api/health``.
+
+Probes sollen billig sein: statt bei jedem Aufruf die Datenbank anzupingen,
+prüft ``HealthMonitor`` alle registrierten Komponenten im Hintergrund alle
+``interval`` Sekunden (parallel, je mit ``check_timeout``) und hält das
+Ergebnis als Snapshot vor.  Eine Probe liest nur diesen Snapshot.
+
+- bereit (``ready``): alle als ``required`` registrierten Komponenten sind
+  in Ordnung und die Startphase ist abgeschlossen,
+- lebendig (``live``): die Prüfschleife läuft und ihr letzter Durchlauf ist
+  nicht älter als drei Intervalle – hängt die Event‑Loop, fällt das auf.
+
+Eine Prüfung ist eine Funktion (synchron oder ``async``), die ``True``/
+``False`` oder ``(ok, detail)`` liefert; Ausnahmen und Zeitüberschreitungen
+zählen als nicht in Ordnung.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger("server.readiness")
+
+Check = Callable[[], Any]
+
+
+@dataclass
+class ComponentStatus:
+    ok: bool = False
+    required: bool = False
+    detail: Optional[str] = None
+    latency_ms: Optional[float] = None
+    checked_at: Optional[float] = None
+
+
+class HealthMonitor:
+    def __init__(self, interval: float = 5.0, check_timeout: float = 1.0, required: Iterable[str] = ()) -> None:
+        self.interval = interval
+        self.check_timeout = check_timeout
+        self.required = set(required)
+        self.started = False
+        self._checks: Dict[str, Check] = {}
+        self.components: Dict[str, ComponentStatus] = {}
+        self._last_refresh: Optional[float] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def register(self, name: str, check: Check) -> None:
+        self._checks[name] = check
+        self.components[name] = ComponentStatus(required=name in self.required)
+
+    async def _run_check(self, name: str, check: Check) -> None:
+        began = time.monotonic()
+        try:
+            result = check()
+            if inspect.isawaitable(result):
+                result = await asyncio.wait_for(result, timeout=self.check_timeout)
+            ok, detail = result if isinstance(result, tuple) else (bool(result), None)
+        except asyncio.TimeoutError:
+            ok, detail = False, "timeout"
+        except Exception as e:
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        status = self.components[name]
+        if status.ok and not ok and status.required:
+            logger.warning(f"Komponente {name} nicht mehr bereit: {detail}")
+        status.ok, status.detail = bool(ok), detail
+        status.latency_ms = round((time.monotonic() - began) * 1000, 1)
+        status.checked_at = time.time()
+
+    async def refresh(self) -> None:
+        await asyncio.gather(*(self._run_check(name, check) for name, check in self._checks.items()))
+        self._last_refresh = time.monotonic()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:  # pragma: no cover - Prüfungen fangen selbst
+                logger.warning(f"Health-Prüfung fehlgeschlagen: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def ok(self, name: str) -> bool:
+        status = self.components.get(name)
+        return bool(status and status.ok)
+
+    @property
+    def ready(self) -> bool:
+        return self.started and all(s.ok for s in self.components.values() if s.required)
+
+    @property
+    def live(self) -> bool:
+        if self._task is None or self._task.done() or self._last_refresh is None:
+            return False
+        return time.monotonic() - self._last_refresh <= 3 * self.interval + self.check_timeout
+
+    def snapshot(self) -> Dict[str, Any]:
+        age = None if self._last_refresh is None else round(time.monotonic() - self._last_refresh, 2)
+        return {
+            "ready": self.ready,
+            "started": self.started,
+            "snapshot_age_s": age,
+            "components": {name: asdict(status) for name, status in self.components.items()},
+        }
@@ -0,0 +1,152 @@
+"""
+Cache für vorab serialisierte und komprimierte JSON‑Antworten.
+
+Statische Gefahrendaten (Entscheidungsbäume, Metadaten) ändern sich nur bei
+einem Deployment oder beim Hot Reload einer Datei.  Statt sie bei jeder
+Anfrage erneut durch ``jsonable_encoder`` zu schicken, werden sie einmal zu
+Bytes serialisiert und zusätzlich als gzip‑ und (falls installiert)
+Brotli‑Variante abgelegt.  Ein Inhalts‑Hash dient als ETag, sodass Clients
+mit ``If-None-Match`` eine leere 304‑Antwort erhalten.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover - optionale Abhängigkeit
+    brotli = None
+
+# Kleine Antworten lohnen die Kompression nicht
+_MIN_COMPRESS_BYTES = 256
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    """Fertig serialisierte Antwort inklusive komprimierter Varianten."""
+
+    body: bytes
+    etag: str
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+
+def serialize_payload(content: Any) -> CachedPayload:
+    """Serialisiert ``content`` wie ``JSONResponse`` und erzeugt gzip/Brotli‑Varianten."""
+    body = json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    etag = 'W/"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    gz: Optional[bytes] = None
+    br: Optional[bytes] = None
+    if len(body) >= _MIN_COMPRESS_BYTES:
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gz) >= len(body):
+            gz = None
+        if brotli is not None:
+            br = brotli.compress(body, quality=11)
+            if len(br) >= len(body):
+                br = None
+    return CachedPayload(body=body, etag=etag, gzip=gz, br=br)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Schwacher Vergleich gemäß RFC 9110 für eine Liste von ETags."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+class StaticResponseCache:
+    """
+    Hält ``CachedPayload``‑Objekte unter frei wählbaren Schlüsseln, z. B.
+    ``("tree", slug, lang)``.  Einträge werden bei Bedarf über eine
+    Builder‑Funktion erzeugt und können gezielt invalidiert werden.
+    """
+
+    def __init__(self, max_age: int = 60) -> None:
+        self.max_age = max_age
+        self._entries: Dict[Hashable, CachedPayload] = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, builder: Callable[[], Any]) -> CachedPayload:
+        payload = self._entries.get(key)
+        if payload is None:
+            payload = serialize_payload(builder())
+            with self._lock:
+                self._entries[key] = payload
+        return payload
+
+    def invalidate(self, match: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Entfernt alle Einträge (oder nur die, auf die ``match`` zutrifft)."""
+        with self._lock:
+            if match is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [k for k in self._entries if match(k)]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def respond(self, request: Request, payload: CachedPayload) -> Response:
+        """
+        Baut die HTTP‑Antwort: 304 bei passendem ``If-None-Match``, sonst die
+        beste vom Client akzeptierte Kodierung (br > gzip > identity).
+        """
+        headers = {
+            "ETag": payload.etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": f"public, max-age={self.max_age}",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, payload.etag):
+            return Response(status_code=304, headers=headers)
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        body = payload.body
+        if payload.br is not None and accepted.get("br", 0) > 0:
+            body = payload.br
+            headers["Content-Encoding"] = "br"
+        elif payload.gzip is not None and accepted.get("gzip", 0) > 0:
+            body = payload.gzip
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,123 @@
+"""
+Hilfsfunktionen für ``/api/route``.
+
+- ``snap``: rundet Koordinaten auf ein festes Raster, damit nahe
+  beieinanderliegende Start‑/Zielpunkte denselben Cache‑Eintrag nutzen.
+- ``simplify``: Douglas‑Peucker‑Vereinfachung der Routengeometrie mit einer
+  Toleranz in Metern; ``tolerance_for_zoom`` leitet sie aus der Kartenzoomstufe
+  ab (ein halbes Pixel der Web‑Mercator‑Kachel).
+- ``encode_polyline``: Kodierung im Google‑Polyline‑Format, das von Leaflet‑
+  und Mapbox‑Plugins direkt gelesen wird und nur einen Bruchteil der
+  JSON‑Liste belegt; ``decode_polyline`` kehrt sie um.
+"""
+
+import math
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+# Bodenauflösung von Zoomstufe 0 am Äquator (Meter pro 256‑px‑Kachelpixel)
+_MERCATOR_M_PER_PX = 156543.03392
+
+LatLon = Tuple[float, float]
+
+
+def snap(lat: float, lon: float, decimals: int = 4) -> LatLon:
+    """Rundet auf ``decimals`` Nachkommastellen (4 ≈ 11 m)."""
+    return round(lat, decimals), round(lon, decimals)
+
+
+def tolerance_for_zoom(zoom: float, lat: float) -> float:
+    """Toleranz in Metern, unterhalb der Abweichungen auf Zoomstufe ``zoom`` unsichtbar bleiben."""
+    return 0.5 * _MERCATOR_M_PER_PX * math.cos(math.radians(lat)) / (2.0 ** zoom)
+
+
+def simplify(points: Sequence[LatLon], tolerance_m: float) -> List[LatLon]:
+    """
+    Douglas‑Peucker über ``[lat, lon]``‑Punkte.  Die Punkte werden dazu
+    äquirektangulär um den ersten Punkt in Meter projiziert; für Routen im
+    Stadt‑ und Landkreismaßstab ist der Fehler vernachlässigbar.  Erster und
+    letzter Punkt bleiben immer erhalten.
+    """
+    n = len(points)
+    if n <= 2 or tolerance_m <= 0:
+        return [tuple(p) for p in points]  # type: ignore[misc]
+    arr = np.asarray(points, dtype=np.float64)
+    lat0 = math.radians(arr[0, 0])
+    y = np.radians(arr[:, 0]) * EARTH_RADIUS_M
+    x = np.radians(arr[:, 1]) * EARTH_RADIUS_M * math.cos(lat0)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    tol2 = tolerance_m * tolerance_m
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        ax, ay = x[first], y[first]
+        dx, dy = x[last] - ax, y[last] - ay
+        px = x[first + 1:last] - ax
+        py = y[first + 1:last] - ay
+        seg2 = dx * dx + dy * dy
+        if seg2 == 0.0:
+            d2 = px * px + py * py
+        else:
+            # Abstand zum Segment (nicht zur Geraden), damit Kehrtwenden erhalten bleiben
+            t = np.clip((px * dx + py * dy) / seg2, 0.0, 1.0)
+            ex = px - t * dx
+            ey = py - t * dy
+            d2 = ex * ex + ey * ey
+        i = int(np.argmax(d2))
+        if d2[i] > tol2:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return [(float(arr[i, 0]), float(arr[i, 1])) for i in np.flatnonzero(keep).tolist()]
+
+
+def _encode_value(value: int, out: List[str]) -> None:
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(points: Sequence[LatLon], precision: int = 5) -> str:
+    """Kodiert ``[lat, lon]``‑Punkte im Google‑Polyline‑Format."""
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        ilat = int(round(lat * factor))
+        ilon = int(round(lon * factor))
+        _encode_value(ilat - prev_lat, out)
+        _encode_value(ilon - prev_lon, out)
+        prev_lat, prev_lon = ilat, ilon
+    return "".join(out)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[LatLon]:
+    """Umkehrung von ``encode_polyline``."""
+    factor = float(10 ** precision)
+    points: List[LatLon] = []
+    index = lat = lon = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
@@ -1,35 +1,91 @@
 import os
 import json
 import logging
-from fastapi import FastAPI, Request, HTTPException
+import re
+from fastapi import Depends, FastAPI, Header, Query, Request, HTTPException
 from pydantic import BaseModel
-import hashlib
-import secrets
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pymongo import MongoClient
-import requests
+import asyncio
+import gc
 import time
-_POI_CACHE: dict[str, tuple[float, dict]] = {}
-_POI_TTL_SECONDS = 180  # seconds
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 
 from typing import List, Dict, Any, Optional
 from urllib.parse import quote_plus
 
+from answer_cache import AnswerCache, answer_key
+from auth import PasswordVerifier, TokenStore, UserCache
+from cache import AsyncTTLCache, all_stats, set_shared_tier, shared_tier_from_env
+from chat_history import HistoryManager, session_history
+from chat_sessions import ChatSessionStore
+from external_integrations.mowas import MOWAS_BASE_URL, LiveSource, MowasIngester, ReplaySource
+from external_integrations.nominatim import Geocoder, MongoGeocodeStore
+from external_integrations.upstream import UpstreamPool
+from hazard_matcher import HazardMatcher
+from llm_gateway import LLMGateway, LLMUnavailable
+from metrics import CONTENT_TYPE_LATEST, LoopLagMonitor, Metrics, MetricsMiddleware
+from nearest import rank_by_distance
+from node_index import NodeIndex, NodeMatch, collect_nodes
+from persistence import MongoPersistence
+from readiness import HealthMonitor
+from offline_pois import OfflinePoiStore, tags_match_type, tags_to_poi
+from poi_tiles import haversine_m, lonlat_to_tile, radius_bbox, tiles_for_radius, union_bbox
+from response_cache import StaticResponseCache
+from routing import encode_polyline, simplify, snap, tolerance_for_zoom
+from sse import StreamStats, iter_words, sse_message, stream_frames
+from telemetry import JsonlTelemetrySink, MongoTelemetrySink, TelemetryPipeline, TelemetryRollups
+from tree_store import SUPPORTED_LANGS, DecisionTreeStore
+
 # Konfiguration / Umgebungsvariablen
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MONGO_URL = os.getenv("MONGO_URL")
 GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
 
-# OpenAI-Client (NEU ab openai>=1.0.0)
-try:
-    import openai
-    if OPENAI_API_KEY:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    else:
-        client = None
-except Exception:
-    client = None
+# Sprachmodell: alle Aufrufe laufen asynchron über das LLM-Gateway
+# (AsyncOpenAI, Parallelitätsgrenze, Fristen, Retries, Circuit Breaker).
+# Ohne OPENAI_API_KEY ist LLM.available False.
+LLM = LLMGateway.from_env()
+
+# Chat-Verläufe werden vor dem Aufruf auf CHAT_HISTORY_BUDGET Tokens gekürzt:
+# System-Nachrichten und die jüngsten Nachrichten (mindestens
+# CHAT_HISTORY_KEEP_LAST) bleiben, ältere werden in einer Zusammenfassung
+# von höchstens CHAT_SUMMARY_BUDGET Tokens zusammengefasst.
+HISTORY = HistoryManager(
+    budget=int(os.getenv("CHAT_HISTORY_BUDGET", "3000")),
+    keep_last=int(os.getenv("CHAT_HISTORY_KEEP_LAST", "4")),
+    summary_budget=int(os.getenv("CHAT_SUMMARY_BUDGET", "300")),
+)
+
+# Serverseitige Chat-Sitzungen (Redis, falls REDIS_URL gesetzt ist, sonst im
+# Prozess): Clients schicken nur noch die neue Nachricht.  CHAT_SESSION_TTL in
+# Sekunden seit der letzten Nachricht, CHAT_SESSION_MAX_ENTRIES begrenzt die
+# Sitzungen im Prozess, CHAT_SESSION_MAX_MESSAGES die Nachrichten je Sitzung.
+CHAT_SESSIONS = ChatSessionStore.from_env(
+    os.getenv("REDIS_URL"),
+    max_entries=int(os.getenv("CHAT_SESSION_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("CHAT_SESSION_TTL", "3600")),
+    max_messages=int(os.getenv("CHAT_SESSION_MAX_MESSAGES", "200")),
+)
+
+
+async def _session_messages(
+    data: Dict[str, Any], new_messages: List[Dict[str, Any]]
+) -> tuple[str | None, List[Dict[str, Any]], bool]:
+    """
+    (session_id, Verlauf inkl. neuer Nachrichten, neu_gestartet).  Ohne
+    ``session_id`` und ohne ``"session": true`` bleibt der Aufruf zustandslos.
+    Ist die Sitzung unbekannt oder abgelaufen, wird eine neue angelegt.
+    """
+    session_id = data.get("session_id")
+    if not session_id and not data.get("session"):
+        return None, list(new_messages), False
+    stored = await CHAT_SESSIONS.load(session_id) if session_id else None
+    if stored is None:
+        return CHAT_SESSIONS.new_id(), list(new_messages), bool(session_id)
+    return str(session_id), stored + list(new_messages), False
 
 # MongoDB
 # Optionaler Datenbankname: Wenn keine Datenbank in der URI angegeben ist,
@@ -40,7 +96,9 @@ except Exception:
 # Namen aus der URI abzuleiten. Schlägt auch dies fehl, wird eine
 # fallback‑Datenbank "test" verwendet.
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME") or ''
-mongo = MongoClient(MONGO_URL)
+# connect=False: die Verbindung entsteht erst beim ersten Zugriff, der Import
+# (und damit der Start) wartet nicht auf die Datenbank.
+mongo = MongoClient(MONGO_URL, connect=False)
 db = None
 try:
     # Wenn ein Name gesetzt ist und nur zulässige Zeichen enthält, verwende ihn direkt.
@@ -62,15 +120,25 @@ if db is None:
     # Fallback auf Standard‑Datenbank "test"
     db = mongo['test']
 
-# Referenz auf die Benutzer‑Collection.  Diese wird lazily
-# angelegt, wenn sie noch nicht existiert.  Wir verwenden eine
-# separate Collection, um Benutzer über ein Skript (init_users)
-# verwalten zu können.  Wenn sie nicht existiert, wird sie von
-# MongoDB automatisch erstellt.
-users_collection = db.get_collection("users")
+# Asynchroner Zugriff (Motor) für Feedback und Benutzer auf dieselbe
+# Datenbank.  Die Benutzer liegen in einer eigenen Collection "users", die
+# über ein Skript (init_users) gepflegt werden kann.  Feedback wird gepuffert
+# und gebündelt geschrieben (FEEDBACK_BATCH_SIZE, FEEDBACK_FLUSH_INTERVAL).
+PERSISTENCE = MongoPersistence.from_env(MONGO_URL, db.name)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start‑ und Stoppphase der App, siehe ``_startup`` und ``_shutdown`` am Dateiende."""
+    await _startup()
+    try:
+        yield
+    finally:
+        await _shutdown()
+
 
 # FastAPI App
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -80,6 +148,49 @@ app.add_middleware(
 
 logger = logging.getLogger("server")
 
+# Anzahl der Worker-Prozesse (gunicorn, siehe gunicorn.conf.py); 1 = uvicorn.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+# Gemeinsame zweite Cache-Ebene in Redis (falls REDIS_URL gesetzt ist) für
+# POI-, Kachel- und Routen-Cache: bei mehreren Workern lädt nur einer vom
+# Upstream, die anderen finden das Ergebnis dort.
+set_shared_tier(shared_tier_from_env(os.getenv("REDIS_URL")))
+
+# Gemeinsamer HTTP‑Client mit Verbindungspool für alle externen Dienste
+# (Overpass, Google Places, OSRM, Nominatim, MoWaS).  Timeouts und
+# Parallelitätsgrenzen je Dienst sind über UPSTREAM_* konfigurierbar.
+UPSTREAMS = UpstreamPool.from_env()
+
+# Prometheus-Metriken unter /metrics: Dauer und Status je Route, Dauer und
+# Fehler je Upstream (inkl. OpenAI mit Zeit bis zum ersten Token und
+# Tokenzahlen), Cache-Zähler und die Verspätung der Event-Loop (gemessen
+# alle LOOP_LAG_INTERVAL Sekunden, 0 deaktiviert die Messung).
+METRICS = Metrics(cache_stats=lambda: _cache_stats())
+app.add_middleware(MetricsMiddleware, metrics=METRICS)
+UPSTREAMS.observer = METRICS.observe_upstream
+LLM.observer = METRICS.observe_llm
+LOOP_LAG = LoopLagMonitor(METRICS, interval=float(os.getenv("LOOP_LAG_INTERVAL", "0.5")))
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    status, body = METRICS.render()
+    return Response(content=body, status_code=status, headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+
+# MoWaS‑Warnungen werden im Hintergrund alle MOWAS_POLL_INTERVAL Sekunden
+# per bedingter Anfrage abgeglichen (0 deaktiviert den Poller).  Mit
+# MOWAS_REPLAY_DIR wird statt des Live‑Dienstes ein aufgezeichneter Feed
+# abgespielt.
+MOWAS_POLL_INTERVAL = float(os.getenv("MOWAS_POLL_INTERVAL", "60"))
+MOWAS_REPLAY_DIR = os.getenv("MOWAS_REPLAY_DIR")
+MOWAS = MowasIngester(
+    ReplaySource(MOWAS_REPLAY_DIR) if MOWAS_REPLAY_DIR else LiveSource(UPSTREAMS, os.getenv("MOWAS_URL", MOWAS_BASE_URL)),
+    interval=MOWAS_POLL_INTERVAL,
+)
+
+
 # Einfache Benutzerdatenbank.  Für eine produktive Umgebung sollten
 # Passwörter natürlich nicht im Klartext gespeichert werden.  Hier
 # nutzen wir einen SHA‑256‑Hash zur Veranschaulichung.  In einer
@@ -90,6 +201,8 @@ logger = logging.getLogger("server")
 # mit SHA‑256 gehasht.  Du kannst neue Benutzer hinzufügen, indem du
 # das Passwort entsprechend verschlüsselst:
 #    hashlib.sha256(pw.encode()).hexdigest()
+# oder – gesalzen und langsam, für neue Konten vorzuziehen:
+#    auth.hash_password(pw)
 # Achtung: In der ursprünglichen Version war die Hash‑Summe mit
 # "password123" statt "passwort123" erstellt, was zu Verwirrungen
 # führen konnte.  Hier wird der Hash für "passwort123" verwendet.
@@ -101,12 +214,115 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
-# Lade Metadaten über Gefahren (Name, Beschreibung, Synonyme, erlaubte Aufenthaltsorte)
-try:
-    with open(os.path.join("data", "hazards_meta.json"), encoding="utf-8") as f:
-        HAZARD_META = json.load(f)
-except Exception:
-    HAZARD_META = {}
+# Metadaten über Gefahren (Name, Beschreibung, Synonyme, erlaubte Aufenthaltsorte).
+# Geladen wird in der Startphase (reload_hazard_meta), nicht beim Import.
+HAZARD_META_PATH = os.path.join("data", "hazards_meta.json")
+_HAZARD_META_MTIME: float | None = None
+HAZARD_META: Dict[str, Any] = {}
+
+# Aho‑Corasick‑Automat über alle Namen und Synonyme für /api/auto-navigate.
+# Wird beim Start und bei jedem Neuladen der Metadaten neu kompiliert.
+HAZARD_MATCHER = HazardMatcher(HAZARD_META)
+
+# Entscheidungsbäume werden einmalig in der Startphase in den Arbeitsspeicher
+# geladen und von allen Endpunkten gemeinsam genutzt.  Der Fallback auf
+# Deutsch ist dort bereits aufgelöst.  Änderungen an den Dateien werden
+# über einen Hintergrund‑Thread erkannt (Intervall in Sekunden über
+# TREE_RELOAD_INTERVAL, 0 deaktiviert das Hot Reload).
+TREE_RELOAD_INTERVAL = float(os.getenv("TREE_RELOAD_INTERVAL", "2"))
+TREE_STORE = DecisionTreeStore(os.path.join("data", "decision-trees"))
+
+
+def _get_tree_or_404(slug: str, lang: str | None) -> Dict[str, Any]:
+    """Holt einen Baum aus dem Speicher oder wirft einen 404‑Fehler."""
+    tree = TREE_STORE.get(slug, lang)
+    if tree is None:
+        raise HTTPException(status_code=404, detail="Decision Tree not found")
+    return tree
+
+# Vorab serialisierte Antworten (inkl. gzip/Brotli und ETag) für die
+# statischen Gefahren‑Endpunkte.  Wird ein Baum neu geladen, werden die
+# Einträge dieses Slugs verworfen und beim nächsten Abruf neu gebaut.
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "60"))
+RESPONSE_CACHE = StaticResponseCache(max_age=STATIC_MAX_AGE)
+
+
+def _invalidate_tree_responses(slug: str, lang: str) -> None:
+    RESPONSE_CACHE.invalidate(lambda key: len(key) > 1 and key[1] == slug)
+
+
+TREE_STORE.add_listener(_invalidate_tree_responses)
+
+
+def reload_hazard_meta() -> bool:
+    """
+    Lädt ``hazards_meta.json`` neu, sobald sich die Datei geändert hat.
+    Der Matcher wird neu kompiliert und die davon abhängigen Antworten
+    im Cache verworfen.  Bei fehlerhafter Datei bleibt der alte Stand aktiv.
+    """
+    global HAZARD_META, HAZARD_MATCHER, _HAZARD_META_MTIME
+    try:
+        mtime = os.path.getmtime(HAZARD_META_PATH)
+    except OSError:
+        return False
+    if mtime == _HAZARD_META_MTIME:
+        return False
+    try:
+        with open(HAZARD_META_PATH, encoding="utf-8") as f:
+            meta = json.load(f)
+    except Exception as e:
+        logger.error(f"Fehler beim Neuladen von hazards_meta.json: {e}")
+        _HAZARD_META_MTIME = mtime
+        return False
+    matcher = HazardMatcher(meta)
+    HAZARD_META, HAZARD_MATCHER, _HAZARD_META_MTIME = meta, matcher, mtime
+    RESPONSE_CACHE.invalidate(lambda key: key[0] != "tree")
+    logger.info(f"hazards_meta.json neu geladen ({len(meta)} Gefahren, {matcher.pattern_count} Begriffe)")
+    return True
+
+
+TREE_STORE.add_poll_hook(reload_hazard_meta)
+
+# BM25‑Index über alle Baumknoten für die Grounded‑Answer‑Endpunkte.  Pro
+# Frage werden höchstens GROUNDED_TOP_K Knoten mit zusammen höchstens
+# GROUNDED_TOKEN_BUDGET Tokens in den Prompt übernommen.  Nach einem Hot
+# Reload wird der Index einmal pro Watcher‑Durchlauf neu aufgebaut.
+GROUNDED_TOP_K = int(os.getenv("GROUNDED_TOP_K", "5"))
+GROUNDED_TOKEN_BUDGET = int(os.getenv("GROUNDED_TOKEN_BUDGET", "400"))
+NODE_INDEX = NodeIndex(SUPPORTED_LANGS)
+_node_index_dirty = False
+
+
+def _mark_node_index_dirty(slug: str, lang: str) -> None:
+    global _node_index_dirty
+    _node_index_dirty = True
+
+
+def _rebuild_node_index() -> bool:
+    global _node_index_dirty
+    if not _node_index_dirty:
+        return False
+    _node_index_dirty = False
+    NODE_INDEX.build(TREE_STORE)
+    return True
+
+
+TREE_STORE.add_listener(_mark_node_index_dirty)
+TREE_STORE.add_poll_hook(_rebuild_node_index)
+
+# Passt eine Frage mit einer Konfidenz von mindestens TREE_ANSWER_THRESHOLD
+# (0–1, siehe node_index.NodeIndex.best) zu einem Knoten, wird direkt mit
+# dessen Text geantwortet (``source: "tree"``), ohne Sprachmodell.  Werte > 1
+# schalten die Direktantwort ab; als Ersatz bei gestörtem Modell dient sie
+# weiterhin.
+TREE_ANSWER_THRESHOLD = float(os.getenv("TREE_ANSWER_THRESHOLD", "0.6"))
+
+
+def _cache_lang(slug: str, lang: str | None) -> str:
+    """Begrenzt die Sprach‑Schlüssel des Antwort‑Caches auf tatsächlich ausgelieferte Varianten."""
+    if lang in SUPPORTED_LANGS:
+        return lang
+    return TREE_STORE.resolved_lang(slug, lang) or "de"
 
 # ------------------------------------------------------------
 # Hilfsfunktionen und Endpunkte für Points of Interest (POIs)
@@ -119,25 +335,51 @@ CITY_BBOXES: dict[str, tuple[float, float, float, float]] = {
     "muenchen": (47.90, 11.20, 48.40, 11.80)
 }
 
-def build_overpass_query(min_lat: float, min_lon: float, max_lat: float, max_lon: float, types: Optional[List[str]] = None) -> str:
-    """
-    Erstellt eine Overpass‑Query innerhalb einer Bounding‑Box. Standardmäßig
-    werden Krankenhäuser, Polizeiwachen, Feuerwachen, Apotheken,
-    Notunterkünfte und ÖPNV‑Stationen abgefragt.  Wenn eine Liste
-    `types` übergeben wird, werden nur die entsprechenden Kategorien in
-    die Abfrage aufgenommen.  Folgende Schlüssel werden unterstützt:
+# Cache für /api/pois: LRU‑begrenzt, mit TTL, Single‑Flight und
+# Stale‑While‑Revalidate (abgelaufene Einträge werden bis POI_CACHE_STALE_TTL
+# Sekunden weiter ausgeliefert und im Hintergrund erneuert).
+_POI_CACHE: AsyncTTLCache[Dict[str, Any]] = AsyncTTLCache(
+    "pois",
+    max_entries=int(os.getenv("POI_CACHE_MAX_ENTRIES", "2048")),
+    ttl=float(os.getenv("POI_CACHE_TTL", "180")),
+    stale_ttl=float(os.getenv("POI_CACHE_STALE_TTL", "600")),
+    shared=True,
+)
 
-    - hospital, police, fire_station, pharmacy, shelter
-    - station (ersetzt railway=station und public_transport=station)
-    - doctors, clinic, veterinary, social_facility, toilets
-    """
-    # Definiere Mapping von Typen zu Overpass-Teilen
-    default_types = [
-        "hospital", "police", "fire_station", "pharmacy", "shelter", "station"
-    ]
-    query_types = types or default_types
+# POIs für Koordinaten werden kachelweise (Slippy‑Map‑Kacheln der Zoomstufe
+# POI_TILE_ZOOM) geladen und pro (Kachel, Typ) gecacht.  Überlappende
+# Anfragen teilen sich dadurch die Overpass‑Ergebnisse; nur fehlende
+# Kacheln werden nachgeladen.
+POI_TILE_ZOOM = int(os.getenv("POI_TILE_ZOOM", "14"))
+POI_MAX_RADIUS = int(os.getenv("POI_MAX_RADIUS", "10000"))
+_POI_TILE_CACHE: AsyncTTLCache[List[Dict[str, Any]]] = AsyncTTLCache(
+    "poi_tiles",
+    max_entries=int(os.getenv("POI_TILE_CACHE_MAX_ENTRIES", "20000")),
+    ttl=float(os.getenv("POI_TILE_CACHE_TTL", "3600")),
+    stale_ttl=float(os.getenv("POI_TILE_CACHE_STALE_TTL", "86400")),
+    shared=True,
+)
+
+OVERPASS_URL = os.getenv("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+GOOGLE_PLACES_DETAILS_URL = os.getenv(
+    "GOOGLE_PLACES_DETAILS_URL", "https://maps.googleapis.com/maps/api/place/details/json"
+)
+
+# Offline‑POIs aus lokalen OSM‑Extrakten (siehe offline_pois.py).  Liegt
+# eine Anfrage vollständig in einer importierten Region, wird sie ohne
+# Overpass beantwortet; Overpass dient nur noch als Fallback.
+OFFLINE_POI_DIR = os.getenv("OFFLINE_POI_DIR", os.path.join("data", "offline-pois"))
+OFFLINE_POIS = OfflinePoiStore.load_dir(OFFLINE_POI_DIR)
+
+DEFAULT_POI_TYPES: List[str] = [
+    "hospital", "police", "fire_station", "pharmacy", "shelter", "station"
+]
+
+
+def _overpass_lines(min_lat: float, min_lon: float, max_lat: float, max_lon: float, types: List[str]) -> List[str]:
+    """Overpass‑Statements für die angegebenen Typen innerhalb einer Bounding‑Box."""
     lines = []
-    for t in query_types:
+    for t in types:
         t = t.strip().lower()
         if t == "station":
             lines.append(f'  node["railway"="station"]({min_lat},{min_lon},{max_lat},{max_lon});')
@@ -147,6 +389,10 @@ def build_overpass_query(min_lat: float, min_lon: float, max_lat: float, max_lon
         else:
             # Fallback: allgemeiner amenity‑Typ
             lines.append(f'  node["amenity"="{t}"]({min_lat},{min_lon},{max_lat},{max_lon});')
+    return lines
+
+
+def _wrap_overpass_query(lines: List[str]) -> str:
     body = "\n".join(lines)
     query = f"""
     [out:json][timeout:25];
@@ -157,60 +403,132 @@ def build_overpass_query(min_lat: float, min_lon: float, max_lat: float, max_lon
     """.strip()
     return query
 
-def fetch_pois_overpass(city: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None, radius: int = 2000, types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+
+def build_overpass_query(min_lat: float, min_lon: float, max_lat: float, max_lon: float, types: Optional[List[str]] = None) -> str:
+    """
+    Erstellt eine Overpass‑Query innerhalb einer Bounding‑Box. Standardmäßig
+    werden Krankenhäuser, Polizeiwachen, Feuerwachen, Apotheken,
+    Notunterkünfte und ÖPNV‑Stationen abgefragt.  Wenn eine Liste
+    `types` übergeben wird, werden nur die entsprechenden Kategorien in
+    die Abfrage aufgenommen.  Folgende Schlüssel werden unterstützt:
+
+    - hospital, police, fire_station, pharmacy, shelter
+    - station (ersetzt railway=station und public_transport=station)
+    - doctors, clinic, veterinary, social_facility, toilets
+    """
+    return _wrap_overpass_query(_overpass_lines(min_lat, min_lon, max_lat, max_lon, types or DEFAULT_POI_TYPES))
+
+
+async def _run_overpass(query: str) -> List[Dict[str, Any]]:
+    try:
+        resp = await UPSTREAMS.post("overpass", OVERPASS_URL, content=query)
+        data = resp.json()
+    except Exception as e:
+        logger.error(f"Fehler bei Overpass-Abfrage: {e}")
+        raise HTTPException(status_code=500, detail="Fehler bei der Overpass-Abfrage")
+    return data.get("elements", [])
+
+
+def _element_to_poi(element: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Wandelt ein Overpass‑Element in einen POI um (None für Elemente ohne Namen)."""
+    lat_el = element.get("lat") or element.get("center", {}).get("lat")
+    lon_el = element.get("lon") or element.get("center", {}).get("lon")
+    return tags_to_poi(element.get("tags", {}), lat_el, lon_el)
+
+
+def _element_matches_type(element: Dict[str, Any], poi_type: str) -> bool:
+    return tags_match_type(element.get("tags", {}), poi_type)
+
+
+def _normalize_types(types: Optional[List[str]]) -> List[str]:
+    return sorted({t.strip().lower() for t in (types or DEFAULT_POI_TYPES) if t.strip()})
+
+
+async def _fetch_poi_tiles(keys: List[Any]) -> Dict[Any, List[Dict[str, Any]]]:
+    """
+    Lädt fehlende (Kachel, Typ)‑Paare mit einer einzigen Overpass‑Abfrage.
+    Pro Typ wird die umschließende Box seiner fehlenden Kacheln abgefragt;
+    die Treffer werden anschließend anhand ihrer Koordinaten wieder den
+    Kacheln zugeordnet.
+    """
+    tiles_by_type: Dict[str, List[Any]] = {}
+    for tile, poi_type in keys:
+        tiles_by_type.setdefault(poi_type, []).append(tile)
+    lines: List[str] = []
+    for poi_type, tiles in tiles_by_type.items():
+        lines.extend(_overpass_lines(*union_bbox(tiles), [poi_type]))
+    elements = await _run_overpass(_wrap_overpass_query(lines))
+    buckets: Dict[Any, List[Dict[str, Any]]] = {key: [] for key in keys}
+    for element in elements:
+        poi = _element_to_poi(element)
+        if poi is None or poi["lat"] is None or poi["lng"] is None:
+            continue
+        tile = lonlat_to_tile(poi["lat"], poi["lng"], POI_TILE_ZOOM)
+        for poi_type in tiles_by_type:
+            key = (tile, poi_type)
+            if key in buckets and _element_matches_type(element, poi_type):
+                buckets[key].append(poi)
+    return buckets
+
+
+async def fetch_pois_tiled(lat: float, lon: float, radius: int, types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Liefert POIs im Umkreis ``radius`` (Meter) um lat/lon.  Die Daten werden
+    aus dem Kachel‑Cache zusammengesetzt; fehlende Kacheln werden gesammelt
+    bei Overpass nachgeladen.  Ergebnisse außerhalb des Radius werden
+    verworfen.
+    """
+    radius = max(1, min(int(radius), POI_MAX_RADIUS))
+    query_types = _normalize_types(types)
+    tiles = tiles_for_radius(lat, lon, radius, POI_TILE_ZOOM)
+    keys = [(tile, t) for tile in tiles for t in query_types]
+    buckets = await _POI_TILE_CACHE.get_many_or_fetch(keys, _fetch_poi_tiles)
+    pois: List[Dict[str, Any]] = []
+    seen: set[tuple] = set()
+    for key in keys:
+        for poi in buckets[key]:
+            ident = (poi["name"], poi["lat"], poi["lng"])
+            if ident in seen:
+                continue
+            seen.add(ident)
+            if haversine_m(lat, lon, poi["lat"], poi["lng"]) <= radius:
+                # Kopie, damit spätere Anreicherungen den Kachel‑Cache nicht verändern
+                pois.append(dict(poi))
+    return pois
+
+
+async def fetch_pois_overpass(city: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None, radius: int = 2000, types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     """
     Ruft POIs aus der Overpass‑API ab.  Wenn eine Stadt angegeben ist und eine
     bekannte Bounding‑Box existiert, wird diese genutzt.  Andernfalls
-    berechnet die Funktion eine Bounding‑Box um die gegebene Position mit
-    einem einfachen Puffer.  Das Ergebnis ist eine Liste von POIs mit
-    Name, Typ und Koordinaten.
+    werden die POIs im Umkreis ``radius`` um die Position über den
+    Kachel‑Cache bestimmt (siehe ``fetch_pois_tiled``).  Das Ergebnis ist
+    eine Liste von POIs mit Name, Typ und Koordinaten.  Ist für das Gebiet
+    ein lokaler OSM‑Extrakt importiert, wird Overpass nicht abgefragt.
     """
-    # Bestimme Bounding‑Box
+    query_types = _normalize_types(types)
     if city and city in CITY_BBOXES:
         min_lat, min_lon, max_lat, max_lon = CITY_BBOXES[city]
+        region = OFFLINE_POIS.region_named(city, query_types) if OFFLINE_POIS else None
+        if region is not None:
+            return [region.poi(row) for row in region.in_bbox(CITY_BBOXES[city], query_types)]
     elif lat is not None and lon is not None:
-        # 0.02 Grad ~ 2 km – einfache Näherung. Für größere Flächen sollte
-        # der Puffer angepasst werden.
-        delta = 0.02
-        min_lat, min_lon, max_lat, max_lon = lat - delta, lon - delta, lat + delta, lon + delta
+        radius = max(1, min(int(radius), POI_MAX_RADIUS))
+        region = OFFLINE_POIS.region_for(radius_bbox(lat, lon, radius), query_types) if OFFLINE_POIS else None
+        if region is not None:
+            return [region.poi(row) for row, _ in region.within(lat, lon, radius, query_types)]
+        return await fetch_pois_tiled(lat, lon, radius, types)
     else:
         raise HTTPException(status_code=400, detail="Entweder city oder lat/lon muss angegeben werden")
     query = build_overpass_query(min_lat, min_lon, max_lat, max_lon, types=types)
-    url = "https://overpass-api.de/api/interpreter"
-    try:
-        resp = requests.post(url, data=query, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        logger.error(f"Fehler bei Overpass-Abfrage: {e}")
-        raise HTTPException(status_code=500, detail="Fehler bei der Overpass-Abfrage")
     pois: List[Dict[str, Any]] = []
-    for element in data.get("elements", []):
-        tags = element.get("tags", {})
-        name = tags.get("name")
-        # Ignoriere Elemente ohne Namen
-        if not name:
-            continue
-        # Versuche den Typ anhand der Tags zu bestimmen
-        poi_type = None
-        if tags.get("amenity") in {"hospital", "police", "fire_station", "pharmacy", "shelter"}:
-            poi_type = tags.get("amenity")
-        elif tags.get("railway") == "station" or tags.get("public_transport") == "station":
-            poi_type = "station"
-        else:
-            poi_type = tags.get("amenity") or tags.get("public_transport")
-        lat_el = element.get("lat") or element.get("center", {}).get("lat")
-        lon_el = element.get("lon") or element.get("center", {}).get("lon")
-        pois.append({
-            "name": name,
-            "type": poi_type,
-            "lat": lat_el,
-            "lng": lon_el,
-            "address": tags.get("addr:full") or tags.get("addr:street"),
-        })
+    for element in await _run_overpass(query):
+        poi = _element_to_poi(element)
+        if poi is not None:
+            pois.append(poi)
     return pois
 
-def fetch_place_details(place_id: str, fields: str = "name,formatted_address,formatted_phone_number,current_opening_hours,opening_hours,international_phone_number,website") -> Optional[Dict[str, Any]]:
+async def fetch_place_details(place_id: str, fields: str = "name,formatted_address,formatted_phone_number,current_opening_hours,opening_hours,international_phone_number,website") -> Optional[Dict[str, Any]]:
     """
     Ruft Details zu einem Ort über die Google Places API ab.  Dieser Helper
     verwendet den in der Umgebungsvariablen gespeicherten API‑Key.  Wenn kein
@@ -225,8 +543,7 @@ def fetch_place_details(place_id: str, fields: str = "name,formatted_address,for
         "key": key,
     }
     try:
-        resp = requests.get("https://maps.googleapis.com/maps/api/place/details/json", params=params, timeout=10)
-        resp.raise_for_status()
+        resp = await UPSTREAMS.get("google_places", GOOGLE_PLACES_DETAILS_URL, params=params)
         data = resp.json()
         if data.get("status") != "OK":
             return None
@@ -236,7 +553,7 @@ def fetch_place_details(place_id: str, fields: str = "name,formatted_address,for
         return None
 
 @app.get("/api/pois")
-def get_pois(
+async def get_pois(
     city: str | None = None,
     lat: float | None = None,
     lon: float | None = None,
@@ -255,60 +572,104 @@ def get_pois(
 
     - `city`: Name der Stadt (berlin, muenchen, …).  Hat Vorrang gegenüber lat/lon.
     - `lat`, `lon`: Koordinaten für die Suche, falls keine Stadt angegeben ist.
-    - `radius`: Suchradius in Metern (nur relevant für Google Places).  Overpass
-      nutzt Bounding‑Boxen, die aus city oder lat/lon abgeleitet werden.
+    - `radius`: Suchradius in Metern um lat/lon (höchstens POI_MAX_RADIUS).
+      Bei Angabe einer Stadt wird deren Bounding‑Box verwendet.
     - `use_google`: Wenn true, werden zusätzlich Informationen aus Google
       abgefragt.  Beachte, dass dies API‑Kosten verursachen kann.
     - `types`: Kommagetrennte Liste von amenity‑Typen, um die Abfrage
       einzuschränken (z. B. "hospital,police,station").
     """
-    
-    # --- simple in-memory cache to reduce Overpass load ---
-    # Build a cache key using rounded coords, radius and types
-    try:
-        key_parts = [
-            f"{round(lat or 0.0, 3)}",
-            f"{round(lon or 0.0, 3)}",
-            f"r{int(radius)}",
-            f"t{','.join(type_list or [])}"
-        ]
-        cache_key = "|".join(key_parts)
-        now = time.time()
-        cached = _POI_CACHE.get(cache_key)
-        if cached and now - cached[0] < _POI_TTL_SECONDS:
-            return cached[1]
-    except Exception:
-        cache_key = None
-    # ------------------------------------------------------
-# Wandle types-String in Liste um
+
+    # Wandle types-String in Liste um
     type_list: Optional[List[str]] = None
     if types:
         type_list = [t.strip() for t in types.split(",") if t.strip()]
+    if not (city and city in CITY_BBOXES) and (lat is None or lon is None):
+        raise HTTPException(status_code=400, detail="Entweder city oder lat/lon muss angegeben werden")
+    # Cache‑Schlüssel: bekannte Städte über ihren Namen, sonst gerundete
+    # Koordinaten (~100 m); Typen sortiert, damit die Reihenfolge egal ist
+    if city and city in CITY_BBOXES:
+        area = f"city:{city}"
+    else:
+        area = f"{round(lat, 3)},{round(lon, 3)}"
+    cache_key = (area, int(radius), tuple(sorted(t.lower() for t in type_list or [])), bool(use_google and GOOGLE_PLACES_API_KEY))
+    return await _POI_CACHE.get_or_fetch(
+        cache_key,
+        lambda: _load_pois(city, lat, lon, radius, type_list, use_google),
+    )
+
+
+async def _load_pois(
+    city: Optional[str],
+    lat: Optional[float],
+    lon: Optional[float],
+    radius: int,
+    type_list: Optional[List[str]],
+    use_google: bool,
+) -> Dict[str, Any]:
+    """Lädt POIs aus Overpass (und optional Google) – wird vom POI‑Cache aufgerufen."""
     # Hole POIs aus Overpass mit optionaler Filterliste
-    pois = fetch_pois_overpass(city=city, lat=lat, lon=lon, radius=radius, types=type_list)
-    # Optional: hol zusätzliche Details via Google Places
+    pois = await fetch_pois_overpass(city=city, lat=lat, lon=lon, radius=radius, types=type_list)
+    # Optional: hol zusätzliche Details via Google Places (parallel, begrenzt
+    # durch das Limit des google_places‑Upstreams)
     if use_google and GOOGLE_PLACES_API_KEY:
-        for poi in pois:
-            place_id = poi.get("google_place_id")
-            if place_id:
-                details = fetch_place_details(place_id)
-                if details:
-                    poi["phone"] = details.get("formatted_phone_number") or details.get("international_phone_number")
-                    hours = details.get("current_opening_hours") or details.get("opening_hours")
-                    if hours:
-                        poi["opening_hours"] = hours
-                    poi["website"] = details.get("website")
-    result = {"pois": pois}
-    if 'cache_key' in locals() and cache_key:
-        _POI_CACHE[cache_key] = (time.time(), result)
-    return result
+        with_place = [poi for poi in pois if poi.get("google_place_id")]
+        all_details = await asyncio.gather(*(fetch_place_details(poi["google_place_id"]) for poi in with_place))
+        for poi, details in zip(with_place, all_details):
+            if details:
+                poi["phone"] = details.get("formatted_phone_number") or details.get("international_phone_number")
+                hours = details.get("current_opening_hours") or details.get("opening_hours")
+                if hours:
+                    poi["opening_hours"] = hours
+                poi["website"] = details.get("website")
+    return {"pois": pois}
+
+# Suchradien (Meter), mit denen /api/pois/nearest nacheinander Kandidaten
+# sammelt, bis genügend Treffer vorliegen.  Dank Kachel‑Cache sind die
+# größeren Stufen nur für die zusätzlichen Kacheln teuer.
+NEAREST_SEARCH_RADII = (2000, 5000)
+
+
+@app.get("/api/pois/nearest")
+async def get_nearest_pois(
+    lat: float,
+    lon: float,
+    types: str | None = None,
+    k: int = 5,
+    max_distance: int = 10000,
+):
+    """
+    Liefert die ``k`` nächstgelegenen POIs (Standard 5, höchstens 50) der
+    angegebenen Typen innerhalb von ``max_distance`` Metern, aufsteigend
+    nach Großkreisentfernung sortiert.  Jeder Eintrag enthält zusätzlich
+    ``distance`` (Meter) und ``bearing`` (Grad, 0 = Nord).  Die Kandidaten
+    stammen aus derselben Pipeline wie ``/api/pois`` (Offline‑Extrakt,
+    sonst Overpass‑Kacheln); der Suchradius wird schrittweise vergrößert,
+    bis ``k`` Treffer gefunden sind.  ``source`` gibt an, ob die Antwort
+    aus einem lokalen OSM‑Extrakt (``offline``) oder über Overpass
+    (``overpass``) kam.
+    """
+    k = max(1, min(k, 50))
+    max_distance = max(1, min(max_distance, POI_MAX_RADIUS))
+    type_list = _normalize_types([t for t in types.split(",")] if types else None)
+    region = OFFLINE_POIS.region_for(radius_bbox(lat, lon, max_distance), type_list) if OFFLINE_POIS else None
+    if region is not None:
+        candidates = [region.poi(row) for row, _ in region.nearest(lat, lon, k, type_list, max_distance)]
+        return {"pois": rank_by_distance(lat, lon, candidates, k), "source": "offline"}
+    ranked: List[Dict[str, Any]] = []
+    for radius in [r for r in NEAREST_SEARCH_RADII if r < max_distance] + [max_distance]:
+        candidates = await fetch_pois_tiled(lat, lon, radius, type_list)
+        ranked = rank_by_distance(lat, lon, candidates, k, radius)
+        if len(ranked) >= k:
+            break
+    return {"pois": ranked, "source": "overpass"}
 
 @app.get("/")
 def root():
     return {"status": "ok", "message": "API running"}
 
 @app.get("/api/hazards")
-def list_hazards():
+def list_hazards(request: Request):
     """
     Liste aller verfügbaren Gefahren ermitteln.
 
@@ -318,8 +679,10 @@ def list_hazards():
     Entscheidungsbäume können weiterhin existieren, werden hier jedoch
     ausgeblendet, wenn sie nicht in ``hazards_meta.json`` definiert sind.
     """
-    hazards = set(HAZARD_META.keys())
-    return {"hazards": sorted(hazards)}
+    payload = RESPONSE_CACHE.get_or_build(
+        ("hazards",), lambda: {"hazards": sorted(set(HAZARD_META.keys()))}
+    )
+    return RESPONSE_CACHE.respond(request, payload)
 
 # Endpunkt, um die Metadaten aller Gefahren abzurufen.  Die Struktur ist
 # ein Dictionary, dessen Schlüssel die Slugs sind und deren Werte Name,
@@ -327,8 +690,9 @@ def list_hazards():
 # Endpunkt erlaubt dem Frontend, übersetzte Namen und Kurzbeschreibungen
 # sowie Suchsynonyme anzuzeigen.
 @app.get("/api/hazards_meta")
-def get_hazards_meta():
-    return HAZARD_META
+def get_hazards_meta(request: Request):
+    payload = RESPONSE_CACHE.get_or_build(("hazards_meta",), lambda: HAZARD_META)
+    return RESPONSE_CACHE.respond(request, payload)
 
 @app.get("/api/decision-tree/{slug}")
 def get_decision_tree(slug: str, request: Request, lang: str | None = None):
@@ -343,17 +707,11 @@ def get_decision_tree(slug: str, request: Request, lang: str | None = None):
     # zusätzlich aus, da ältere Clients ``?lang`` nur im request haben.
     q = request.query_params.get("lang")
     language = lang or q or "de"
-    # Datei gemäß Sprache bestimmen
-    base_path = os.path.join("data", "decision-trees")
-    candidate = os.path.join(base_path, f"{slug}_decision_tree.{language}.json")
-    # Fallback auf deutsch, falls Sprache nicht existiert
-    if not os.path.exists(candidate):
-        candidate = os.path.join(base_path, f"{slug}_decision_tree.de.json")
-    if not os.path.exists(candidate):
-        raise HTTPException(status_code=404, detail="Decision Tree not found")
-    with open(candidate, encoding="utf-8") as f:
-        tree = json.load(f)
-    return tree
+    # Baum aus dem Speicher holen (Fallback auf Deutsch ist vorab aufgelöst)
+    # und als fertig serialisierte Antwort ausliefern
+    tree = _get_tree_or_404(slug, language)
+    payload = RESPONSE_CACHE.get_or_build(("tree", slug, _cache_lang(slug, language)), lambda: tree)
+    return RESPONSE_CACHE.respond(request, payload)
 
 @app.get("/api/hazards/{slug}")
 def get_hazard_details(slug: str, request: Request):
@@ -368,32 +726,26 @@ def get_hazard_details(slug: str, request: Request):
     """
     lang = request.query_params.get("lang", "de")
     mode = request.query_params.get("mode", "full")
-    # Lade den Entscheidungsbaum in der gewünschten Sprache
-    base_path = os.path.join("data", "decision-trees")
-    candidate = os.path.join(base_path, f"{slug}_decision_tree.{lang}.json")
-    if not os.path.exists(candidate):
-        candidate = os.path.join(base_path, f"{slug}_decision_tree.de.json")
-    if not os.path.exists(candidate):
-        raise HTTPException(status_code=404, detail="Decision Tree not found")
-    try:
-        with open(candidate, encoding="utf-8") as f:
-            tree = json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading decision tree for {slug}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error loading decision tree")
-    # Hole Kurzbeschreibung aus Metadaten, falls vorhanden
-    summary = None
-    meta = HAZARD_META.get(slug)
-    if meta and isinstance(meta.get("description"), dict):
-        summary = meta["description"].get(lang) or meta["description"].get("de")
-    if not summary:
-        # Fallback: generiere einen einfachen, statischen Text
-        summary = f"Hinweis: Für die Gefahr '{slug}' liegt keine Kurzbeschreibung vor."
-    return {
-        "slug": slug,
-        "tree": tree,
-        "summary": summary
-    }
+    # Entscheidungsbaum in der gewünschten Sprache aus dem Speicher holen
+    tree = _get_tree_or_404(slug, lang)
+
+    def build() -> Dict[str, Any]:
+        # Hole Kurzbeschreibung aus Metadaten, falls vorhanden
+        summary = None
+        meta = HAZARD_META.get(slug)
+        if meta and isinstance(meta.get("description"), dict):
+            summary = meta["description"].get(lang) or meta["description"].get("de")
+        if not summary:
+            # Fallback: generiere einen einfachen, statischen Text
+            summary = f"Hinweis: Für die Gefahr '{slug}' liegt keine Kurzbeschreibung vor."
+        return {
+            "slug": slug,
+            "tree": tree,
+            "summary": summary
+        }
+
+    payload = RESPONSE_CACHE.get_or_build(("hazard", slug, _cache_lang(slug, lang)), build)
+    return RESPONSE_CACHE.respond(request, payload)
 
 @app.post("/api/chat")
 async def chat_endpoint(request: Request):
@@ -406,6 +758,14 @@ async def chat_endpoint(request: Request):
     die Nachrichtenliste angehängt.  Die Antwort wird im Feld
     "content" zurückgegeben, sodass Frontends sich nicht auf
     unterschiedliche Feldnamen einstellen müssen.
+
+    Lange Verläufe werden auf ``CHAT_HISTORY_BUDGET`` Tokens gekürzt;
+    ``tokens_saved`` gibt an, wie viele Tokens dabei eingespart wurden.
+
+    Mit ``"session": true`` (erste Nachricht) bzw. ``session_id`` hält der
+    Server den Verlauf; der Client schickt dann nur die neue Nachricht.
+    Die Antwort enthält ``session_id`` und ``session_restarted: true``,
+    falls die angegebene Sitzung abgelaufen war.
     """
     data = await request.json()
     # Versuche, eine vollständige Nachrichtenliste zu extrahieren
@@ -414,6 +774,7 @@ async def chat_endpoint(request: Request):
     user_message = data.get("message")
     if user_message:
         messages = list(messages) + [{"role": "user", "content": user_message}]
+    session_id, messages, session_restarted = await _session_messages(data, messages)
 
     # Kontextinformationen sammeln
     slug = data.get("slug")
@@ -421,6 +782,7 @@ async def chat_endpoint(request: Request):
 
     # Baue einen System‑Prompt, der die aktuelle Gefahr, eine kurze Handlungsempfehlung und optional den Kontext beschreibt.
     system_parts: list[str] = []
+    short_desc: str | None = None
     if slug:
         # Gefahr benennen
         system_parts.append(f"Gefahrensituation: {slug}")
@@ -440,50 +802,114 @@ async def chat_endpoint(request: Request):
     if context_info:
         system_parts.append(f"Kontext: {context_info}")
     # Wenn Systemnachrichten vorhanden sind, setze sie an den Anfang der Unterhaltung
+    system_prompt: Dict[str, str] | None = None
     if system_parts:
-        system_prompt = " | ".join(system_parts)
-        messages = ([{"role": "system", "content": system_prompt}] + list(messages))
+        system_prompt = {"role": "system", "content": " | ".join(system_parts)}
+        messages = [system_prompt] + list(messages)
+    if not LLM.available:
+        return JSONResponse(status_code=500, content={"error": "OpenAI-Key nicht gesetzt."})
+    compaction = HISTORY.compact(list(messages), model="gpt-3.5-turbo")
     try:
-        if not client:
-            return JSONResponse(status_code=500, content={"error": "OpenAI-Key nicht gesetzt."})
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            max_tokens=300,
-            temperature=0.3,
-        )
-        answer = response.choices[0].message.content.strip()
-        return {"content": answer}
-    except Exception as e:
+        answer = await LLM.complete(compaction.messages, model="gpt-3.5-turbo", max_tokens=300, temperature=0.3)
+        result: Dict[str, Any] = {"content": answer, "tokens_saved": compaction.tokens_saved}
+        if session_id:
+            # Der System-Prompt wird pro Anfrage neu gebaut und nicht mitgespeichert
+            history = session_history(compaction.messages)
+            await CHAT_SESSIONS.save(session_id, history + [{"role": "assistant", "content": answer}])
+            result["session_id"] = session_id
+            if session_restarted:
+                result["session_restarted"] = True
+        return result
+    except LLMUnavailable as e:
+        # Sprachmodell gestört: Handlungsempfehlung aus den Metadaten statt Fehler
+        if short_desc:
+            return {"content": short_desc, "degraded": e.reason}
         logger.error(f"Fehler bei GPT‑Chat: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return JSONResponse(status_code=503, content={"error": str(e), "reason": e.reason})
 
 @app.get("/api/health")
 def health_check():
-    status = {
+    # Aus dem Health-Snapshot (im Hintergrund aktualisiert), kein Ping pro Aufruf
+    return {
         "api": "ok",
-        "db": False,
-        "openai": bool(client),
+        "db": HEALTH.ok("mongo"),
+        "openai": LLM.available,
     }
-    try:
-        status["db"] = db.command("ping")["ok"] == 1
-    except Exception:
-        status["db"] = False
-    return status
+
+
+@app.get("/api/ready")
+def readiness():
+    """200, sobald der Start abgeschlossen ist und alle READY_REQUIRE-Komponenten in Ordnung sind, sonst 503."""
+    snapshot = HEALTH.snapshot()
+    return JSONResponse(status_code=200 if snapshot["ready"] else 503, content=snapshot)
+
+
+@app.get("/api/live")
+def liveness():
+    """200, solange die Event-Loop die Health-Prüfungen rechtzeitig ausführt, sonst 503."""
+    live = HEALTH.live
+    return JSONResponse(status_code=200 if live else 503, content={"live": live})
+
+
+@app.get("/api/llm/stats")
+def llm_stats():
+    """Aufrufe, Wiederholungen, Fehlschläge, Circuit Breaker und Kürzung der Chat-Verläufe."""
+    return {**LLM.snapshot(), "history": HISTORY.snapshot(), "sessions": CHAT_SESSIONS.snapshot()}
+
+
+@app.get("/api/auth/stats")
+def auth_stats():
+    """Ausgegebene, gültige, ungültige und widerrufene Login-Tokens."""
+    return SESSIONS.snapshot()
+
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Treffer‑, Fehlzugriffs‑, Coalescing‑ und Verdrängungszähler aller Caches."""
+    return _cache_stats()
+
+
+def _cache_stats() -> Dict[str, Dict[str, Any]]:
+    # Der Antwort-Cache zählt selbst (Redis oder Prozess) und ist nicht registriert
+    return {**all_stats(), "grounded_answers": ANSWER_CACHE.snapshot()}
+
+# Login: Benutzerdatensätze werden USER_CACHE_TTL Sekunden gecacht,
+# langsame Passwort-Hashes (PBKDF2) in einem eigenen Thread-Pool geprüft
+# (PASSWORD_HASH_WORKERS).  Ausgegebene Tokens liegen SESSION_TTL Sekunden
+# im Sitzungsspeicher (Redis, falls REDIS_URL gesetzt ist, sonst im Prozess)
+# und werden per "Authorization: Bearer <token>" geprüft.
+USER_CACHE = UserCache(ttl=float(os.getenv("USER_CACHE_TTL", "60")))
+PASSWORDS = PasswordVerifier(workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")))
+SESSIONS = TokenStore.from_env(
+    os.getenv("REDIS_URL"),
+    ttl=float(os.getenv("SESSION_TTL", "43200")),
+    max_entries=int(os.getenv("SESSION_MAX_ENTRIES", "100000")),
+)
+
+
+
+def _bearer_token(authorization: str | None) -> str | None:
+    if authorization and authorization.lower().startswith("bearer "):
+        return authorization[7:].strip() or None
+    return None
+
+
+async def current_user(authorization: str | None = Header(default=None)) -> str:
+    """Abhängigkeit für geschützte Endpunkte: Benutzername zum Bearer-Token oder 401."""
+    username = await SESSIONS.validate(_bearer_token(authorization))
+    if username is None:
+        raise HTTPException(status_code=401, detail="Nicht angemeldet oder Sitzung abgelaufen")
+    return username
 
 
 # Login‑Endpoint.  Erwartet einen Benutzernamen und ein Passwort.
 # Prüft, ob der Benutzer existiert und das Passwort korrekt ist.  Bei
-# Erfolg wird ein zufälliges Token zurückgegeben.  Dieses Token
-# besitzt in dieser Beispielimplementierung keine weitere Bedeutung
-# (kein JWT).  In einer realen Anwendung solltest du das Token
-# speichern und bei nachfolgenden Anfragen überprüfen.
+# Erfolg wird ein zufälliges Token ausgegeben und im Sitzungsspeicher
+# abgelegt; es gilt SESSION_TTL Sekunden (``expires_in``).
 @app.post("/api/login")
 async def login(req: LoginRequest):
     username = req.username
     password = req.password
-    # Hash des eingegebenen Passworts
-    pw_hash = hashlib.sha256(password.encode()).hexdigest()
     # Versuche zuerst, den Benutzer aus der Datenbank zu laden.  Die
     # Benutzer‑Collection kann über init_users.py gefüllt werden.  Fallback
     # auf das statische USERS‑Dict, das weiterhin Admin‑Zugänge enthalten
@@ -491,14 +917,13 @@ async def login(req: LoginRequest):
     expected_hash = None
     try:
         # Versuche den Benutzer anhand von "username" oder "email" zu finden.
-        # Einige Clients verwenden die E‑Mail als Benutzernamen.  Um beide
-        # Varianten zu unterstützen, sucht diese Abfrage gleichzeitig in den
-        # Feldern "username" und "email".  Wenn ein Dokument gefunden
-        # wird, wird der in der Datenbank gespeicherte Passwort‑Hash
-        # verwendet.
-        user_doc = users_collection.find_one({"$or": [{"username": username}, {"email": username}]})
+        # Einige Clients verwenden die E‑Mail als Benutzernamen.  Die Abfrage
+        # sucht daher in beiden (indizierten) Feldern; das Ergebnis wird kurz
+        # gecacht.
+        user_doc = await USER_CACHE.get(username, lambda: PERSISTENCE.users.find_by_login(username))
         if user_doc:
             expected_hash = user_doc.get("password_hash")
+            username = user_doc.get("username") or username
     except Exception:
         # Fehlende Datenbank oder Collection
         expected_hash = None
@@ -506,21 +931,46 @@ async def login(req: LoginRequest):
     if expected_hash is None:
         expected_hash = USERS.get(username)
     # Prüfe den Hash
-    if expected_hash is None or expected_hash != pw_hash:
+    if not await PASSWORDS.verify(expected_hash, password):
         raise HTTPException(status_code=401, detail="Ungültiger Benutzername oder Passwort")
-    # Generiere ein zufälliges Token
-    token = secrets.token_hex(16)
-    return {"token": token}
+    token = await SESSIONS.issue(username)
+    return {"token": token, "expires_in": int(SESSIONS.ttl)}
+
+
+@app.post("/api/logout")
+async def logout(authorization: str | None = Header(default=None)):
+    token = _bearer_token(authorization)
+    if token:
+        await SESSIONS.revoke(token)
+    return {"status": "ok"}
+
+
+@app.get("/api/session")
+async def session_info(username: str = Depends(current_user)):
+    """Prüft das Bearer-Token und liefert den angemeldeten Benutzer."""
+    return {"username": username}
+
+
 # Beispiel für Custom-Endpunkt: User-Feedback (optional)
 @app.post("/api/feedback")
 async def save_feedback(request: Request):
-    data = await request.json()
+    """Nimmt Feedback an; gespeichert wird gebündelt im Hintergrund."""
     try:
-        db.feedback.insert_one(data)
-        return {"status": "ok"}
-    except Exception as e:
-        logger.error(f"Fehler beim Speichern von Feedback: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        data = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Ungültiger JSON-Body")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Feedback muss ein Objekt sein")
+    if not PERSISTENCE.feedback.submit(data):
+        logger.error("Fehler beim Speichern von Feedback: Puffer voll")
+        return JSONResponse(status_code=503, content={"error": "Feedback-Speicher überlastet"})
+    return {"status": "ok"}
+
+
+@app.get("/api/feedback/stats")
+def feedback_stats():
+    """Gepufferte, geschriebene und abgelehnte Feedback-Einträge."""
+    return PERSISTENCE.feedback.snapshot()
 
 # Beispiel für einen neuen Decision-Tree-Endpunkt:
 @app.get("/api/all-trees")
@@ -533,32 +983,91 @@ def all_decision_trees():
                 trees.append(json.load(f))
     return trees
 
-# In-Memory Speicher für Telemetriedaten.  In einer produktiven Umgebung
-# sollten diese Daten beispielsweise an einen dedizierten Log-Service
-# weitergeleitet oder in einer Datenbank gespeichert werden.  Es werden
-# ausschließlich anonyme Felder gespeichert (z. B. slug, verwendete
-# Schritt-IDs, Zeitstempel, optional online/offline), keine Freitexte.
-_TELEMETRY: list[dict] = []
+# Telemetrie: Ereignisse landen in einem Ringpuffer fester Größe
+# (TELEMETRY_BUFFER) und werden im Hintergrund gebündelt gespeichert –
+# TELEMETRY_SINK "mongo" (Collections telemetry/telemetry_rollups), "jsonl"
+# (Dateien in TELEMETRY_DIR) oder "none".  Es werden ausschließlich anonyme
+# Felder erwartet (z. B. slug, verwendete Schritt-IDs, Zeitstempel, optional
+# online/offline), keine Freitexte.
+# Stunden‑Rollups werden TELEMETRY_HOUR_RETENTION Stunden lang geführt;
+# Client‑Zeitstempel außerhalb dieses Fensters zählen zur Empfangszeit.
+TELEMETRY_HOUR_RETENTION = float(os.getenv("TELEMETRY_HOUR_RETENTION", "168")) * 3600
+
+
+def _telemetry_sink() -> Any:
+    kind = os.getenv("TELEMETRY_SINK", "mongo").lower()
+    if kind == "mongo":
+        return MongoTelemetrySink(
+            db.get_collection("telemetry"),
+            db.get_collection("telemetry_rollups"),
+            hour_retention=TELEMETRY_HOUR_RETENTION,
+        )
+    if kind == "jsonl":
+        return JsonlTelemetrySink(
+            os.getenv("TELEMETRY_DIR", os.path.join("data", "telemetry")),
+            max_bytes=int(os.getenv("TELEMETRY_FILE_MAX_BYTES", str(10 * 1024 * 1024))),
+        )
+    return None
+
+
+TELEMETRY = TelemetryPipeline(
+    _telemetry_sink(),
+    capacity=int(os.getenv("TELEMETRY_BUFFER", "10000")),
+    batch_size=int(os.getenv("TELEMETRY_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "5")),
+    rollups=TelemetryRollups(hour_retention=TELEMETRY_HOUR_RETENTION),
+)
+
+
 
 @app.post("/api/telemetry")
 async def save_telemetry(request: Request):
     """
-    Speichert anonymisierte Telemetriedaten.  Der Body kann beliebige
-    strukturierte Felder enthalten.  Dieses Beispiel speichert die Daten
-    lediglich im Arbeitsspeicher.  In einer produktiven Anwendung sollte
-    hier eine persistente Speicherung oder Weiterleitung an einen
-    Telemetrie-Endpunkt stattfinden.
+    Nimmt anonymisierte Telemetriedaten entgegen.  Der Body ist ein Objekt
+    mit beliebigen strukturierten Feldern oder eine Liste solcher Objekte.
+    Die Ereignisse werden nur gepuffert und im Hintergrund gespeichert.
     """
     try:
         data = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Ungültiger JSON-Body")
-    # Füge einen Zeitstempel hinzu, falls nicht vorhanden
-    if isinstance(data, dict) and "timestamp" not in data:
-        data["timestamp"] = int(time.time() * 1000)
-    _TELEMETRY.append(data)
+    events = data if isinstance(data, list) else [data]
+    if not all(isinstance(event, dict) for event in events):
+        raise HTTPException(status_code=400, detail="Telemetrie muss ein Objekt oder eine Liste von Objekten sein")
+    now = int(time.time() * 1000)
+    for event in events:
+        # Füge einen Zeitstempel hinzu, falls nicht vorhanden
+        event.setdefault("timestamp", now)
+    TELEMETRY.record_many(events)
     return {"status": "ok"}
 
+
+@app.get("/api/telemetry/rollups")
+async def telemetry_rollups(scope: str = "process", top: int = 50):
+    """
+    Ereignisse pro Gefahr, Schritt (``slug:node``), Stunde (UTC) und Typ.
+    ``scope=process`` zählt seit dem Start dieses Prozesses (sofort aktuell),
+    ``scope=store`` liest die gespeicherten Rollups über alle Worker und
+    Neustarts (Stand des letzten Batches, nur mit TELEMETRY_SINK=mongo).
+    """
+    if scope == "store":
+        stored = await TELEMETRY.persisted_rollups()
+        if stored is None:
+            raise HTTPException(status_code=503, detail="Keine gespeicherten Rollups verfügbar")
+        return {"scope": "store", **stored}
+    return {"scope": "process", **TELEMETRY.rollups.snapshot(top=max(1, top)), "pipeline": TELEMETRY.snapshot()}
+
+# Obergrenze für Batch‑Klassifikationen pro Anfrage
+AUTO_NAVIGATE_MAX_BATCH = int(os.getenv("AUTO_NAVIGATE_MAX_BATCH", "1000"))
+
+
+def _candidate_limit(data: Dict[str, Any]) -> int:
+    try:
+        return max(1, min(int(data.get("limit") or 5), 50))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="'limit' muss eine Zahl sein")
+
+
 @app.post("/api/auto-navigate")
 async def auto_navigate(request: Request):
     """
@@ -568,32 +1077,61 @@ async def auto_navigate(request: Request):
     beschriebene Szenario mit den Namen und Synonymen aus
     ``hazards_meta.json``.  Wenn keine Kategorie eindeutig
     identifiziert werden kann, wird 'unklare_gefahr' zurückgegeben.
+
+    Neben ``slug`` enthält die Antwort ``candidates``: die nach
+    Trefferzahl sortierten Gefahren mit ihrer Punktzahl (höchstens
+    ``limit`` Einträge, Standard 5).
     """
     data = await request.json()
-    description = (data.get("description") or "").lower()
+    description = data.get("description") or ""
     if not description:
         raise HTTPException(status_code=400, detail="'description' erforderlich")
-    # Sammle mögliche Treffer nach Anzahl der Vorkommen von Begriffen
-    best_slug = None
-    best_score = 0
-    for slug, meta in HAZARD_META.items():
-        # Sammle alle Begriffe: alle Namensvarianten und Synonyme aller Sprachen
-        terms: list[str] = []
-        name_dict = meta.get("name") or {}
-        for n in name_dict.values():
-            terms.append(str(n).lower())
-        synonyms_dict = meta.get("synonyms") or {}
-        for syn_list in synonyms_dict.values():
-            for s in syn_list:
-                terms.append(str(s).lower())
-        # Zähle Vorkommen der Begriffe in der Beschreibung
-        score = sum(1 for term in terms if term and term in description)
-        if score > best_score:
-            best_score = score
-            best_slug = slug
-    if not best_slug:
-        best_slug = "unklare_gefahr"
-    return {"slug": best_slug}
+    return HAZARD_MATCHER.classify(str(description), _candidate_limit(data))
+
+
+@app.post("/api/auto-navigate/batch")
+async def auto_navigate_batch(request: Request):
+    """
+    Klassifiziert mehrere Beschreibungen in einem Aufruf (z. B. für
+    Triage‑Replays).  Erwartet ``{"descriptions": [...], "limit": 5}``
+    und liefert ``{"results": [...]}`` in derselben Reihenfolge; jedes
+    Ergebnis hat die Form der Antwort von ``/api/auto-navigate``.
+    """
+    data = await request.json()
+    descriptions = data.get("descriptions")
+    if not isinstance(descriptions, list):
+        raise HTTPException(status_code=400, detail="'descriptions' muss eine Liste sein")
+    if len(descriptions) > AUTO_NAVIGATE_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"Höchstens {AUTO_NAVIGATE_MAX_BATCH} Beschreibungen pro Anfrage")
+    matcher = HAZARD_MATCHER
+    limit = _candidate_limit(data)
+    return {"results": matcher.classify_many((str(d or "") for d in descriptions), limit)}
+
+# Antworten der Grounded‑Answer‑Endpunkte werden pro (slug, lang, context,
+# normalisierte Frage) gecacht – in Redis, falls REDIS_URL gesetzt ist,
+# sonst im Prozess.  GROUNDED_CACHE_TTL in Sekunden, GROUNDED_CACHE_MAX_ENTRIES
+# begrenzt die Anzahl der Einträge.
+ANSWER_CACHE = AnswerCache.from_env(
+    os.getenv("REDIS_URL"),
+    max_entries=int(os.getenv("GROUNDED_CACHE_MAX_ENTRIES", "5000")),
+    ttl=float(os.getenv("GROUNDED_CACHE_TTL", "86400")),
+)
+
+
+# SSE: Tokens werden zu Frames gebündelt (SSE_FLUSH_INTERVAL Sekunden bzw.
+# SSE_FLUSH_CHARS Zeichen), in Pausen wird alle SSE_HEARTBEAT Sekunden ein
+# Kommentar gesendet, damit nginx die Verbindung offen hält.
+SSE_FLUSH_INTERVAL = float(os.getenv("SSE_FLUSH_INTERVAL", "0.05"))
+SSE_FLUSH_CHARS = int(os.getenv("SSE_FLUSH_CHARS", "128"))
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.get("/api/grounded-answer/cache")
+def grounded_answer_cache_stats():
+    """Treffer und Fehlzugriffe des Antwort‑Caches."""
+    return ANSWER_CACHE.snapshot()
+
 
 @app.api_route("/api/grounded-answer-stream", methods=["GET", "POST"])
 async def grounded_answer_stream(request: Request):
@@ -604,8 +1142,15 @@ async def grounded_answer_stream(request: Request):
     Dieser Endpunkt nutzt das OpenAI-Streaming-API (falls verfügbar), um
     das Sprachmodell Token für Token zu übertragen.  Zusätzliche
     Metadaten wie ``used_nodes`` werden nach Abschluss in einem eigenen
-    SSE-Event mit dem Typ ``meta`` gesendet.
+    SSE-Event mit dem Typ ``meta`` gesendet.  Liegt die Antwort bereits im
+    Cache, wird sie ohne OpenAI-Aufruf abgespielt (``cached: true`` im Meta-Event).
+
+    Tokens werden zu Frames gebündelt, in Pausen gehen Heartbeat-Kommentare
+    raus, und trennt der Client die Verbindung, wird der Upstream-Stream
+    sofort abgebrochen.  ``ttft_ms`` im Meta-Event ist die Zeit vom Eingang
+    der Anfrage bis zum ersten Token.
     """
+    stats = StreamStats()
     # Erlaube sowohl POST mit JSON-Body als auch GET mit Query-Parametern.  Für GET werden
     # Parameter aus request.query_params entnommen.
     slug = None
@@ -631,21 +1176,10 @@ async def grounded_answer_stream(request: Request):
     if not slug or not question:
         raise HTTPException(status_code=400, detail="slug und question sind erforderlich")
     # Lade Decision-Tree (wie im grounded-answer-Endpunkt)
-    base_path = os.path.join("data", "decision-trees")
-    candidate = os.path.join(base_path, f"{slug}_decision_tree.{lang}.json")
-    if not os.path.exists(candidate):
-        candidate = os.path.join(base_path, f"{slug}_decision_tree.de.json")
-    if not os.path.exists(candidate):
-        raise HTTPException(status_code=404, detail="Decision Tree not found")
-    try:
-        with open(candidate, encoding="utf-8") as f:
-            tree = json.load(f)
-    except Exception as e:
-        logger.error(f"Fehler beim Laden des Entscheidungsbaums für {slug}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Fehler beim Laden des Entscheidungsbaums")
-    # Sammle relevante Knoten (erste 5)
-    nodes = _collect_tree_nodes(tree)
-    relevant = nodes[:5]
+    tree = _get_tree_or_404(slug, lang)
+    match = _tree_match(slug, lang, str(question))
+    # Relevante Knoten per BM25 (Top‑k innerhalb des Token‑Budgets)
+    relevant = _relevant_nodes(tree, slug, lang, str(question))
     # Baue System-Prompt
     rules = (
         "Antworte ausschließlich basierend auf den bereitgestellten Schritten. "
@@ -661,35 +1195,77 @@ async def grounded_answer_stream(request: Request):
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": str(question)},
     ]
-    # Wenn kein OpenAI-Client vorhanden ist, verhindere Streaming
-    if not client:
-        raise HTTPException(status_code=500, detail="OpenAI-Key nicht gesetzt.")
+    direct = _confident(match) is not None
+    cache_key = answer_key(slug, lang, context_info, str(question), [steps_lines])
+    cached = None if direct else await ANSWER_CACHE.get(cache_key)
+    used_nodes = [n["id"] for n in relevant]
+
+    def frames(tokens):
+        return stream_frames(
+            tokens,
+            stats,
+            is_disconnected=request.is_disconnected,
+            flush_interval=SSE_FLUSH_INTERVAL,
+            max_chars=SSE_FLUSH_CHARS,
+            heartbeat=SSE_HEARTBEAT,
+        )
+
+    def meta_event(**extra: Any) -> str:
+        meta = {"used_nodes": used_nodes, "ttft_ms": stats.ttft_ms, "frames": stats.frames, **extra}
+        return sse_message(json.dumps(meta), event="meta")
+
+    async def tree_events(degraded: str | None = None):
+        # Antwort aus dem Baum abspielen (Direktantwort oder Ersatz bei gestörtem Modell)
+        nonlocal used_nodes
+        answer, used_nodes = _tree_answer(tree, match, relevant)
+        async for frame in frames(iter_words(answer)):
+            yield frame
+        used_match = _confident(match)
+        extra: Dict[str, Any] = {"confidence": used_match.confidence} if used_match is not None else {}
+        if degraded:
+            extra["degraded"] = degraded
+        yield meta_event(cached=False, source="tree", **extra)
+
     # Streaming-Antwort generator
-    def sse_event_generator():
+    async def sse_event_generator():
+        if direct:
+            async for event in tree_events():
+                yield event
+            return
+        if cached is not None:
+            # Gecachte Antwort ohne OpenAI-Aufruf abspielen
+            async for frame in frames(iter_words(cached["answer"])):
+                yield frame
+            yield meta_event(cached=True, source="cache")
+            return
+        if not LLM.available:
+            async for event in tree_events("not_configured"):
+                yield event
+            return
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=300,
-                temperature=0.2,
-                stream=True,
-            )
-            full_text = ""
-            for chunk in response:
-                delta = chunk.choices[0].delta
-                content = getattr(delta, "content", None)
-                if content:
-                    full_text += content
-                    # Sende das Token im SSE-Format
-                    yield f"data: {content}\n\n"
-            # Nach Abschluss sende ein Meta-Event mit used_nodes
-            meta = json.dumps({"used_nodes": [n["id"] for n in relevant]})
-            yield f"event: meta\ndata: {meta}\n\n"
+            async for frame in frames(LLM.stream(messages, model="gpt-3.5-turbo", max_tokens=300, temperature=0.2)):
+                yield frame
+        except LLMUnavailable as e:
+            if stats.tokens:
+                logger.error(f"Fehler bei Streaming-GPT ({slug}): {str(e)}")
+                yield sse_message(json.dumps({"error": str(e)}), event="error")
+                return
+            # Noch kein Token gesendet: baumbasierte Antwort statt Fehler
+            async for event in tree_events(e.reason):
+                yield event
+            return
         except Exception as e:
             logger.error(f"Fehler bei Streaming-GPT ({slug}): {str(e)}")
             # Sende ein Fehler-Ereignis
-            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
-    return StreamingResponse(sse_event_generator(), media_type="text/event-stream")
+            yield sse_message(json.dumps({"error": str(e)}), event="error")
+            return
+        answer = stats.text.strip()
+        if answer:
+            await ANSWER_CACHE.set(cache_key, {"answer": answer, "used_nodes": used_nodes})
+        # Nach Abschluss sende ein Meta-Event mit used_nodes
+        yield meta_event(cached=False, source="llm")
+
+    return StreamingResponse(sse_event_generator(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 # ------------------------------------------------------------
 # Grounded-Answer Endpunkt (Phase 0/1)
@@ -697,39 +1273,82 @@ async def grounded_answer_stream(request: Request):
 
 def _collect_tree_nodes(tree: Dict[str, Any]) -> List[Dict[str, str]]:
     """
-    Flatten a decision tree into a list of nodes with id and text.  This helper
-    iterates over all keys in the JSON structure and extracts the node id and
-    associated text (or text_simplified).  Whitespace is normalized.  The
-    returned list preserves the order of discovery; this simple heuristic
-    prefers the root and early nodes as most relevant.
+    Flatten a decision tree into a list of nodes with id and text (root first,
+    then in file order, whitespace normalized).
+    """
+    return [{"id": node.id, "text": node.text} for node in collect_nodes(tree)]
+
+
+def _relevant_nodes(tree: Dict[str, Any], slug: str, lang: str, question: str) -> List[Dict[str, Any]]:
+    """
+    Die für ``question`` relevantesten Knoten aus dem BM25‑Index.  Fehlt der
+    Baum im Index (z. B. direkt nach dem Hinzufügen), werden wie bisher die
+    ersten Knoten verwendet.
     """
-    nodes: List[Dict[str, str]] = []
+    relevant = NODE_INDEX.search(slug, lang, question, k=GROUNDED_TOP_K, token_budget=GROUNDED_TOKEN_BUDGET)
+    return relevant or _collect_tree_nodes(tree)[:GROUNDED_TOP_K]
+
+
+def _tree_only_answer(relevant: List[Dict[str, str]], max_steps: int = 3) -> str:
+    """
+    Antwort ausschließlich aus den Baumschritten – für den Fall, dass das
+    Sprachmodell nicht erreichbar oder überlastet ist.
+    """
+    steps = [n["text"] for n in relevant if n.get("text")][:max_steps]
+    if not steps:
+        return "Nicht im Schema – 112 rufen."
+    return "\n".join(f"- {text}" for text in steps)
+
+
+_CITATION_RE = re.compile(r"【[^】]*】")
+_STEP_PREFIX_RE = re.compile(r"^(?:\d+[.)]|[•*\-–])\s*")
 
-    def add_node(node: Dict[str, Any], key: str | None = None) -> None:
+
+def _tree_match(slug: str, lang: str, question: str) -> NodeMatch | None:
+    """
+    Bester Knoten für eine Antwort direkt aus dem Baum.  Die Wurzel und
+    Knoten, die selbst eine Frage oder Überschrift sind („…?“, „…:“),
+    taugen nicht als Antwort.
+    """
+    match = NODE_INDEX.best(slug, lang, question)
+    if match is None or match.node.id == "root" or not match.node.text:
+        return None
+    if match.node.text.endswith(("?", ":")):
+        return None
+    return match
+
+
+def _confident(match: NodeMatch | None) -> NodeMatch | None:
+    """``match`` nur, wenn er eine Direktantwort trägt (Konfidenz ≥ ``TREE_ANSWER_THRESHOLD``)."""
+    return match if match is not None and match.confidence >= TREE_ANSWER_THRESHOLD else None
+
+
+def _format_tree_answer(text: str) -> str:
+    """Knotentext im Format der LLM‑Antworten: erste Zeile als Satz, danach Schritte als Bullets."""
+    lines = [line.strip() for line in _CITATION_RE.sub("", text).splitlines() if line.strip()]
+    if not lines:
+        return "Nicht im Schema – 112 rufen."
+    return "\n".join([lines[0]] + [f"- {_STEP_PREFIX_RE.sub('', line)}" for line in lines[1:]])
+
+
+def _tree_answer(
+    tree: Dict[str, Any], match: NodeMatch | None, relevant: List[Dict[str, Any]]
+) -> tuple[str, List[str]]:
+    """
+    (Antwort, used_nodes) ausschließlich aus dem Baum: der passendste Knoten,
+    wenn er sicher genug passt, sonst die per BM25 gefundenen Schritte.
+    """
+    match = _confident(match)
+    if match is not None:
+        node = tree.get(match.node.id)
         if not isinstance(node, dict):
-            return
-        # Determine the node id: prefer explicit id field, otherwise key
-        node_id = node.get("id") or key
-        # Skip if id is missing
-        if not node_id:
-            return
-        # Get text; fall back to text_simplified
-        text = node.get("text") or node.get("text_simplified") or ""
-        # Normalize whitespace
-        normalized = " ".join(str(text).split())
-        nodes.append({"id": str(node_id), "text": normalized})
-
-    # If the tree has a root node, add it first
-    if isinstance(tree, dict) and "root" in tree:
-        root_node = tree.get("root")
-        add_node(root_node, "root")
-    # Iterate over top-level keys in the tree (excluding "root")
-    if isinstance(tree, dict):
-        for key, node in tree.items():
-            if key == "root":
-                continue
-            add_node(node, key)
-    return nodes
+            node = next(
+                (n for k, n in tree.items() if isinstance(n, dict) and str(n.get("id") or k) == match.node.id),
+                {},
+            )
+        text = node.get("text") or node.get("text_simplified") or match.node.text
+        return _format_tree_answer(str(text)), [match.node.id]
+    return _tree_only_answer(relevant), [n["id"] for n in relevant]
 
 
 @app.post("/api/grounded-answer")
@@ -744,8 +1363,12 @@ async def grounded_answer(request: Request):
     - context: Optionaler Kontextstring (z. B. Aufenthaltsort oder Persona)
 
     Der Server lädt den entsprechenden Entscheidungsbaum, extrahiert einige
-    relevante Schritte (heuristisch: erste fünf Knoten) und generiert
+    relevante Schritte (BM25 über Knotentexte und Optionen, höchstens
+    ``GROUNDED_TOP_K`` Knoten bzw. ``GROUNDED_TOKEN_BUDGET`` Tokens) und generiert
     anschließend einen System-Prompt.  Die Antwort wird von OpenAI erzeugt.
+    Passt die Frage eindeutig zu einem Knoten (Konfidenz mindestens
+    ``TREE_ANSWER_THRESHOLD``), wird ohne Sprachmodell direkt mit dessen
+    Text geantwortet.
 
     Die Antwortstruktur umfasst:
     - answer: Der generierte Text
@@ -753,6 +1376,12 @@ async def grounded_answer(request: Request):
     - risk_level: Momentan statisch "medium"
     - cta: Handlungsempfehlungen (vereinfacht)
     - disclaimer: Haftungsausschluss
+    - cached: True, wenn die Antwort aus dem Antwort-Cache stammt
+    - source: "tree" (direkt aus dem Baum), "cache" oder "llm"
+    - confidence: Nur bei source "tree" mit passendem Knoten
+    - degraded: Nur gesetzt, wenn das Sprachmodell gestört oder nicht
+      konfiguriert war und die Antwort aus dem Baum stammt (Grund, z. B.
+      "circuit_open" oder "not_configured")
     """
     data = await request.json()
     slug = data.get("slug")
@@ -763,21 +1392,14 @@ async def grounded_answer(request: Request):
     if not slug or not question:
         raise HTTPException(status_code=400, detail="slug und question sind erforderlich")
     # Lade den Entscheidungsbaum in der gewünschten Sprache (Fallback auf Deutsch)
-    base_path = os.path.join("data", "decision-trees")
-    candidate = os.path.join(base_path, f"{slug}_decision_tree.{lang}.json")
-    if not os.path.exists(candidate):
-        candidate = os.path.join(base_path, f"{slug}_decision_tree.de.json")
-    if not os.path.exists(candidate):
-        raise HTTPException(status_code=404, detail="Decision Tree not found")
-    try:
-        with open(candidate, encoding="utf-8") as f:
-            tree = json.load(f)
-    except Exception as e:
-        logger.error(f"Fehler beim Laden des Entscheidungsbaums für {slug}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Fehler beim Laden des Entscheidungsbaums")
-    # Extrahiere Knoten (vereinfachte Relevanzheuristik: nimm die ersten 5)
-    nodes = _collect_tree_nodes(tree)
-    relevant = nodes[:5]
+    tree = _get_tree_or_404(slug, lang)
+    # Eindeutiger Treffer: direkt aus dem Baum antworten
+    match = _tree_match(slug, lang, str(question))
+    if _confident(match) is not None:
+        answer, used_nodes = _tree_answer(tree, match, [])
+        return _grounded_result(answer, used_nodes, "tree", confidence=match.confidence)
+    # Relevante Knoten per BM25 (Top‑k innerhalb des Token‑Budgets)
+    relevant = _relevant_nodes(tree, slug, lang, str(question))
     # Baue Prompt-Teile
     rules = (
         "Antworte ausschließlich basierend auf den bereitgestellten Schritten. "
@@ -793,58 +1415,113 @@ async def grounded_answer(request: Request):
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": str(question)},
     ]
-    # Sicherheitsprüfung: Kein OpenAI-Client vorhanden
-    if not client:
-        return JSONResponse(status_code=500, content={"error": "OpenAI-Key nicht gesetzt."})
+    cache_key = answer_key(slug, lang, context_info, str(question), [steps_lines])
+    cached = await ANSWER_CACHE.get(cache_key)
+    used_nodes = [n["id"] for n in relevant]
+    if cached is not None:
+        return _grounded_result(cached["answer"], used_nodes, "cache")
+    if not LLM.available:
+        # Kein OpenAI-Key: Antwort aus dem Baum statt Fehler
+        return _degraded_result(tree, match, relevant, "not_configured")
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            max_tokens=300,
-            temperature=0.2,
-        )
-        answer = response.choices[0].message.content.strip()
-        return {
-            "answer": answer,
-            "used_nodes": [n["id"] for n in relevant],
-            "risk_level": "medium",
-            "cta": ["112 rufen"],
-            "disclaimer": "Kein Ersatz für professionelle Hilfe.",
-        }
-    except Exception as e:
+        answer = await LLM.complete(messages, model="gpt-3.5-turbo", max_tokens=300, temperature=0.2)
+    except LLMUnavailable as e:
+        # Sprachmodell gestört: sofort mit den Baumschritten antworten
         logger.error(f"Fehler bei GPT-Chat (grounded-answer) für {slug}: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return _degraded_result(tree, match, relevant, e.reason)
+    await ANSWER_CACHE.set(cache_key, {"answer": answer, "used_nodes": used_nodes})
+    return _grounded_result(answer, used_nodes, "llm")
+
+
+def _grounded_result(answer: str, used_nodes: List[str], source: str, **extra: Any) -> Dict[str, Any]:
+    return {
+        "answer": answer,
+        "used_nodes": used_nodes,
+        "risk_level": "medium",
+        "cta": ["112 rufen"],
+        "disclaimer": "Kein Ersatz für professionelle Hilfe.",
+        "cached": source == "cache",
+        "source": source,
+        **extra,
+    }
+
+
+def _degraded_result(
+    tree: Dict[str, Any], match: NodeMatch | None, relevant: List[Dict[str, Any]], reason: str
+) -> Dict[str, Any]:
+    answer, used_nodes = _tree_answer(tree, match, relevant)
+    match = _confident(match)
+    extra: Dict[str, Any] = {"confidence": match.confidence} if match is not None else {}
+    return _grounded_result(answer, used_nodes, "tree", degraded=reason, **extra)
 
 # Externe Warnmeldungen (z. B. NINA/Katwarn)
 #
-# Diese Route fungiert als Proxy für das öffentliche Warnsystem des Bundes.
-# Die direkte Abfrage im Frontend scheitert meist an CORS‑Restriktionen.  Um
-# dennoch aktuelle Warnmeldungen zu erhalten, ruft der Server die Daten
-# serverseitig ab und liefert sie an den Client.  Die URL und Struktur
-# können sich ändern; bei Fehlern wird eine leere Liste zurückgegeben.
+# Die direkte Abfrage im Frontend scheitert meist an CORS‑Restriktionen.
+# Der Server hält deshalb den MoWaS‑Bestand des Bundes im Speicher (siehe
+# ``MOWAS``) und beantwortet Anfragen ohne Upstream‑Aufruf.  Ohne
+# Koordinaten wird die bundesweite Liste geliefert, mit ``lat``/``lon`` nur
+# die Warnungen, deren Gebiet die Position enthält.  Solange noch kein
+# Abruf gelungen ist, wird eine leere Liste zurückgegeben.
 
 @app.get("/api/warnings")
-def get_external_warnings():
-    import requests
-    url = "https://warnung.bund.de/api31/mowas/mapData.json"
-    try:
-        resp = requests.get(url, timeout=10)
-        if resp.status_code == 200:
-            # Wenn der Inhalt JSON ist, gib ihn direkt zurück
-            return resp.json()
-        else:
-            logger.warning(f"Warn-API Antwortcode {resp.status_code}")
-    except Exception as e:
-        logger.error(f"Fehler beim Abrufen von Warnmeldungen: {e}")
+async def get_external_warnings(lat: float | None = None, lon: float | None = None):
+    if lat is not None and lon is not None:
+        return {"warnings": MOWAS.lookup(lat, lon), "updated": MOWAS.stats.last_success}
+    if MOWAS.ready:
+        return MOWAS.items
     return {"warnings": []}
 
+
+@app.get("/api/warnings/stats")
+def get_warning_stats():
+    """Zähler des MoWaS‑Imports (Abrufe, 304, Änderungen, Fehler, ausstehende Geometrien)."""
+    return {
+        **asdict(MOWAS.stats),
+        "active": len(MOWAS.items),
+        "indexed": len(MOWAS.index),
+        "pending_geometries": MOWAS.pending_geometries,
+    }
+
+# Routen werden pro (Profil, gerundeter Start, gerundetes Ziel) gecacht.
+# ROUTE_SNAP_DECIMALS legt das Raster fest (4 Nachkommastellen ≈ 11 m);
+# gleichzeitige Anfragen für dieselbe Strecke lösen nur einen OSRM‑Aufruf aus.
+OSRM_URL = os.getenv("OSRM_URL", "https://router.project-osrm.org")
+ROUTE_SNAP_DECIMALS = int(os.getenv("ROUTE_SNAP_DECIMALS", "4"))
+_ROUTE_CACHE: AsyncTTLCache[Dict[str, Any]] = AsyncTTLCache(
+    "routes",
+    max_entries=int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "1024")),
+    ttl=float(os.getenv("ROUTE_CACHE_TTL", "3600")),
+    shared=True,
+)
+
+
+async def _fetch_osrm_route(prof: str, start: tuple[float, float], end: tuple[float, float]) -> Dict[str, Any]:
+    # OSRM erwartet lon,lat Paare
+    coords = f"{start[1]},{start[0]};{end[1]},{end[0]}"
+    # Baue URL; nutze full overview und GeoJSON Geometrie
+    url = f"{OSRM_URL}/route/v1/{prof}/{quote_plus(coords)}?overview=full&geometries=geojson"
+    resp = await UPSTREAMS.get("osrm", url)
+    data = resp.json()
+    if data.get("code") != "Ok" or not data.get("routes"):
+        raise Exception("No route returned")
+    route = data["routes"][0]
+    return {
+        "distance": route.get("distance"),
+        "duration": route.get("duration"),
+        # GeoJSON geometry: [lon, lat]
+        "geometry": [(lat, lon) for lon, lat in route["geometry"]["coordinates"]],
+    }
+
+
 @app.get("/api/route")
-def get_route(
+async def get_route(
     start_lat: float,
     start_lon: float,
     end_lat: float,
     end_lon: float,
     profile: str = "foot",
+    zoom: float | None = Query(None, ge=0, le=22),
+    encoding: str = "latlng",
 ):
     """
     Liefert eine Route zwischen zwei Koordinaten mithilfe des
@@ -854,84 +1531,111 @@ def get_route(
     und die Geometrie als Liste von [lat, lon]-Koordinaten
     zurückgegeben. Wenn ein Fehler auftritt, wird ein HTTP‑Fehler
     ausgelöst.
+
+    Mit ``zoom`` wird die Geometrie per Douglas‑Peucker auf die bei dieser
+    Zoomstufe (0–22) sichtbare Genauigkeit reduziert.  ``encoding=polyline``
+    liefert sie als Google‑Polyline (Genauigkeit 5) statt als Liste.
     """
     # Valid profiles mapping: foot -> foot, car -> car
     prof = profile.lower()
     if prof not in {"foot", "car"}:
         raise HTTPException(status_code=400, detail="Ungültiges Profil")
-    # OSRM erwartet lon,lat Paare
-    coords = f"{start_lon},{start_lat};{end_lon},{end_lat}"
-    # Baue URL; nutze full overview und GeoJSON Geometrie
-    url = f"https://router.project-osrm.org/route/v1/{prof}/{quote_plus(coords)}?overview=full&geometries=geojson"
+    if encoding not in {"latlng", "polyline"}:
+        raise HTTPException(status_code=400, detail="Ungültige Kodierung")
+    start = snap(start_lat, start_lon, ROUTE_SNAP_DECIMALS)
+    end = snap(end_lat, end_lon, ROUTE_SNAP_DECIMALS)
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        if data.get("code") != "Ok" or not data.get("routes"):
-            raise Exception("No route returned")
-        route = data["routes"][0]
-        # GeoJSON geometry: [lon, lat]
-        geometry = [
-            [lat, lon] for lon, lat in route["geometry"]["coordinates"]
-        ]
-        return {
-            "distance": route.get("distance"),
-            "duration": route.get("duration"),
-            "geometry": geometry,
-        }
+        route = await _ROUTE_CACHE.get_or_fetch(
+            (prof, start, end), lambda: _fetch_osrm_route(prof, start, end)
+        )
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Route: {e}")
         raise HTTPException(status_code=500, detail="Fehler beim Abrufen der Route")
+    geometry = route["geometry"]
+    if zoom is not None:
+        geometry = simplify(geometry, tolerance_for_zoom(zoom, start[0]))
+    result: Dict[str, Any] = {"distance": route["distance"], "duration": route["duration"]}
+    if encoding == "polyline":
+        result.update(geometry=encode_polyline(geometry), encoding="polyline", precision=5)
+    else:
+        result["geometry"] = [[lat, lon] for lat, lon in geometry]
+    return result
+
+
 @app.post("/api/gpt-chat")
 async def gpt_chat(request: Request):
     """
     GPT-basierter Chat-Endpunkt für die neue ChatAssistant-Komponente.
     Erwartet: {"messages": [ ... ]} im OpenAI-Chatformat.
-    Antwort: {"reply": "Antworttext"}
+    Antwort: {"reply": "Antworttext", "tokens_saved": <durch Kürzung des Verlaufs eingesparte Tokens>}
+
+    Sitzungen wie bei ``/api/chat``: Mit ``session_id`` enthält ``messages``
+    (oder ``message``) nur die neuen Nachrichten.  System‑Nachrichten gelten
+    nur für die jeweilige Anfrage und werden nicht in der Sitzung gespeichert.
     """
-    if not client:
+    if not LLM.available:
         raise HTTPException(status_code=503, detail="OpenAI-Client nicht verfügbar")
 
     try:
         data = await request.json()
-        messages = data.get("messages", [])
+        messages = list(data.get("messages") or [])
+        if data.get("message"):
+            messages.append({"role": "user", "content": data["message"]})
         if not messages:
             raise HTTPException(status_code=400, detail="Keine Nachrichten übermittelt")
-
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=600
-        )
-
-        reply = response.choices[0].message.content.strip()
-        return {"reply": reply}
-
+        session_id, history, session_restarted = await _session_messages(data, messages)
+        if session_id:
+            # System-Prompts des Clients gelten nur für diese Anfrage und stehen vorn,
+            # gespeichert werden nur die Gesprächszüge (und die Zusammenfassung)
+            system = [m for m in messages if isinstance(m, dict) and m.get("role") == "system"]
+            history = system + session_history([m for m in history if isinstance(m, dict)])
+        messages = history
+
+        compaction = HISTORY.compact(messages, model="gpt-4")
+        reply = await LLM.complete(compaction.messages, model="gpt-4", temperature=0.7, max_tokens=600)
+        result: Dict[str, Any] = {"reply": reply, "tokens_saved": compaction.tokens_saved}
+        if session_id:
+            history = session_history(compaction.messages)
+            await CHAT_SESSIONS.save(session_id, history + [{"role": "assistant", "content": reply}])
+            result["session_id"] = session_id
+            if session_restarted:
+                result["session_restarted"] = True
+        return result
+
+    except LLMUnavailable as e:
+        logger.error(f"Fehler bei /api/gpt-chat: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Fehler bei /api/gpt-chat: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+# Geocoding: höchstens NOMINATIM_RATE Anfragen pro Sekunde an Nominatim
+# (für alle Worker zusammen, jeder erhält seinen Anteil), Ergebnisse im Speicher und in der Collection
+# "geocode_cache" (TTL GEOCODE_CACHE_TTL Sekunden).  Bereits aufgelöste Orte
+# beantworten Autovervollständigungen lokal.
+GEOCODER = Geocoder(
+    UPSTREAMS,
+    store=MongoGeocodeStore(db.get_collection("geocode_cache"), ttl=float(os.getenv("GEOCODE_CACHE_TTL", "2592000"))),
+    url=os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search"),
+    rate=float(os.getenv("NOMINATIM_RATE", "1")) / WEB_CONCURRENCY,
+    burst=float(os.getenv("NOMINATIM_BURST", "1")),
+    max_wait=float(os.getenv("NOMINATIM_MAX_WAIT", "2")),
+)
+
+
+
 @app.get("/api/geocode")
-def geocode(q: str, limit: int = 5):
-    """Proxy für Nominatim-Geocoding (CORS-freundlich)."""
+async def geocode(q: str, limit: int = 5, autocomplete: bool = False):
+    """
+    Proxy für Nominatim-Geocoding (CORS-freundlich).  Mit
+    ``autocomplete=true`` (Eingabe während des Tippens) werden bekannte Orte
+    lokal per Präfix gesucht und es wird nie auf das Ratenlimit gewartet.
+    """
     if not q or len(q) < 2:
         return {"results": []}
+    limit = max(1, min(limit, GEOCODER.fetch_limit))
     try:
-        import requests
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {"q": q, "format": "json", "addressdetails": 1, "limit": str(limit)}
-        headers = {"User-Agent": "akut.jetzt/1.0 (mailto:info@akut.jetzt)"}
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        results = [
-            {
-                "display_name": item.get("display_name"),
-                "lat": float(item.get("lat")),
-                "lon": float(item.get("lon"))
-            } for item in data if item.get("lat") and item.get("lon")
-        ]
-        return {"results": results}
+        results, source = await GEOCODER.search(q, limit, autocomplete=autocomplete)
+        return {"results": results, "source": source}
     except Exception as e:
         logger.error(f"Geocoding-Fehler: {e}")
         return {"results": []}
@@ -1023,7 +1727,7 @@ def _stub_refine(steps: List[str]) -> List[str]:
 
 
 @app.post("/api/plan-refine", response_model=PlanRefineResponse)
-def plan_refine(req: PlanRefineRequest) -> PlanRefineResponse:
+async def plan_refine(req: PlanRefineRequest) -> PlanRefineResponse:
     """
     Refine a list of planned steps.  A stub implementation is always available
     and does deduplication and safety prioritisation.  If the feature flag
@@ -1046,7 +1750,7 @@ def plan_refine(req: PlanRefineRequest) -> PlanRefineResponse:
     used_nodes.append("plan_refine_stub")
 
     # Optional GPT refinement
-    if PLAN_REFINE_USE_GPT and client is not None:
+    if PLAN_REFINE_USE_GPT and LLM.available:
         try:
             # Build system prompt instructing the model to reorder, deduplicate
             # and simplify the steps.  Provide persona and locale context for
@@ -1069,17 +1773,16 @@ def plan_refine(req: PlanRefineRequest) -> PlanRefineResponse:
                 "sensor": req.sensor,
             }, ensure_ascii=False)
             # Call OpenAI chat completion (we choose gpt-4o-mini for efficiency)
-            completion = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
+            content = await LLM.complete(
+                [
                     {"role": "system", "content": system_instructions},
                     {"role": "user", "content": user_payload},
                 ],
+                model="gpt-4o-mini",
                 temperature=0,
                 response_format={"type": "json_object"},
                 max_tokens=300,
-            )
-            content = completion.choices[0].message.content or "{}"
+            ) or "{}"
             parsed: Dict[str, Any] = {}
             try:
                 parsed = json.loads(content)
@@ -1096,6 +1799,10 @@ def plan_refine(req: PlanRefineRequest) -> PlanRefineResponse:
                 cta = model_cta or cta
             else:
                 fallback = "gpt_no_steps"
+        except LLMUnavailable as e:
+            # Circuit breaker open, overloaded or upstream failure: keep the stub result
+            logger.warning(f"plan_refine: GPT fallback – {e}")
+            fallback = "gpt_unavailable" if e.reason in ("circuit_open", "overloaded") else "gpt_error"
         except Exception as e:
             # Log but do not fail if GPT call fails
             logger.warning(f"plan_refine: GPT fallback – {e}")
@@ -1126,3 +1833,132 @@ def plan_refine(req: PlanRefineRequest) -> PlanRefineResponse:
         fallback=fallback,
         cta=cta,
     )
+
+
+# ---------------------------------------------------------------------------
+# Lebenszyklus: Startphase, Bereitschaft und Herunterfahren
+#
+# Beim Start werden Bäume samt BM25-Index und Gefahren-Metadaten parallel in
+# Threads geladen; die Startphase wartet darauf höchstens STARTUP_TIMEOUT
+# Sekunden (was dann noch läuft, wird im Hintergrund fertig und erst ab da
+# als bereit gemeldet).  Login-Indizes und der Geocoding-Präfixindex hängen
+# an der Datenbank und werden nur im Hintergrund angestoßen.
+# HEALTH prüft alle HEALTH_INTERVAL Sekunden jede Komponente (höchstens
+# HEALTH_CHECK_TIMEOUT Sekunden je Prüfung); /api/ready verlangt die in
+# READY_REQUIRE (kommagetrennt) genannten Komponenten.
+# ---------------------------------------------------------------------------
+STARTUP_TIMEOUT = float(os.getenv("STARTUP_TIMEOUT", "10"))
+HEALTH = HealthMonitor(
+    interval=float(os.getenv("HEALTH_INTERVAL", "5")),
+    check_timeout=float(os.getenv("HEALTH_CHECK_TIMEOUT", "1")),
+    required=[name.strip() for name in os.getenv("READY_REQUIRE", "trees").split(",") if name.strip()],
+)
+_WARMUP_TASKS: set = set()
+
+
+def _check_trees():
+    return len(TREE_STORE) > 0 and NODE_INDEX.built, f"{len(TREE_STORE)} Bäume"
+
+
+def _check_hazard_meta():
+    return bool(HAZARD_META), f"{len(HAZARD_META)} Gefahren"
+
+
+async def _check_mongo():
+    return await PERSISTENCE.ping(timeout=HEALTH.check_timeout)
+
+
+def _check_llm():
+    if not LLM.available:
+        return False, "not_configured"
+    return LLM.breaker.state != "open", LLM.breaker.state
+
+
+def _check_mowas():
+    if MOWAS.interval <= 0:
+        return False, "disabled"
+    return MOWAS.ready, MOWAS.stats.last_error
+
+
+HEALTH.register("trees", _check_trees)
+HEALTH.register("hazard_meta", _check_hazard_meta)
+HEALTH.register("mongo", _check_mongo)
+HEALTH.register("llm", _check_llm)
+HEALTH.register("mowas", _check_mowas)
+
+
+def _load_trees() -> None:
+    TREE_STORE.load_all()
+    NODE_INDEX.build(TREE_STORE)
+
+
+def preload() -> None:
+    """
+    Lädt Bäume, BM25-Index und Gefahren-Metadaten vor dem Forken der Worker
+    (gunicorn mit preload_app, siehe gunicorn.conf.py).  Die Worker teilen
+    sich diese Daten per Copy-on-Write; gc.freeze verhindert, dass der
+    Garbage Collector die Seiten beim Durchlaufen doch kopiert.
+    """
+    _load_trees()
+    reload_hazard_meta()
+    gc.freeze()
+
+
+async def _warm_trees() -> None:
+    # Nach preload() ist alles geladen, der Worker startet nur den Watcher
+    if not NODE_INDEX.built:
+        await asyncio.to_thread(_load_trees)
+    # Hot Reload erst nach dem ersten vollständigen Laden
+    TREE_STORE.start_watcher(TREE_RELOAD_INTERVAL)
+
+
+async def _warm(name: str, step) -> None:
+    began = time.monotonic()
+    try:
+        await step
+    except Exception as e:
+        logger.warning(f"Start: {name} fehlgeschlagen: {e}")
+        return
+    logger.info(f"Start: {name} nach {(time.monotonic() - began) * 1000:.0f} ms")
+
+
+async def _startup() -> None:
+    began = time.monotonic()
+    PERSISTENCE.start()
+    TELEMETRY.start()
+    MOWAS.start()
+    steps = {
+        "trees": _warm_trees(),
+        "hazard_meta": asyncio.to_thread(reload_hazard_meta),
+        "user_indexes": PERSISTENCE.users.ensure_indexes(),
+        "geocoder": GEOCODER.warm(),
+    }
+    tasks = {asyncio.ensure_future(_warm(name, step)): name for name, step in steps.items()}
+    _WARMUP_TASKS.update(tasks)
+    for task in tasks:
+        task.add_done_callback(_WARMUP_TASKS.discard)
+    local = [task for task, name in tasks.items() if name in ("trees", "hazard_meta")]
+    _, pending = await asyncio.wait(local, timeout=STARTUP_TIMEOUT)
+    if pending:
+        names = ", ".join(sorted(tasks[task] for task in pending))
+        logger.warning(f"Start: {names} nach {STARTUP_TIMEOUT:g}s nicht fertig – läuft im Hintergrund weiter")
+    await HEALTH.refresh()
+    HEALTH.start()
+    LOOP_LAG.start()
+    HEALTH.started = True
+    logger.info(f"Startphase nach {(time.monotonic() - began) * 1000:.0f} ms beendet, bereit: {HEALTH.ready}")
+
+
+async def _shutdown() -> None:
+    HEALTH.started = False
+    await HEALTH.stop()
+    await LOOP_LAG.stop()
+    for task in list(_WARMUP_TASKS):
+        task.cancel()
+    TREE_STORE.stop_watcher()
+    await MOWAS.stop()
+    await TELEMETRY.stop()
+    await PERSISTENCE.stop()
+    PASSWORDS.shutdown()
+    await UPSTREAMS.aclose()
+    await LLM.aclose()
@@ -0,0 +1,159 @@
+"""
+Hilfsfunktionen für Server‑Sent‑Events (``/api/grounded-answer-stream``).
+
+``stream_frames`` liest Tokens aus einer asynchronen Quelle (z. B.
+``LLMGateway.stream``) und
+
+- fasst sie zu Frames zusammen, sobald ``flush_interval`` Sekunden seit dem
+  ersten gepufferten Token vergangen sind oder ``max_chars`` Zeichen
+  anliegen,
+- sendet in Pausen alle ``heartbeat`` Sekunden einen SSE‑Kommentar, damit
+  Proxys (nginx) die Verbindung nicht wegen Inaktivität schließen,
+- bricht die Quelle sofort ab, wenn der Client die Verbindung trennt
+  (Abbruch durch Starlette oder ``is_disconnected``),
+- liest über eine begrenzte Queue: Holt der Client die Daten nicht ab, wird
+  auch die Quelle nicht weiter gelesen (Backpressure).
+
+Die Zeit bis zum ersten Token und die Anzahl der Frames stehen danach in
+``StreamStats``.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, List, Optional
+
+_DONE = object()
+
+
+def sse_message(text: str, event: Optional[str] = None) -> str:
+    """Formatiert ``text`` als SSE‑Nachricht; Zeilenumbrüche werden zu mehreren data‑Zeilen."""
+    head = f"event: {event}\n" if event else ""
+    return head + "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
+
+
+def sse_comment(text: str = "") -> str:
+    """SSE‑Kommentar (wird vom Browser ignoriert, hält aber Proxys wach)."""
+    return f": {text}\n\n"
+
+
+@dataclass
+class StreamStats:
+    started: float = field(default_factory=time.monotonic)
+    first_token: Optional[float] = None
+    tokens: int = 0
+    frames: int = 0
+    heartbeats: int = 0
+    disconnected: bool = False
+    parts: List[str] = field(default_factory=list)
+
+    @property
+    def ttft_ms(self) -> Optional[int]:
+        if self.first_token is None:
+            return None
+        return int((self.first_token - self.started) * 1000)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+async def iter_words(text: str) -> AsyncIterator[str]:
+    """Zerlegt einen fertigen Text in Wörter (inkl. Leerraum davor) als Token‑Quelle."""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start
+        while end < length and text[end].isspace():
+            end += 1
+        while end < length and not text[end].isspace():
+            end += 1
+        yield text[start:end]
+        start = end
+
+
+async def stream_frames(
+    tokens: AsyncIterable[str],
+    stats: StreamStats,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    flush_interval: float = 0.05,
+    max_chars: int = 128,
+    heartbeat: float = 15.0,
+    queue_size: int = 64,
+) -> AsyncIterator[str]:
+    """
+    Liefert SSE‑Frames für die Tokens aus ``tokens``.  Fehler der Quelle
+    werden nach dem Senden der bereits gepufferten Tokens weitergereicht.
+    """
+    queue: "asyncio.Queue[object]" = asyncio.Queue(maxsize=queue_size)
+
+    async def pump() -> None:
+        try:
+            async for token in tokens:
+                await queue.put(token)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_DONE)
+
+    producer = asyncio.ensure_future(pump())
+    buffer: List[str] = []
+    buffered = 0
+    flush_at: Optional[float] = None
+    last_sent = time.monotonic()
+
+    def flush() -> str:
+        nonlocal buffer, buffered, flush_at, last_sent
+        frame = sse_message("".join(buffer))
+        buffer, buffered, flush_at = [], 0, None
+        last_sent = time.monotonic()
+        stats.frames += 1
+        return frame
+
+    try:
+        while True:
+            now = time.monotonic()
+            wake = last_sent + heartbeat
+            if flush_at is not None:
+                wake = min(wake, flush_at)
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=max(wake - now, 0.0))
+            except asyncio.TimeoutError:
+                if buffer and flush_at is not None and time.monotonic() >= flush_at:
+                    yield flush()
+                elif time.monotonic() - last_sent >= heartbeat:
+                    if is_disconnected is not None and await is_disconnected():
+                        stats.disconnected = True
+                        return
+                    stats.heartbeats += 1
+                    last_sent = time.monotonic()
+                    yield sse_comment("ping")
+                continue
+            if item is _DONE:
+                if buffer:
+                    yield flush()
+                return
+            if isinstance(item, BaseException):
+                if buffer:
+                    yield flush()
+                raise item
+            token = str(item)
+            if stats.first_token is None:
+                stats.first_token = time.monotonic()
+            stats.tokens += 1
+            stats.parts.append(token)
+            buffer.append(token)
+            buffered += len(token)
+            if buffered >= max_chars:
+                yield flush()
+            elif flush_at is None:
+                flush_at = time.monotonic() + flush_interval
+    except (asyncio.CancelledError, GeneratorExit):
+        stats.disconnected = True
+        raise
+    finally:
+        # Client weg oder Fehler: Quelle (und damit den Upstream‑Stream) sofort beenden
+        if not producer.done():
+            producer.cancel()
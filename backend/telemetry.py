@@ -0,0 +1,316 @@
+"""
+Telemetrie: begrenzter Ringpuffer, gebündeltes Speichern und Rollups.
+
+``/api/telemetry`` legt Ereignisse nur in einen ``deque`` mit fester
+Kapazität; ist er voll, fallen die ältesten Ereignisse weg (gezählt in
+``dropped``).  Eine Hintergrund‑Task leert den Puffer alle
+``flush_interval`` Sekunden bzw. sobald ``batch_size`` Ereignisse anliegen
+und schreibt sie gebündelt in eine Senke:
+
+- ``MongoTelemetrySink``: ``insert_many`` in die Collection ``telemetry``,
+  zusätzlich ``$inc``‑Upserts je Batch in ``telemetry_rollups``,
+- ``JsonlTelemetrySink``: JSON‑Lines‑Dateien, rotiert ab ``max_bytes``.
+
+Schlägt das Schreiben fehl, bleibt der Batch liegen und wird beim nächsten
+Durchlauf erneut versucht; neue Ereignisse sammeln sich solange im Puffer.
+
+Rollups (Ereignisse pro Gefahr, pro Schritt, pro Stunde und pro Typ) werden
+beim Eintreffen inkrementell gezählt, Dashboards müssen also nie die
+Rohdaten durchsuchen.  Die Zahl der Schlüssel je Rollup ist begrenzt, damit
+beliebige Client‑Werte den Speicher nicht füllen können.  Stunden zählen
+nicht gegen diese Grenze: Client‑Zeitstempel gelten nur innerhalb von
+``hour_retention`` vor der Empfangszeit (sonst zählt die Empfangszeit), und
+ältere Stunden werden verworfen – im Speicher beim Eintreffen neuer Stunden,
+in MongoDB per TTL‑Index.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("server.telemetry")
+
+Event = Dict[str, Any]
+
+ROLLUP_KINDS = ("slug", "step", "hour", "event")
+MAX_KEY_LENGTH = 80
+HOUR_FORMAT = "%Y-%m-%dT%H"
+DEFAULT_HOUR_RETENTION = 7 * 24 * 3600.0
+# Erlaubter Vorlauf von Client‑Uhren
+MAX_CLOCK_SKEW = 300.0
+
+
+def _hour(event: Event, now: float, max_age: float) -> str:
+    """Stunde (UTC) des Ereignisses; Zeitstempel außerhalb von ``[now - max_age, now]`` zählen als ``now``."""
+    seconds = now
+    try:
+        ts = float(event.get("timestamp")) / 1000.0
+        if now - max_age <= ts <= now + MAX_CLOCK_SKEW:
+            seconds = min(ts, now)
+    except (TypeError, ValueError):
+        pass
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime(HOUR_FORMAT)
+
+
+def rollup_keys(
+    event: Event, now: Optional[float] = None, max_age: float = DEFAULT_HOUR_RETENTION
+) -> Dict[str, List[str]]:
+    """Die Rollup‑Schlüssel eines Ereignisses, z. B. ``{"slug": ["hochwasser"], ...}``."""
+    slug = event.get("slug") or event.get("slug_effective")
+    steps = event.get("used_nodes")
+    if not isinstance(steps, list):
+        steps = [event.get("step") or event.get("node_id")] if (event.get("step") or event.get("node_id")) else []
+    keys = {
+        "slug": [str(slug)] if slug else [],
+        "step": [f"{slug or '-'}:{step}" for step in steps if isinstance(step, (str, int))],
+        "hour": [_hour(event, time.time() if now is None else now, max_age)],
+        "event": [str(event.get("event") or "unknown")],
+    }
+    return {kind: [k[:MAX_KEY_LENGTH] for k in values] for kind, values in keys.items()}
+
+
+class TelemetryRollups:
+    """
+    Inkrementelle Zähler pro Rollup; neue Schlüssel über ``max_keys`` landen
+    unter ``"_other"``.  Stunden sind davon ausgenommen und werden nach
+    ``hour_retention`` Sekunden verworfen.
+    """
+
+    def __init__(self, max_keys: int = 5000, hour_retention: float = DEFAULT_HOUR_RETENTION) -> None:
+        self.max_keys = max_keys
+        self.hour_retention = hour_retention
+        self.counters: Dict[str, Counter] = {kind: Counter() for kind in ROLLUP_KINDS}
+        self.total = 0
+
+    def keys(self, event: Event, now: Optional[float] = None) -> Dict[str, List[str]]:
+        return rollup_keys(event, now, self.hour_retention)
+
+    def _expire_hours(self, now: float) -> None:
+        cutoff = datetime.datetime.fromtimestamp(now - self.hour_retention, datetime.timezone.utc).strftime(HOUR_FORMAT)
+        # Schlüssel im Format HOUR_FORMAT sind lexikografisch nach Zeit sortiert
+        for key in [k for k in self.counters["hour"] if k < cutoff]:
+            del self.counters["hour"][key]
+
+    def add(self, keys: Dict[str, List[str]], now: Optional[float] = None) -> Dict[str, List[str]]:
+        """Zählt ein Ereignis; liefert die tatsächlich gezählten Schlüssel."""
+        self.total += 1
+        counted: Dict[str, List[str]] = {}
+        for kind, values in keys.items():
+            counter = self.counters[kind]
+            counted[kind] = []
+            for key in values:
+                if key not in counter:
+                    if kind == "hour":
+                        self._expire_hours(time.time() if now is None else now)
+                    elif len(counter) >= self.max_keys:
+                        key = "_other"
+                counter[key] += 1
+                counted[kind].append(key)
+        return counted
+
+    def snapshot(self, top: Optional[int] = None) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"total": self.total}
+        for kind, counter in self.counters.items():
+            items = sorted(counter.items()) if kind == "hour" else counter.most_common(top)
+            result[kind] = dict(items)
+        return result
+
+
+class MongoTelemetrySink:
+    """Schreibt Batches per ``insert_many`` und zählt Rollups per ``$inc`` in MongoDB."""
+
+    name = "mongo"
+
+    def __init__(
+        self, events: Any, rollups: Any, timeout: float = 5.0, hour_retention: float = DEFAULT_HOUR_RETENTION
+    ) -> None:
+        self.events = events
+        self.rollups = rollups
+        self.timeout = timeout
+        self.hour_retention = hour_retention
+        self._ttl_index = False
+
+    def _expires_at(self, hour: str) -> Optional[datetime.datetime]:
+        try:
+            start = datetime.datetime.strptime(hour, HOUR_FORMAT).replace(tzinfo=datetime.timezone.utc)
+        except ValueError:
+            return None
+        return start + datetime.timedelta(seconds=self.hour_retention)
+
+    def _rollup_op(self, kind: str, key: str, n: int) -> Any:
+        from pymongo import UpdateOne
+
+        fields: Dict[str, Any] = {"kind": kind, "key": key}
+        if kind == "hour":
+            # Stunden‑Rollups verfallen per TTL‑Index auf expires_at
+            fields["expires_at"] = self._expires_at(key)
+        return UpdateOne({"_id": f"{kind}:{key}"}, {"$inc": {"count": n}, "$set": fields}, upsert=True)
+
+    def _write(self, batch: List[Event], counts: Dict[str, Counter]) -> None:
+        if not self._ttl_index:
+            self.rollups.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+            self._ttl_index = True
+        self.events.insert_many(batch, ordered=False)
+        ops = [
+            self._rollup_op(kind, key, n)
+            for kind, counter in counts.items()
+            for key, n in counter.items()
+        ]
+        if ops:
+            self.rollups.bulk_write(ops, ordered=False)
+
+    async def write(self, batch: List[Event], counts: Dict[str, Counter]) -> None:
+        await asyncio.wait_for(asyncio.to_thread(self._write, batch, counts), timeout=self.timeout)
+
+    def _load_rollups(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {kind: {} for kind in ROLLUP_KINDS}
+        for doc in self.rollups.find({}, {"kind": 1, "key": 1, "count": 1}):
+            if doc.get("kind") in result:
+                result[doc["kind"]][doc.get("key")] = doc.get("count", 0)
+        return result
+
+    async def load_rollups(self) -> Dict[str, Any]:
+        return await asyncio.wait_for(asyncio.to_thread(self._load_rollups), timeout=self.timeout)
+
+
+class JsonlTelemetrySink:
+    """Hängt Batches an ``telemetry-<Zeitstempel>.jsonl`` an; ab ``max_bytes`` beginnt eine neue Datei."""
+
+    name = "jsonl"
+
+    def __init__(self, directory: str, max_bytes: int = 10 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._path: Optional[str] = None
+
+    def _current_path(self) -> str:
+        if self._path is None or not os.path.exists(self._path) or os.path.getsize(self._path) >= self.max_bytes:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+            self._path = os.path.join(self.directory, f"telemetry-{stamp}.jsonl")
+        return self._path
+
+    def _write(self, batch: List[Event]) -> None:
+        lines = "".join(json.dumps(event, ensure_ascii=False, default=str) + "\n" for event in batch)
+        with open(self._current_path(), "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    async def write(self, batch: List[Event], counts: Dict[str, Counter]) -> None:
+        await asyncio.to_thread(self._write, batch)
+
+
+class TelemetryPipeline:
+    """Ringpuffer + Hintergrund‑Task, die Batches in die Senke schreibt."""
+
+    def __init__(
+        self,
+        sink: Any = None,
+        capacity: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 5.0,
+        rollups: Optional[TelemetryRollups] = None,
+    ) -> None:
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.rollups = rollups or TelemetryRollups()
+        self._buffer: Deque[Event] = deque(maxlen=max(1, capacity))
+        self._pending: Optional[List[Event]] = None
+        self._pending_counts: Dict[str, Counter] = {}
+        self._batch_counts: Dict[str, Counter] = {kind: Counter() for kind in ROLLUP_KINDS}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.stats: Dict[str, int] = {"received": 0, "dropped": 0, "written": 0, "batches": 0, "errors": 0}
+
+    def record(self, event: Event) -> None:
+        """Nimmt ein Ereignis auf (O(1), ohne I/O)."""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.stats["dropped"] += 1
+        self._buffer.append(event)
+        self.stats["received"] += 1
+        now = time.time()
+        keys = self.rollups.add(self.rollups.keys(event, now), now)
+        for kind, values in keys.items():
+            self._batch_counts[kind].update(values)
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def record_many(self, events: Iterable[Event]) -> None:
+        for event in events:
+            self.record(event)
+
+    async def flush(self) -> int:
+        """Schreibt den liegengebliebenen und alle gepufferten Batches; liefert die Zahl geschriebener Ereignisse."""
+        if self.sink is None:
+            self._buffer.clear()
+            self._batch_counts = {kind: Counter() for kind in ROLLUP_KINDS}
+            return 0
+        written = 0
+        while self._pending or self._buffer:
+            if self._pending is None:
+                size = min(self.batch_size, len(self._buffer))
+                self._pending = [self._buffer.popleft() for _ in range(size)]
+                # Rollup‑Zuwächse gehen mit dem ersten Batch nach dem Eintreffen raus
+                self._pending_counts = self._batch_counts
+                self._batch_counts = {kind: Counter() for kind in ROLLUP_KINDS}
+            try:
+                await self.sink.write(self._pending, self._pending_counts)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Telemetrie nicht gespeichert ({len(self._pending)} Ereignisse): {e}")
+                break
+            written += len(self._pending)
+            self.stats["written"] += len(self._pending)
+            self.stats["batches"] += 1
+            self._pending, self._pending_counts = None, {}
+        return written
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Beim Herunterfahren den Rest noch schreiben
+        await self.flush()
+
+    async def persisted_rollups(self) -> Optional[Dict[str, Any]]:
+        """Rollups aus der Senke (über alle Worker und Neustarts), falls sie welche führt."""
+        load = getattr(self.sink, "load_rollups", None)
+        if load is None:
+            return None
+        try:
+            return await load()
+        except Exception as e:
+            logger.warning(f"Telemetrie-Rollups nicht lesbar: {e}")
+            return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "buffered": len(self._buffer) + len(self._pending or ()),
+            "capacity": self._buffer.maxlen,
+            "sink": getattr(self.sink, "name", None),
+        }
@@ -0,0 +1,199 @@
+"""
+In‑Memory‑Speicher für die Entscheidungsbäume.
+
+Alle Dateien ``{slug}_decision_tree.{lang}.json`` aus ``data/decision-trees``
+werden einmalig beim Start eingelesen und unter dem Schlüssel
+``(slug, lang)`` abgelegt.  Der Rückgriff auf die deutsche Fassung wird
+bereits beim Laden aufgelöst, sodass eine Abfrage nur noch ein
+Dictionary‑Zugriff ist.  Ein optionaler Hintergrund‑Thread prüft in einem
+festen Intervall die Änderungszeitpunkte (mtime) der Dateien und lädt
+geänderte, neue oder gelöschte Bäume einzeln nach – Redakteur:innen
+müssen den Server dafür nicht neu starten.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("server.tree_store")
+
+# Sprachen, für die der Fallback auf Deutsch vorab aufgelöst wird
+SUPPORTED_LANGS: Tuple[str, ...] = ("de", "en", "fr", "es", "it")
+FALLBACK_LANG = "de"
+
+_FILE_RE = re.compile(r"^(?P<slug>.+)_decision_tree\.(?P<lang>[a-z]{2})\.json$")
+
+
+class DecisionTreeStore:
+    """
+    Hält alle Entscheidungsbäume im Arbeitsspeicher.
+
+    ``get(slug, lang)`` liefert den Baum in der gewünschten Sprache oder –
+    falls diese fehlt – die deutsche Fassung.  Existiert keines von beiden,
+    wird ``None`` zurückgegeben.  Die zurückgegebenen Objekte werden von
+    allen Endpunkten geteilt und dürfen daher nicht verändert werden.
+    """
+
+    def __init__(self, base_path: str) -> None:
+        self.base_path = base_path
+        # Geladene Dateien: (slug, lang) -> Baum
+        self._trees: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # Vorab aufgelöste Sicht inklusive Fallback: (slug, lang) -> Baum
+        self._resolved: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # Dateiname -> mtime, um Änderungen zu erkennen
+        self._mtimes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Callbacks, die nach jeder Änderung mit (slug, lang) aufgerufen werden
+        self._listeners: List[Callable[[str, str], None]] = []
+        # Zusätzliche Prüfungen, die der Watcher in jedem Intervall ausführt
+        self._poll_hooks: List[Callable[[], Any]] = []
+
+    # ------------------------------------------------------------------
+    # Laden
+    # ------------------------------------------------------------------
+
+    def load_all(self) -> int:
+        """Liest alle Baumdateien ein und gibt die Anzahl geladener Dateien zurück."""
+        self.refresh()
+        return len(self._trees)
+
+    def _scan(self) -> Dict[str, float]:
+        found: Dict[str, float] = {}
+        try:
+            with os.scandir(self.base_path) as entries:
+                for entry in entries:
+                    if _FILE_RE.match(entry.name) and entry.is_file():
+                        found[entry.name] = entry.stat().st_mtime
+        except FileNotFoundError:
+            logger.warning(f"Verzeichnis für Entscheidungsbäume fehlt: {self.base_path}")
+        return found
+
+    def refresh(self) -> List[Tuple[str, str]]:
+        """
+        Gleicht den Speicher mit dem Dateisystem ab.  Nur Dateien, deren
+        mtime sich geändert hat, werden neu geparst.  Rückgabe ist die Liste
+        der geänderten Schlüssel ``(slug, lang)``.
+        """
+        current = self._scan()
+        changed: List[Tuple[str, str]] = []
+        for fname, mtime in current.items():
+            if self._mtimes.get(fname) == mtime:
+                continue
+            m = _FILE_RE.match(fname)
+            slug, lang = m.group("slug"), m.group("lang")
+            try:
+                with open(os.path.join(self.base_path, fname), encoding="utf-8") as f:
+                    tree = json.load(f)
+            except Exception as e:
+                # Fehlerhafte Datei: alte Fassung (falls vorhanden) behalten
+                logger.error(f"Fehler beim Laden des Entscheidungsbaums {fname}: {e}")
+                self._mtimes[fname] = mtime
+                continue
+            with self._lock:
+                self._trees[(slug, lang)] = tree
+                self._mtimes[fname] = mtime
+                self._resolve(slug)
+            changed.append((slug, lang))
+        for fname in set(self._mtimes) - set(current):
+            m = _FILE_RE.match(fname)
+            slug, lang = m.group("slug"), m.group("lang")
+            with self._lock:
+                self._mtimes.pop(fname, None)
+                self._trees.pop((slug, lang), None)
+                self._resolve(slug)
+            changed.append((slug, lang))
+        for slug, lang in changed:
+            for listener in list(self._listeners):
+                try:
+                    listener(slug, lang)
+                except Exception as e:
+                    logger.warning(f"tree_store: Listener-Fehler für {slug}/{lang}: {e}")
+        if changed and self._watcher is not None:
+            logger.info(f"tree_store: {len(changed)} Entscheidungsbäume neu geladen")
+        return changed
+
+    def _resolve(self, slug: str) -> None:
+        """Baut die Fallback‑Sicht für einen Slug neu auf (Lock muss gehalten werden)."""
+        langs = set(SUPPORTED_LANGS) | {lang for (s, lang) in self._trees if s == slug}
+        fallback = self._trees.get((slug, FALLBACK_LANG))
+        for lang in langs:
+            tree = self._trees.get((slug, lang)) or fallback
+            if tree is None:
+                self._resolved.pop((slug, lang), None)
+            else:
+                self._resolved[(slug, lang)] = tree
+
+    # ------------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------------
+
+    def get(self, slug: str, lang: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Liefert den Baum für ``slug`` in ``lang`` (Fallback Deutsch) oder None."""
+        language = lang or FALLBACK_LANG
+        tree = self._resolved.get((slug, language))
+        if tree is None and language not in SUPPORTED_LANGS:
+            tree = self._resolved.get((slug, FALLBACK_LANG))
+        return tree
+
+    def resolved_lang(self, slug: str, lang: Optional[str] = None) -> Optional[str]:
+        """Gibt an, welche Sprachfassung ``get`` tatsächlich liefert."""
+        language = lang or FALLBACK_LANG
+        if (slug, language) in self._trees:
+            return language
+        if (slug, FALLBACK_LANG) in self._trees:
+            return FALLBACK_LANG
+        return None
+
+    def slugs(self) -> List[str]:
+        return sorted({slug for slug, _ in self._trees})
+
+    def items(self) -> List[Tuple[Tuple[str, str], Dict[str, Any]]]:
+        """Alle tatsächlich geladenen Dateien als ((slug, lang), Baum)."""
+        return list(self._trees.items())
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+    def add_listener(self, callback: Callable[[str, str], None]) -> None:
+        """Registriert einen Callback, der nach jedem (Neu‑)Laden aufgerufen wird."""
+        self._listeners.append(callback)
+
+    # ------------------------------------------------------------------
+    # Hot Reload
+    # ------------------------------------------------------------------
+
+    def add_poll_hook(self, hook: Callable[[], Any]) -> None:
+        """Registriert eine Funktion, die der Watcher bei jedem Durchlauf aufruft."""
+        self._poll_hooks.append(hook)
+
+    def start_watcher(self, interval: float = 2.0) -> None:
+        """Startet einen Daemon‑Thread, der alle ``interval`` Sekunden auf Änderungen prüft."""
+        if self._watcher is not None or interval <= 0:
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning(f"tree_store: Fehler beim Hot Reload: {e}")
+                for hook in list(self._poll_hooks):
+                    try:
+                        hook()
+                    except Exception as e:
+                        logger.warning(f"tree_store: Fehler in Poll-Hook: {e}")
+
+        self._watcher = threading.Thread(target=run, name="tree-store-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+        self._watcher = None
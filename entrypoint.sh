@@ -21,17 +21,38 @@ fi
 
 # Starte den FastAPI-Backend-Service
 cd /backend || { echo "Backend directory not found"; exit 1; }
-echo "🚀 Starte FastAPI backend..."
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+# Interner Port des Backends; nginx.conf leitet an 127.0.0.1:8001 weiter
+BACKEND_PORT=${BACKEND_PORT:-8001}
+export BACKEND_PORT
+# Ab WEB_CONCURRENCY > 1 mehrere Worker über gunicorn (siehe gunicorn.conf.py)
+if [ "${WEB_CONCURRENCY:-1}" -gt 1 ]; then
+  echo "🚀 Starte FastAPI backend mit $WEB_CONCURRENCY Workern..."
+  gunicorn -c gunicorn.conf.py server:app &
+else
+  echo "🚀 Starte FastAPI backend..."
+  uvicorn server:app --host 0.0.0.0 --port "$BACKEND_PORT" &
+fi
 BACKEND_PID=$!
 
+# Warten, bis /api/ready meldet, dass die Startphase abgeschlossen ist
+# (höchstens READY_TIMEOUT Sekunden, Standard 60)
 echo "⏳ Warte auf Backend-Start..."
-sleep 30
-
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-  echo "❌ Backend startete nicht korrekt – breche ab"
-  exit 1
-fi
+READY_TIMEOUT=${READY_TIMEOUT:-60}
+WAITED=0
+until wget -q -O /dev/null -T 2 "http://127.0.0.1:$BACKEND_PORT/api/ready" 2>/dev/null; do
+  if ! kill -0 $BACKEND_PID 2>/dev/null; then
+    echo "❌ Backend startete nicht korrekt – breche ab"
+    exit 1
+  fi
+  if [ "$WAITED" -ge "$((READY_TIMEOUT * 2))" ]; then
+    echo "❌ Backend nach ${READY_TIMEOUT}s nicht bereit – breche ab"
+    kill $BACKEND_PID
+    exit 1
+  fi
+  sleep 0.5
+  WAITED=$((WAITED + 1))
+done
+echo "✅ Backend bereit"
 
 # Starte Nginx
 echo "🌐 Starte Nginx..."
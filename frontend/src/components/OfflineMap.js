@@ -273,7 +273,9 @@ useEffect(() => {
         start_lon: userPos[1],
         end_lat: poi.lat,
         end_lon: poi.lng,
-        profile: 'foot'
+        profile: 'foot',
+        // Geometrie serverseitig auf Straßenzoom-Genauigkeit vereinfachen
+        zoom: 17
       });
       const resp = await fetch(`${backendUrl}/api/route?${params.toString()}`);
       if (resp.ok) {
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# Die Backend‑Module liegen flach in backend/ (Start mit cwd backend)
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """``fake_llm`` ohne Verzögerung und Ausfälle; Tests ändern ``fake_llm.SETTINGS``."""
+    import fake_llm
+
+    for key in ("latency", "token_delay", "failure_rate"):
+        monkeypatch.setitem(fake_llm.SETTINGS, key, 0.0)
+    return fake_llm
+
+
+@pytest.fixture
+def llm(fake_llm):
+    """LLM‑Gateway gegen ``fake_llm`` im Prozess (ASGI‑Transport statt Netz), ohne Retries."""
+    import httpx
+    from openai import AsyncOpenAI
+
+    from llm_gateway import CircuitBreaker, LLMGateway
+
+    gateway = LLMGateway(
+        api_key="test", max_attempts=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    )
+    gateway.client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://fake-llm/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_llm.app)),
+    )
+    return gateway
+
+
+@pytest.fixture
+def api(llm, monkeypatch):
+    """
+    TestClient für ``server.app`` mit ``llm`` als Sprachmodell.  Die Startphase
+    läuft nicht (ohne MongoDB wartet das Beenden auf dessen Timeout); geladen
+    werden nur Bäume und Gefahren‑Metadaten.
+    """
+    monkeypatch.chdir(BACKEND)  # Daten liegen relativ zu backend/
+    os.environ.setdefault("TELEMETRY_SINK", "none")
+    os.environ.setdefault("MOWAS_POLL_INTERVAL", "0")
+    from fastapi.testclient import TestClient
+
+    import server
+
+    if not server.NODE_INDEX.built:
+        server._load_trees()
+        server.reload_hazard_meta()
+    monkeypatch.setattr(server, "LLM", llm)
+    return TestClient(server.app)
@@ -0,0 +1,151 @@
+"""``AsyncTTLCache``: Single‑Flight, Stale‑While‑Revalidate, LRU und gemeinsame zweite Ebene."""
+
+import asyncio
+import time
+
+import pytest
+
+from cache import AsyncTTLCache, set_shared_tier
+
+
+class Upstream:
+    """Zählt Abrufe; jeder Abruf liefert ``<key>#<n>`` nach ``delay`` Sekunden."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.calls = 0
+
+    def fetch(self, key):
+        async def load():
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            return f"{key}#{self.calls}"
+
+        return load
+
+
+class DictTier:
+    """Zweite Ebene im Speicher mit der Schnittstelle von ``RedisCacheTier``."""
+
+    name = "dict"
+
+    def __init__(self, broken: bool = False) -> None:
+        self.entries = {}
+        self.broken = broken
+
+    async def get_many(self, keys):
+        if self.broken:
+            raise ConnectionError("tier down")
+        return [self.entries.get(key) for key in keys]
+
+    async def set_many(self, items, ttl):
+        if self.broken:
+            raise ConnectionError("tier down")
+        self.entries.update({key: (time.time(), value) for key, value in items.items()})
+
+
+@pytest.fixture
+def tier():
+    yield DictTier()
+    set_shared_tier(None)
+
+
+def test_concurrent_misses_are_coalesced():
+    async def scenario():
+        cache = AsyncTTLCache("test", register=False)
+        upstream = Upstream(delay=0.05)
+        values = await asyncio.gather(*(cache.get_or_fetch("bonn", upstream.fetch("bonn")) for _ in range(10)))
+        assert values == ["bonn#1"] * 10
+        assert upstream.calls == 1
+        assert cache.stats.misses == 1 and cache.stats.coalesced == 9
+
+        # ein Fehler wird an alle Wartenden weitergegeben, aber nicht gecacht
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(cache.get_or_fetch("köln", broken) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert cache.stats.errors == 1
+        assert await cache.get_or_fetch("köln", upstream.fetch("köln")) == "köln#2"
+
+    asyncio.run(scenario())
+
+
+def test_stale_entry_is_served_and_refreshed_in_background():
+    async def scenario():
+        cache = AsyncTTLCache("test", ttl=10.0, stale_ttl=60.0, register=False)
+        upstream = Upstream(delay=0.02)
+        cache.set("bonn", "alt", age=30.0)
+
+        assert await cache.get_or_fetch("bonn", upstream.fetch("bonn")) == "alt"
+        assert await cache.get_or_fetch("bonn", upstream.fetch("bonn")) == "alt"
+        assert cache.stats.stale_hits == 2 and cache.stats.refreshes == 1
+
+        await asyncio.sleep(0.05)
+        assert await cache.get_or_fetch("bonn", upstream.fetch("bonn")) == "bonn#1"
+        assert upstream.calls == 1 and cache.stats.hits == 1
+
+        # jenseits von ttl + stale_ttl wird wieder gewartet
+        cache.set("bonn", "uralt", age=100.0)
+        assert await cache.get_or_fetch("bonn", upstream.fetch("bonn")) == "bonn#2"
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AsyncTTLCache("test", max_entries=2, register=False)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" zuletzt genutzt, "b" fällt heraus
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2 and cache.stats.evictions == 1
+    # peek frischt nicht auf: "a" bleibt der älteste Eintrag
+    cache.peek("a")
+    cache.get("c")
+    cache.set("d", 4)
+    assert cache.peek("a") is None and cache.peek("c") == 3
+
+
+def test_shared_tier_serves_other_workers(tier):
+    async def scenario():
+        set_shared_tier(tier)
+        upstream = Upstream()
+        first = AsyncTTLCache("geo", shared=True, register=False)
+        second = AsyncTTLCache("geo", shared=True, register=False)
+
+        assert await first.get_or_fetch("bonn", upstream.fetch("bonn")) == "bonn#1"
+        await asyncio.sleep(0)  # Schreiben in die zweite Ebene läuft im Hintergrund
+        assert await second.get_or_fetch("bonn", upstream.fetch("bonn")) == "bonn#1"
+        assert upstream.calls == 1 and second.stats.shared_hits == 1
+
+        values = await second.get_many_or_fetch(["bonn", "köln"], _fetch_many(upstream))
+        assert values == {"bonn": "bonn#1", "köln": "köln#2"}
+
+    asyncio.run(scenario())
+
+
+def test_broken_shared_tier_falls_back_to_upstream(tier):
+    async def scenario():
+        tier.broken = True
+        set_shared_tier(tier)
+        cache = AsyncTTLCache("geo", shared=True, register=False)
+        upstream = Upstream()
+
+        assert await cache.get_or_fetch("bonn", upstream.fetch("bonn")) == "bonn#1"
+        await asyncio.sleep(0)
+        # Lesen und Schreiben scheitern, der Wert kommt trotzdem an und bleibt im Prozess
+        assert cache.stats.shared_errors == 2 and cache.stats.errors == 0
+        assert cache.get("bonn") == "bonn#1"
+
+    asyncio.run(scenario())
+
+
+def _fetch_many(upstream):
+    async def fetch_many(keys):
+        return {key: await upstream.fetch(key)() for key in keys}
+
+    return fetch_many
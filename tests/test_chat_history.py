@@ -0,0 +1,19 @@
+"""Zähl‑ und Zusammenfassungs‑Caches halten keine großen Texte fest."""
+
+import chat_history
+from chat_history import CACHE_MAX_CHARS, count_text_tokens
+
+
+def test_large_texts_bypass_caches():
+    chat_history._count_text_tokens_cached.cache_clear()
+    chat_history._summary_line_cached.cache_clear()
+    small, large = "Wie lagere ich die Person?", "Hilfe! " * CACHE_MAX_CHARS
+
+    assert count_text_tokens(large) == count_text_tokens(large) > 0
+    chat_history._summary_line("user", large)
+    assert chat_history._count_text_tokens_cached.cache_info().currsize == 0
+    assert chat_history._summary_line_cached.cache_info().currsize == 0
+
+    count_text_tokens(small)
+    count_text_tokens(small)
+    assert chat_history._count_text_tokens_cached.cache_info().hits == 1
@@ -0,0 +1,62 @@
+"""Chat‑Sitzungen über ``/api/gpt-chat``: Verlauf auf dem Server, System‑Prompts nur je Anfrage."""
+
+import asyncio
+
+import pytest
+
+SYSTEM = {"role": "system", "content": "Du bist ein ruhiger Erste‑Hilfe‑Assistent."}
+
+
+@pytest.fixture
+def seen(llm, monkeypatch):
+    """Die Nachrichten, die je Aufruf beim Sprachmodell ankommen."""
+    calls = []
+    complete = llm.complete
+
+    async def recording(messages, **kwargs):
+        calls.append([dict(m) for m in messages])
+        return await complete(messages, **kwargs)
+
+    monkeypatch.setattr(llm, "complete", recording)
+    return calls
+
+
+def test_session_keeps_turns_but_not_system_prompts(api, seen, fake_llm):
+    import server
+
+    first = api.post(
+        "/api/gpt-chat",
+        json={"session": True, "messages": [SYSTEM, {"role": "user", "content": "Es brennt in der Küche."}]},
+    ).json()
+    session_id = first["session_id"]
+    assert first["reply"] == fake_llm.SETTINGS["reply"]
+    assert "session_restarted" not in first
+
+    # Folgeaufruf: nur der neue Zug (und der System‑Prompt dieser Anfrage)
+    second = api.post(
+        "/api/gpt-chat",
+        json={"session_id": session_id, "messages": [SYSTEM, {"role": "user", "content": "Soll ich löschen?"}]},
+    ).json()
+    assert second["session_id"] == session_id
+    assert [m["content"] for m in seen[1]] == [
+        SYSTEM["content"],
+        "Es brennt in der Küche.",
+        fake_llm.SETTINGS["reply"],
+        "Soll ich löschen?",
+    ]
+
+    stored = asyncio.run(server.CHAT_SESSIONS.load(session_id))
+    assert [m["role"] for m in stored] == ["user", "assistant", "user", "assistant"]
+
+
+def test_unknown_session_is_restarted(api, seen):
+    reply = api.post("/api/gpt-chat", json={"session_id": "abgelaufen", "message": "Hallo?"}).json()
+    assert reply["session_restarted"] is True
+    assert reply["session_id"] != "abgelaufen"
+    assert seen == [[{"role": "user", "content": "Hallo?"}]]
+
+
+def test_without_session_the_call_stays_stateless(api, seen):
+    reply = api.post("/api/gpt-chat", json={"messages": [SYSTEM, {"role": "user", "content": "Hallo?"}]}).json()
+    assert "session_id" not in reply
+    assert seen[0][0] == SYSTEM
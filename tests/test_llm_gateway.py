@@ -0,0 +1,72 @@
+"""LLM‑Gateway gegen ``fake_llm``: Circuit Breaker und Notantworten der Endpunkte bei Ausfall."""
+
+import asyncio
+
+import pytest
+
+from llm_gateway import LLMUnavailable
+
+MESSAGES = [{"role": "user", "content": "Was tun bei einem Wespenstich?"}]
+
+
+def test_breaker_opens_after_failures(llm, fake_llm):
+    async def scenario():
+        assert await llm.complete(MESSAGES, model="gpt-4") == fake_llm.SETTINGS["reply"]
+
+        fake_llm.SETTINGS["failure_rate"] = 1.0
+        for _ in range(2):
+            with pytest.raises(LLMUnavailable) as failed:
+                await llm.complete(MESSAGES, model="gpt-4")
+            assert failed.value.reason == "upstream_error"
+        assert llm.breaker.state == "open"
+
+        # offen: abgelehnt, ohne das Sprachmodell zu erreichen
+        requests = fake_llm.STATS["requests"]
+        with pytest.raises(LLMUnavailable) as rejected:
+            await llm.complete(MESSAGES, model="gpt-4")
+        assert rejected.value.reason == "circuit_open"
+        assert fake_llm.STATS["requests"] == requests
+
+        snapshot = llm.snapshot()
+        assert snapshot["breaker"] == "open"
+        assert (snapshot["calls"], snapshot["failures"], snapshot["rejected"]) == (3, 2, 1)
+        assert snapshot["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_counts_calls_in_flight(llm, fake_llm):
+    async def scenario():
+        fake_llm.SETTINGS["latency"] = 0.05
+        calls = [asyncio.ensure_future(llm.complete(MESSAGES, model="gpt-4")) for _ in range(3)]
+        await asyncio.sleep(0.02)
+        assert llm.snapshot()["in_flight"] == 3
+        await asyncio.gather(*calls)
+        assert llm.snapshot()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_chat_falls_back_to_hazard_advice(api, fake_llm):
+    import server
+
+    fake_llm.SETTINGS["failure_rate"] = 1.0
+    advice = " ".join(server.HAZARD_META["anaphylaxie"]["description"]["de"].split())
+    reasons = []
+    for _ in range(3):
+        reply = api.post("/api/chat", json={"slug": "anaphylaxie", "message": "Was soll ich tun?"})
+        assert reply.status_code == 200 and reply.json()["content"] == advice
+        reasons.append(reply.json()["degraded"])
+    assert reasons == ["upstream_error", "upstream_error", "circuit_open"]
+
+    # ohne Gefahr gibt es keine Handlungsempfehlung: 503 mit Grund
+    reply = api.post("/api/chat", json={"message": "Was soll ich tun?"})
+    assert reply.status_code == 503 and reply.json()["reason"] == "circuit_open"
+
+
+def test_grounded_answer_falls_back_to_tree(api, fake_llm):
+    fake_llm.SETTINGS["failure_rate"] = 1.0
+    body = {"slug": "anaphylaxie", "question": "Darf mein Nachbar mir sein Spray leihen?"}
+    reply = api.post("/api/grounded-answer", json=body).json()
+    assert reply["source"] == "tree" and reply["degraded"] == "upstream_error"
+    assert reply["answer"] and reply["used_nodes"]
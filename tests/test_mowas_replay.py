@@ -0,0 +1,82 @@
+"""MoWaS‑Import gegen aufgezeichnete Feeds (``tests/fixtures/mowas``)."""
+
+import asyncio
+import json
+import os
+import shutil
+
+import pytest
+
+from external_integrations.mowas import MowasIngester, ReplaySource
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+FLOOD = "mow.DE-NW-BN-SE030-20240301-30-000"  # Bonn, Version 1 -> 2
+FIRE = "mow.DE-NW-K-SE045-20240301-45-001"  # Köln, entfällt in mapData2
+OUTAGE = "mow.DE-NW-SU-SE012-20240301-12-000"  # Siegburg, Geometrie fehlt zunächst
+
+BONN = (50.72, 7.10)
+BONN_SOUTH = (50.62, 7.10)  # nur im Polygon der Version 2
+KOELN = (50.96, 7.00)
+SIEGBURG = (50.80, 7.20)
+
+
+@pytest.fixture
+def replay_dir(tmp_path):
+    target = tmp_path / "mowas"
+    shutil.copytree(os.path.join(FIXTURES, "mowas"), target)
+    return target
+
+
+def _ids(ingester, point):
+    return {w["id"] for w in ingester.lookup(*point)}
+
+
+def _write_polygon(path, lon0, lat0, lon1, lat1):
+    ring = [[lon0, lat0], [lon1, lat0], [lon1, lat1], [lon0, lat1], [lon0, lat0]]
+    path.write_text(json.dumps({"type": "Polygon", "coordinates": [ring]}), encoding="utf-8")
+
+
+def test_add_change_remove_and_failed_geometry(replay_dir):
+    ingester = MowasIngester(ReplaySource(str(replay_dir)), interval=0)
+
+    # mapData1: Hochwasser und Brand werden geladen, Stromausfall ohne Geometrie
+    assert asyncio.run(ingester.poll_once())
+    assert _ids(ingester, BONN) == {FLOOD}
+    assert _ids(ingester, KOELN) == {FIRE}
+    assert _ids(ingester, SIEGBURG) == set()
+    assert ingester.pending_geometries == 1
+    assert ingester.stats.added == 2 and ingester.stats.geometry_errors == 1
+
+    # mapData2: Hochwasser in Version 2 mit größerem Gebiet, Brand entfällt
+    _write_polygon(replay_dir / f"{FLOOD}.geojson", 7.0, 50.55, 7.2, 50.78)
+    assert asyncio.run(ingester.poll_once())
+    assert _ids(ingester, BONN_SOUTH) == {FLOOD}
+    assert ingester.lookup(*BONN)[0]["version"] == 2
+    assert _ids(ingester, KOELN) == set()
+    assert ingester.stats.updated == 1 and ingester.stats.removed == 1
+    assert ingester.pending_geometries == 1
+
+    # Feed unverändert (304), Geometrie weiter nicht verfügbar
+    assert not asyncio.run(ingester.poll_once())
+    assert ingester.stats.not_modified == 1
+    assert ingester.pending_geometries == 1
+
+    # Geometrie wieder erreichbar: nächster 304‑Abruf holt sie nach
+    _write_polygon(replay_dir / f"{OUTAGE}.geojson", 7.15, 50.75, 7.25, 50.85)
+    assert asyncio.run(ingester.poll_once())
+    assert _ids(ingester, SIEGBURG) == {OUTAGE}
+    assert ingester.pending_geometries == 0
+    assert ingester.stats.added == 3
+
+
+def test_failed_update_keeps_previous_geometry(replay_dir):
+    ingester = MowasIngester(ReplaySource(str(replay_dir)), interval=0)
+    asyncio.run(ingester.poll_once())
+    (replay_dir / f"{FLOOD}.geojson").unlink()
+
+    asyncio.run(ingester.poll_once())
+
+    # Version 2 fehlt noch: Version 1 bleibt aktiv und wird erneut versucht
+    assert [w["version"] for w in ingester.lookup(*BONN)] == [1]
+    assert ingester.pending_geometries == 2
@@ -0,0 +1,132 @@
+"""Feedback‑Batches und Login‑Lookups gegen mongomock‑motor (``MongoPersistence.start(client=...)``)."""
+
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from persistence import BatchWriter, MongoPersistence
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def _persistence(**feedback_options) -> MongoPersistence:
+    options = {"batch_size": 100, "flush_interval": 60.0, "capacity": 10000, **feedback_options}
+    persistence = MongoPersistence.from_env(None, "akut_test")
+    persistence.feedback = BatchWriter("feedback", **options)
+    return persistence
+
+
+class FlakyCollection:
+    """Leitet an ``inner`` weiter, ``insert_many`` scheitert aber die ersten ``failures`` Male."""
+
+    def __init__(self, inner, failures: int = 1) -> None:
+        self.inner = inner
+        self.failures = failures
+        self.calls = 0
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        return await self.inner.insert_many(docs, ordered=ordered)
+
+
+def test_flushes_when_batch_size_reached():
+    async def scenario():
+        persistence = _persistence(batch_size=3)
+        persistence.start(client=mongomock_motor.AsyncMongoMockClient())
+        for i in range(3):
+            assert persistence.feedback.submit({"n": i})
+        # batch_size erreicht: der Writer wird sofort geweckt, nicht erst nach flush_interval
+        for _ in range(50):
+            if persistence.feedback.stats["batches"]:
+                break
+            await asyncio.sleep(0.01)
+        assert await persistence.db["feedback"].count_documents({}) == 3
+        assert persistence.feedback.snapshot()["buffered"] == 0
+        await persistence.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_batch_is_retried():
+    async def scenario():
+        inner = mongomock_motor.AsyncMongoMockClient()["akut_test"]["feedback"]
+        flaky = FlakyCollection(inner)
+        writer = BatchWriter("feedback", collection=flaky, batch_size=10)
+        for i in range(4):
+            writer.submit({"n": i})
+
+        assert await writer.flush() == 0
+        assert writer.stats["errors"] == 1
+        assert writer.snapshot()["buffered"] == 4
+
+        assert await writer.flush() == 4
+        assert await inner.count_documents({}) == 4
+        assert writer.snapshot()["buffered"] == 0
+        assert writer.stats["written"] == 4 and flaky.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_bulk_write_error_counts_inserted_documents():
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["akut_test"]["feedback"]
+        await collection.insert_one({"_id": "dup"})
+        writer = BatchWriter("feedback", collection=collection, batch_size=10)
+        for doc in ({"_id": "a"}, {"_id": "dup"}, {"_id": "b"}):
+            writer.submit(doc)
+
+        assert await writer.flush() == 2
+        assert writer.stats["written"] == 2
+        assert writer.stats["errors"] == 1
+        # das Duplikat wird verworfen, nicht endlos wiederholt
+        assert writer.snapshot()["buffered"] == 0
+        assert await collection.count_documents({}) == 3
+
+    asyncio.run(scenario())
+
+
+def test_submit_rejects_when_buffer_full():
+    writer = BatchWriter("feedback", batch_size=10, capacity=2)
+    assert writer.submit({"n": 1})
+    assert writer.submit({"n": 2})
+    assert not writer.submit({"n": 3})
+    assert writer.stats["rejected"] == 1
+    assert writer.snapshot()["buffered"] == 2
+
+
+def test_stop_flushes_buffer():
+    async def scenario():
+        persistence = _persistence(batch_size=100)
+        persistence.start(client=mongomock_motor.AsyncMongoMockClient())
+        db = persistence.db
+        for i in range(5):
+            persistence.feedback.submit({"n": i})
+        await persistence.stop()
+        assert await db["feedback"].count_documents({}) == 5
+
+    asyncio.run(scenario())
+
+
+def test_find_by_login_username_and_email():
+    async def scenario():
+        persistence = _persistence()
+        persistence.start(client=mongomock_motor.AsyncMongoMockClient())
+        await persistence.users.ensure_indexes()
+        await persistence.db["users"].insert_one(
+            {"username": "anna", "email": "anna@example.org", "password_hash": "x", "role": "admin"}
+        )
+
+        by_name = await persistence.users.find_by_login("anna")
+        by_email = await persistence.users.find_by_login("anna@example.org")
+        assert by_name["email"] == "anna@example.org"
+        assert by_email["username"] == "anna"
+        # Projektion: nur die für den Login nötigen Felder
+        assert "role" not in by_name
+        assert await persistence.users.find_by_login("bert") is None
+        await persistence.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+"""Routengeometrie: Douglas‑Peucker und Polyline‑Kodierung."""
+
+import math
+
+import pytest
+
+from routing import decode_polyline, encode_polyline, simplify, tolerance_for_zoom
+
+
+def _route(n: int = 400):
+    """Bonn → Köln mit leichtem Zittern (±1 m) und einem Umweg von rund 500 m."""
+    points = []
+    for i in range(n):
+        f = i / (n - 1)
+        detour = 0.0045 * math.sin(math.pi * f) if 0.4 < f < 0.6 else 0.0
+        jitter = 0.00001 * (1 if i % 2 else -1)
+        points.append((50.72 + 0.24 * f + jitter, 7.10 - 0.10 * f + detour))
+    return points
+
+
+def test_encode_polyline_matches_reference():
+    # Beispiel aus der Formatbeschreibung von Google
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == points
+
+
+def test_simplified_route_survives_round_trip():
+    route = _route()
+    simplified = simplify(route, tolerance_for_zoom(14, route[0][0]))
+
+    assert simplified[0] == route[0] and simplified[-1] == route[-1]
+    assert 3 < len(simplified) < len(route) // 10
+    # der Umweg bleibt erhalten
+    assert max(lon for _, lon in simplified) > 7.10 - 0.10 * 0.5 + 0.004
+
+    decoded = decode_polyline(encode_polyline(simplified))
+    assert len(decoded) == len(simplified)
+    for (lat, lon), (dlat, dlon) in zip(simplified, decoded):
+        assert dlat == pytest.approx(lat, abs=5e-6) and dlon == pytest.approx(lon, abs=5e-6)
+
+
+def test_zero_tolerance_keeps_all_points():
+    route = _route(20)
+    assert simplify(route, 0) == route
+    decoded = decode_polyline(encode_polyline(route, precision=6), precision=6)
+    assert [c for p in decoded for c in p] == pytest.approx([c for p in route for c in p], abs=5e-7)
@@ -0,0 +1,32 @@
+"""Stunden‑Rollups: Client‑Zeitstempel begrenzt, alte Stunden verfallen."""
+
+import time
+
+from telemetry import TelemetryRollups
+
+HOUR = 3600.0
+
+
+def test_client_timestamps_outside_window_count_at_receive_time():
+    rollups = TelemetryRollups(max_keys=10, hour_retention=48 * HOUR)
+    now = time.time()
+    # eine Liste mit tausenden verschiedenen (alten bzw. künftigen) Zeitstempeln
+    for i in range(5000):
+        offset = (i + 3) * 24 * HOUR * (1 if i % 2 else -1)
+        rollups.add(rollups.keys({"slug": "hochwasser", "timestamp": (now + offset) * 1000}, now), now)
+    assert list(rollups.counters["hour"]) == [rollups.keys({}, now)["hour"][0]]
+
+    recent = rollups.keys({"timestamp": (now - 5 * HOUR) * 1000}, now)["hour"][0]
+    assert recent != rollups.keys({}, now)["hour"][0]
+
+
+def test_old_hours_expire_instead_of_filling_the_key_cap():
+    rollups = TelemetryRollups(max_keys=10, hour_retention=24 * HOUR)
+    start = time.time()
+    for h in range(24 * 30):
+        now = start + h * HOUR
+        rollups.add(rollups.keys({"slug": "hochwasser"}, now), now)
+    hours = rollups.counters["hour"]
+    assert "_other" not in hours
+    assert len(hours) <= 25
+    assert max(hours) == rollups.keys({}, start + (24 * 30 - 1) * HOUR)["hour"][0]